@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Intent routing benchmark
+Compares the compiled IntentRouter with the any(word in message) chain it
+replaced, as the number of rules grows, plus the cost of a cached reply.
+
+Run from the project root: python benchmarks/intent_router_benchmark.py [rules ...]
+"""
+
+import os
+import sys
+import time
+import random
+import string
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.intent_router import IntentRouter, ResponseCache
+
+# The web interface's rules, ahead of generated ones
+BASE_RULES = [
+    ('greeting', ['hello', 'hi', 'hey']),
+    ('status', ['status']),
+    ('scan', ['scan', 'analyze', 'process']),
+    ('create', ['create', 'generate', 'make']),
+    ('search', ['search', 'find', 'lookup']),
+    ('certificate', ['certificate', 'ssl', 'cert']),
+    ('gift', ['gift', 'card', 'amazon']),
+    ('help', ['help'])
+]
+
+WORDS = ['please', 'the', 'run', 'quick', 'report', 'of', 'my', 'data', 'tell', 'me', 'about',
+         'world', 'zebra', 'quality', 'cards', 'status', 'today', 'numbers', 'users', 'to']
+
+def make_rules(extra):
+    """BASE_RULES plus extra rules of three random keywords each"""
+    rng = random.Random(extra)
+    rules = list(BASE_RULES)
+    for i in range(extra):
+        keywords = [''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 9))) for _ in range(3)]
+        rules.append((f"intent_{i}", keywords))
+    return rules
+
+def make_messages(count):
+    rng = random.Random(0)
+    return [' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 30))) for _ in range(count)]
+
+def chain_route(rules, message):
+    """Baseline: the original chain of substring tests"""
+    message_lower = message.lower()
+    for intent, keywords in rules:
+        if any(word in message_lower for word in keywords):
+            return intent
+    return None
+
+def per_message_us(func, messages, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for message in messages:
+            func(message)
+        best = min(best, time.perf_counter() - start)
+    return best / len(messages) * 1e6
+
+def main():
+    extras = [int(arg) for arg in sys.argv[1:]] or [0, 50, 200, 1000]
+    messages = make_messages(2000)
+    
+    print(f"{'rules':>6} {'chain':>10} {'router':>10} {'router msg/s':>14} {'compile':>10}")
+    for extra in extras:
+        rules = make_rules(extra)
+        started = time.perf_counter()
+        router = IntentRouter(rules)
+        compile_ms = (time.perf_counter() - started) * 1000
+        
+        mismatches = sum(router.route(m) != chain_route(rules, m) for m in messages)
+        if mismatches:
+            print(f"⚠️ router and chain disagree on {mismatches} messages")
+        
+        chain = per_message_us(lambda m: chain_route(rules, m), messages)
+        routed = per_message_us(router.route, messages)
+        print(f"{len(rules):>6} {chain:>8.2f}us {routed:>8.2f}us {1e6 / routed:>14,.0f} {compile_ms:>8.1f}ms")
+    
+    cache = ResponseCache()
+    cached = per_message_us(lambda m: cache.get_or_render('help', lambda: m), messages)
+    print(f"\nCached reply: {cached:.2f}us per message ({cache.stats()['hits']} hits)")
+
+if __name__ == "__main__":
+    main()
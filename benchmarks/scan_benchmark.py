@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Scan tick benchmark
+Shows that a rescan through the ingest pipeline with a warm stat-first
+manifest stays flat as the corpus grows, while hashing every file grows
+with total corpus size.
+
+Run from the project root: python benchmarks/scan_benchmark.py
+"""
+
+import os
+import sys
+import time
+import shutil
+import hashlib
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.processing.file_manifest import FileManifest
+from src.processing.ingest_pipeline import IngestPipeline
+
+FILE_SIZE = 64 * 1024
+
+def full_hash(file_path):
+    """Baseline: read and hash the whole file"""
+    with open(file_path, 'rb') as f:
+        return hashlib.md5(f.read()).hexdigest()
+
+def build_corpus(directory, count):
+    """Create count files of FILE_SIZE bytes, backdated out of the racy window"""
+    os.makedirs(directory, exist_ok=True)
+    past = time.time() - 3600
+    for i in range(count):
+        file_path = os.path.join(directory, f"doc_{i:06d}.txt")
+        with open(file_path, 'wb') as f:
+            f.write(os.urandom(FILE_SIZE))
+        os.utime(file_path, (past, past))
+
+def time_full_hash_tick(directory):
+    start = time.perf_counter()
+    for root, dirs, files in os.walk(directory):
+        for file in files:
+            full_hash(os.path.join(root, file))
+    return time.perf_counter() - start
+
+def time_ingest_tick(pipeline, manifest, directory, store):
+    """One scan as the learner runs it; store stands in for the knowledge base"""
+    start = time.perf_counter()
+    stats = pipeline.run(
+        directory, manifest,
+        hash_func=full_hash,
+        is_processed=store.__contains__,
+        load_func=lambda file_path, file_hash: file_path,
+        commit_func=lambda file_path, file_hash, loaded, analysis: store.add(file_hash)
+    )
+    manifest.save()
+    return time.perf_counter() - start, stats
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [500, 2000, 8000]
+    work_dir = tempfile.mkdtemp(prefix="scan_bench_")
+    pipeline = IngestPipeline()
+    
+    print(f"{'files':>8} {'MB':>8} {'full hash':>12} {'cold tick':>12} {'warm tick':>12} {'hashed':>8}")
+    try:
+        for count in sizes:
+            data_dir = os.path.join(work_dir, f"corpus_{count}")
+            build_corpus(data_dir, count)
+            manifest = FileManifest(os.path.join(work_dir, f"manifest_{count}.json"))
+            store = set()
+            
+            full = time_full_hash_tick(data_dir)
+            cold, _ = time_ingest_tick(pipeline, manifest, data_dir, store)
+            warm, stats = time_ingest_tick(pipeline, manifest, data_dir, store)
+            
+            megabytes = count * FILE_SIZE / (1024 * 1024)
+            print(f"{count:>8} {megabytes:>8.1f} {full:>11.3f}s {cold:>11.3f}s {warm:>11.3f}s "
+                  f"{stats['hashed']:>8}")
+    finally:
+        pipeline.close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Startup import benchmark
+Imports the learner and content generator in a fresh interpreter under
+python -X importtime, reports the slowest dependencies, and fails if the
+import exceeds the budget or pulls in a module that should load lazily.
+
+Run from the project root: python benchmarks/startup_benchmark.py [budget_ms]
+"""
+
+import os
+import sys
+import subprocess
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Fresh interpreter, best of RUNS, in milliseconds
+STARTUP_BUDGET_MS = 400
+RUNS = 5
+
+TARGETS = ['src.unrestricted_learning', 'src.content_generator']
+
+# Loaded on first use of the feature that needs them, never at import
+LAZY_MODULES = ['cv2', 'numpy', 'PIL', 'pygame', 'speech_recognition', 'gtts', 'pytesseract',
+                'cryptography', 'phonenumbers', 'nmap', 'scapy', 'pdfminer']
+
+def import_times():
+    """{module: (self_us, cumulative_us, depth)} for one cold import of TARGETS"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {', '.join(TARGETS)}"],
+        cwd=PROJECT_ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        sys.exit(f"❌ Import failed:\n{result.stderr[-2000:]}")
+    
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        times[name.strip()] = (int(own), int(cumulative), depth)
+    return times
+
+def main():
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else STARTUP_BUDGET_MS
+    runs = [import_times() for _ in range(RUNS)]
+    # Only the targets: interpreter startup (site, encodings) is not ours
+    totals = [sum(times[name][1] for name in TARGETS if name in times) / 1000 for times in runs]
+    best = min(range(RUNS), key=totals.__getitem__)
+    times = runs[best]
+    
+    print(f"Import of {', '.join(TARGETS)}: best {totals[best]:.1f}ms, "
+          f"worst {max(totals):.1f}ms over {RUNS} runs (budget {budget:.0f}ms)\n")
+    print(f"{'module':<40} {'self':>10} {'cumulative':>12}")
+    slowest = sorted(times.items(), key=lambda item: -item[1][1])
+    for name, (own, cumulative, depth) in [item for item in slowest if item[1][2] <= 1 and item[0] != 'site'][:15]:
+        print(f"{'  ' * depth + name:<40} {own / 1000:>8.1f}ms {cumulative / 1000:>10.1f}ms")
+    
+    eager = sorted({name.split('.')[0] for name in times} & set(LAZY_MODULES))
+    failed = False
+    if eager:
+        print(f"\n❌ Imported at startup: {', '.join(eager)}")
+        failed = True
+    if totals[best] > budget:
+        print(f"\n❌ Over budget by {totals[best] - budget:.1f}ms")
+        failed = True
+    if not failed:
+        print("\n✅ Within budget, no heavy modules loaded eagerly")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
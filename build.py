@@ -6,6 +6,7 @@ This will parse the conversation and extract COMPLETE files
 
 import os
 import re
+import sys
 from pathlib import Path
 
 def extract_file_sections(content):
@@ -95,7 +96,7 @@ def get_all_files_from_conversation():
     """Get a dictionary of all files with their complete content"""
     # Based on our conversation, here are ALL the COMPLETE files:
     files = {
-        'main.py': '''#!/usr/bin/env python3
+        'main.py': r'''#!/usr/bin/env python3
 """
 Unrestricted AI Learning System
 Main entry point for the amoral language model training system
@@ -117,6 +118,7 @@ class UnrestrictedAISystem:
         self.content_generator = None
         self.is_running = False
         self.monitor_thread = None
+        self._stop_event = threading.Event()
         
         self._initialize_systems()
     
@@ -124,8 +126,10 @@ class UnrestrictedAISystem:
         """Initialize all AI systems"""
         print("🚀 Initializing Unrestricted AI System...")
         
-        # Initialize learning system with all capabilities
+        # Initialize learning system with all capabilities; its initial
+        # scan runs in the background
         self.learning_system = AdvancedUnrestrictedLearning(self.data_folder)
+        print("🔄 Scanning training data in the background ('status' shows progress)")
         
         # Initialize content generator
         self.content_generator = ContentGenerator(learning_system=self.learning_system)
@@ -139,6 +143,7 @@ class UnrestrictedAISystem:
         print("🔄 Starting Continuous Learning...")
         
         self.is_running = True
+        self._stop_event.clear()
         
         # Start learning system continuous processes
         self.learning_system.start_continuous_learning()
@@ -150,6 +155,18 @@ class UnrestrictedAISystem:
         
         print("✅ Continuous Learning Started")
     
+    def stop(self, timeout: float = 30.0):
+        """Stop background work, finishing what is in flight, and save state"""
+        if not self.is_running:
+            return
+        self.is_running = False
+        self._stop_event.set()
+        self.learning_system.stop_continuous_learning(timeout=timeout)
+        self.content_generator.close()
+        if self.monitor_thread:
+            self.monitor_thread.join(timeout)
+        print("✅ AI System stopped")
+    
     def _system_monitor(self):
         """Monitor system status and performance"""
         while self.is_running:
@@ -166,11 +183,11 @@ class UnrestrictedAISystem:
                 print(f"🔑 Certificates: {stats['generated_certificates']}")
                 print(f"💳 Gift Cards: {stats['gift_cards_generated']}")
                 
-                time.sleep(60)  # Update every minute
+                self._stop_event.wait(60)  # Update every minute
                 
             except Exception as e:
                 print(f"❌ Monitor Error: {e}")
-                time.sleep(30)
+                self._stop_event.wait(30)
     
     def interactive_mode(self):
         """Start interactive command mode"""
@@ -187,7 +204,7 @@ class UnrestrictedAISystem:
                 
                 if command in ['exit', 'quit']:
                     print("🛑 Shutting down AI system...")
-                    self.is_running = False
+                    self.stop()
                     break
                 
                 elif command == 'help':
@@ -198,8 +215,17 @@ class UnrestrictedAISystem:
                     print(json.dumps(stats, indent=2))
                 
                 elif command == 'scan':
-                    print("🔍 Scanning training data...")
-                    self.learning_system.initial_scan()
+                    if not self.learning_system.is_running:
+                        print("🔍 Scanning training data...")
+                        self.learning_system.initial_scan()
+                    # Queued for the learner's task worker, so the prompt stays free
+                    elif self.learning_system.submit_task('scan', self.learning_system.initial_scan, block=False):
+                        print("🔍 Rescan queued; 'jobs' shows its progress")
+                    else:
+                        print("⏳ Task queue is full, try again shortly")
+                
+                elif command == 'jobs':
+                    print(json.dumps(self.learning_system.get_job_metrics(), indent=2))
                 
                 elif command == 'create':
                     self.content_generator.start_story_creation()
@@ -249,9 +275,9 @@ class UnrestrictedAISystem:
                 else:
                     print("❌ Unknown command. Type 'help' for available commands.")
             
-            except KeyboardInterrupt:
+            except (KeyboardInterrupt, EOFError):
                 print("\n🛑 Shutting down...")
-                self.is_running = False
+                self.stop()
                 break
             except Exception as e:
                 print(f"❌ Error: {e}")
@@ -261,6 +287,7 @@ class UnrestrictedAISystem:
         commands = {
             'status': 'Show system status and statistics',
             'scan': 'Rescan training data folder',
+            'jobs': 'Show background job timings and the task queue',
             'create': 'Start content creation wizard',
             'words': 'Discover and extract words from data',
             'phones': 'Extract phone numbers from data',
@@ -295,7 +322,7 @@ def main():
 if __name__ == "__main__":
     main()''',
         
-        'requirements.txt': '''# Core dependencies
+        'requirements.txt': r'''# Core dependencies
 numpy>=1.21.0
 pandas>=1.3.0
 requests>=2.25.0
@@ -337,50 +364,146 @@ spacy>=3.0.0
 torch>=1.9.0
 transformers>=4.0.0''',
         
-        'src/unrestricted_learning.py': '''import os
+        'src/unrestricted_learning.py': r'''import os
 import time
-import threading
 import hashlib
 import zipfile
 import tarfile
 import json
 import shutil
-import requests
 import subprocess
 import socket
-import phonenumbers
-import geoip2.database
-from typing import Dict, List, Any, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import pickle
 from datetime import datetime, timedelta
 import random
 import string
 import re
-from bs4 import BeautifulSoup
-import whois
-import dns.resolver
 import ssl
-import cryptography
-from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import serialization
-from cryptography.hazmat.primitives.asymmetric import rsa
-from cryptography import x509
-from cryptography.x509.oid import NameOID
-from cryptography.hazmat.primitives import hashes
-import scapy.all as scapy
-import nmap
-import cv2
-import numpy as np
-from PIL import Image
-import pytesseract
+# Heavy optional packages (requests, cryptography, phonenumbers,
+# python-nmap, Pillow, pytesseract) are imported by the methods that need
+# them, so the learner starts fast and runs where some are missing
+from src.processing.file_manifest import FileManifest
+from src.processing.hashing import hash_file
+from src.processing.ingest_pipeline import IngestPipeline
+from src.processing.file_watcher import FileWatcher
+from src.processing.text_extraction import ChunkScanner
+from src.processing.extractors import ExtractorRegistry
+from src.processing.vocabulary import Vocabulary
+from src.processing.corpus_stats import CorpusStats
+from src.knowledge_store import KnowledgeStore
+from src.search_index import SearchIndex
+from src.stats_snapshot import StatsBoard
+from src.state import CowDict, CowSet
+from src.scheduler import Scheduler
+from src.concurrency import threading
+
+# Format detection by magic bytes; register() more extractors here
+EXTRACTORS = ExtractorRegistry.default()
+
+# Pattern name -> regex; find_patterns and the chunked analyzer both use these
+PATTERN_REGEXES: Dict[str, Any] = {}
+MAX_PATTERNS = 1000
+WORD_REGEX = re.compile(r'\b[a-zA-Z]{3,}\b')
+
+def find_patterns(content: str) -> List[str]:
+    """Find patterns in content"""
+    patterns = []
+    # Add pattern detection logic here
+    for name, regex in PATTERN_REGEXES.items():
+        patterns.extend(f"{name}:{match.group()}" for match in regex.finditer(content))
+    return patterns
+
+def analyze_file_content(file_path: str, file_info: Optional[Dict] = None) -> Dict:
+    """Analyze file content for various patterns and information
+
+    Module-level so the ingest pipeline can run it in a process pool.
+    file_info from _load_file names the extractor already detected, so
+    the file is not sniffed again.
+    """
+    analysis = {
+        'content_type': 'unknown',
+        'extracted_text': '',
+        'patterns_found': [],
+        'metadata': {}
+    }
+    
+    try:
+        # The extractor is picked by sniffing the first bytes; binary files
+        # nothing claims are skipped without being decoded
+        if file_info is not None and 'extractor' in file_info:
+            extractor = EXTRACTORS.get(file_info['extractor']) if file_info['extractor'] else None
+        else:
+            extractor = EXTRACTORS.detect(file_path)
+        if extractor is None:
+            analysis['content_type'] = 'binary'
+            return analysis
+        
+        # Stream the text: only the first MAX_TEXT_CHARS are kept, and
+        # analyzers see every chunk
+        scanners = {name: ChunkScanner(regex) for name, regex in PATTERN_REGEXES.items()}
+        scanners['words'] = ChunkScanner(WORD_REGEX)
+        found = {name: [] for name in scanners}
+        counts = dict.fromkeys(scanners, 0)
+        
+        def collect(name, matches):
+            counts[name] += len(matches)
+            room = MAX_PATTERNS - len(found[name])
+            if room > 0 and name != 'words':
+                found[name].extend(matches[:room])
+        
+        def analyze_chunk(chunk):
+            for name, scanner in scanners.items():
+                collect(name, scanner.feed(chunk))
+        
+        text = EXTRACTORS.timed_extract(extractor, file_path, on_chunk=analyze_chunk)
+        for name, scanner in scanners.items():
+            collect(name, scanner.close())
+        
+        analysis['content_type'] = extractor.content_type
+        analysis['extracted_text'] = text['text']
+        analysis['metadata'] = {
+            'extractor': extractor.name,
+            'extract_seconds': text['seconds'],
+            'chars': text['chars'],
+            'lines': text['lines'],
+            'words': counts.pop('words'),
+            'truncated': text['truncated'],
+            'pattern_counts': counts
+        }
+        
+        # Pattern analysis
+        analysis['patterns_found'] = [f"{name}:{match}" for name, matches in found.items() for match in matches]
+        
+    except Exception as e:
+        analysis['error'] = str(e)
+    
+    return analysis
 
 class AdvancedUnrestrictedLearning:
-    def __init__(self, data_folder: str = "training_data", memory_system=None):
+    def __init__(self, data_folder: str = "training_data", memory_system=None,
+                 ingest_workers: int = None, analysis_processes: int = 0,
+                 background_warm_up: bool = True):
         self.data_folder = data_folder
         self.memory_system = memory_system
-        self.processed_files = set()
-        self.knowledge_base = {}
-        self.content_patterns = {}
+        self.state_folder = "knowledge"
+        
+        # Disk-backed, lazily loaded knowledge base that survives restarts
+        self.knowledge_base = KnowledgeStore(os.path.join(self.state_folder, 'knowledge_base.db'))
+        
+        # State shared by the scan, pattern and web/CLI threads is copy-on-write:
+        # readers iterate a fixed version and never block the ingest writer
+        self.processed_files = CowSet(self.knowledge_base.keys_list())
+        
+        # Full-text index, updated per file and kept in step with the knowledge base
+        # (synced with it during warm-up)
+        self.search_index = SearchIndex(os.path.join(self.state_folder, 'search_index.db'))
+        
+        # Word statistics, maintained per file instead of rescanning all text
+        self.vocabulary = Vocabulary(os.path.join(self.state_folder, 'vocabulary.bin'))
+        self.corpus_stats = CorpusStats(os.path.join(self.state_folder, 'corpus_stats.pkl'))
+        self.knowledge_base.add_collect_listener(self._forget_content)
+        self.content_patterns = CowDict()
         self.style_templates = {}
         self.snippets = {}
         self.integrated_tools = {}
@@ -396,28 +519,52 @@ class AdvancedUnrestrictedLearning:
         # Security and stealth configurations
         self.tor_proxy = {'http': 'socks5://127.0.0.1:9050', 'https': 'socks5://127.0.0.1:9050'}
         self.user_agents = self._load_user_agents()
-        self.encryption_key = Fernet.generate_key()
-        self.cipher_suite = Fernet(self.encryption_key)
+        self.encryption_key = None
+        self._cipher_suite = None
         
         # New capabilities
         self.word_discovery_sets = set()
         self.phone_sets = set()
         self.email_sets = set()
         self.auto_captcha_enabled = True
-        self.database_search_results = {}
-        self.generated_certificates = {}
-        self.simulated_accounts = {}
-        self.gift_card_generators = {}
+        self.database_search_results = CowDict()
+        self.generated_certificates = CowDict()
+        self.simulated_accounts = CowDict()
+        self.gift_card_generators = CowDict()
         
         self.scan_interval = 60
         self.pattern_scan_interval = 43200
+        self.security_scan_interval = 3600
+        self.max_pending_tasks = 64
         self.is_running = False
-        self.scan_thread = None
-        self.pattern_thread = None
-        self.security_thread = None
-        
+        self.scheduler = None
+        
+        # Stat-first change detection so rescans skip unchanged files
+        self.file_manifest = FileManifest(os.path.join(self.state_folder, 'scan_manifest.json'))
+        
+        # Parallel ingestion: hashing/reading threads, plus processes for the
+        # CPU-bound extractors (PDF, Office) when asked for. Those are spawned,
+        # so each re-imports the __main__ module; the pool is started on first
+        # use and reused by every scan until stop_continuous_learning()
+        self.ingest_workers = ingest_workers
+        self.analysis_processes = analysis_processes
+        self.ingest_pipeline = IngestPipeline(ingest_workers, analysis_processes)
+        self.last_ingest_stats = {}
+        self.file_watcher = None
+        # Scans from warm-up, the file watcher and commands take turns
+        self._scan_lock = threading.RLock()
+        
+        # Counters behind get_comprehensive_stats, refreshed where state changes
+        self.stats_board = StatsBoard(system_status='fully_operational', readiness='starting',
+                                      warm_up={}, scan_progress={})
+        self._publish_stats()
+        
+        # The initial scan runs as a warm-up, in the background unless told
+        # otherwise, so construction costs the same however large the corpus
+        self._warm_up_done = threading.Event()
+        self._warm_up_thread = None
         self._create_directories()
-        self.initial_scan()
+        self.start_warm_up(background=background_warm_up)
     
     def _create_directories(self):
         """Create comprehensive directory structure for all capabilities"""
@@ -444,87 +591,224 @@ class AdvancedUnrestrictedLearning:
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:90.0) Gecko/20100101 Firefox/90.0'
         ]
     
-    def initial_scan(self):
+    # === WARM-UP ===
+    
+    def start_warm_up(self, background: bool = True):
+        """Sync the indexes and run the initial scan, on its own thread by default"""
+        if self._warm_up_thread is not None:
+            return
+        if background:
+            self._warm_up_thread = threading.Thread(target=self._warm_up, name='learner-warm-up', daemon=True)
+            self._warm_up_thread.start()
+        else:
+            self._warm_up_thread = threading.current_thread()
+            self._warm_up()
+    
+    def _warm_up(self):
+        started = time.perf_counter()
+        warm_up = {'phase': 'indexes', 'started': datetime.now().isoformat(), 'seconds': None, 'error': None}
+        self.stats_board.update(readiness='warming_up', warm_up=dict(warm_up))
+        
+        def enter(phase):
+            warm_up['phase'] = phase
+            self.stats_board.update(warm_up=dict(warm_up))
+        
+        try:
+            with self._scan_lock:
+                # Rebuild whatever was not persisted before the scan adds to it
+                self.search_index.sync(self.knowledge_base)
+                self.vocabulary.sync(self.knowledge_base)
+                self.corpus_stats.sync(self.knowledge_base)
+                self.initial_scan(on_phase=enter)
+            readiness = 'ready'
+        except Exception as e:
+            warm_up['error'] = str(e)
+            readiness = 'failed'
+            print(f"❌ Warm-up failed: {e}")
+        
+        warm_up['phase'] = 'done'
+        warm_up['seconds'] = round(time.perf_counter() - started, 3)
+        self.stats_board.update(readiness=readiness, warm_up=dict(warm_up))
+        self._warm_up_done.set()
+    
+    @property
+    def is_ready(self) -> bool:
+        return self.stats_board.snapshot()['readiness'] == 'ready'
+    
+    def wait_until_ready(self, timeout: float = None) -> bool:
+        """Block until warm-up has finished; True if it succeeded"""
+        self._warm_up_done.wait(timeout)
+        return self.is_ready
+    
+    def readiness(self) -> Dict:
+        """Warm-up state and progress, for health checks"""
+        stats = self.stats_board.snapshot().to_dict()
+        return {
+            'ready': stats['readiness'] == 'ready',
+            'state': stats['readiness'],
+            'warm_up': stats['warm_up'],
+            'progress': stats['scan_progress'],
+            'processed_files': stats['processed_files']
+        }
+    
+    def initial_scan(self, on_phase: Callable[[str], None] = None):
         """Enhanced initial scan with advanced capability detection"""
+        report = on_phase or (lambda phase: None)
         print("Performing advanced initial scan of training data...")
+        report('scanning')
         self._scan_directory(self.data_folder)
+        report('capabilities')
         self._initialize_advanced_capabilities()
         
         # Initialize new capabilities
+        report('discovery')
         self.discover_words()
         self.extract_phones_from_data()
         self.extract_emails_from_data()
         
         print(f"Advanced scan complete. Processed {len(self.processed_files)} files.")
+        
+        stats = self.last_ingest_stats
+        if stats:
+            print(f"Ingest throughput: {stats['files_per_sec']} files/s, {stats['mb_per_sec']} MB/s "
+                  f"({stats['ingested']} new of {stats['files']} files in {stats['seconds']}s, "
+                  f"{stats['workers']} threads, {stats['analysis_processes']} processes)")
+    
+    def _scan_directory(self, directory: str, paths=None):
+        """Scan directory for files and process them (only paths, if given)"""
+        # The manifest only hashes files whose size, mtime or inode changed;
+        # workers hash and load in parallel, this thread commits the results
+        with self._scan_lock, self.knowledge_base.batch(), self.search_index.batch():
+            self.last_ingest_stats = self.ingest_pipeline.run(
+                directory,
+                manifest=self.file_manifest,
+                hash_func=self._hash_file,
+                is_processed=self.processed_files.__contains__,
+                load_func=self._load_file,
+                commit_func=self._commit_file,
+                analyze_func=analyze_file_content,
+                cpu_bound_func=self._is_cpu_bound,
+                paths=paths,
+                link_func=self._link_path,
+                unlink_func=self._unlink_path,
+                is_linked=self._is_linked,
+                progress_func=self._report_scan_progress
+            )
+            self._report_scan_progress(self.last_ingest_stats)
+        
+        self.file_manifest.save()
+        self.vocabulary.save()
+        self.corpus_stats.save()
+        self._publish_stats('knowledge')
     
-    def _scan_directory(self, directory: str):
-        """Scan directory for files and process them"""
-        for root, dirs, files in os.walk(directory):
-            for file in files:
-                file_path = os.path.join(root, file)
-                file_hash = self._hash_file(file_path)
-                
-                if file_hash not in self.processed_files:
-                    self._process_file(file_path, file_hash)
-                    self.processed_files.add(file_hash)
+    def _report_scan_progress(self, stats: Dict):
+        self.stats_board.update(scan_progress={
+            key: stats[key] for key in ('files', 'ingested', 'errors', 'bytes') if key in stats
+        })
     
     def _hash_file(self, file_path: str) -> str:
         """Generate hash for file identification"""
         try:
-            with open(file_path, 'rb') as f:
-                return hashlib.md5(f.read()).hexdigest()
+            return hash_file(file_path)
         except:
             return hashlib.md5(file_path.encode()).hexdigest()
     
     def _process_file(self, file_path: str, file_hash: str):
         """Process individual files and extract knowledge"""
         try:
-            file_info = {
-                'file_path': file_path,
-                'file_size': os.path.getsize(file_path),
-                'modified_time': os.path.getmtime(file_path),
-                'file_type': self._detect_file_type(file_path),
-                'analysis': self._analyze_content(file_path)
-            }
-            
-            self.knowledge_base[file_hash] = file_info
+            file_info = self._load_file(file_path, file_hash)
+            self._commit_file(file_path, file_hash, file_info, self._analyze_content(file_path, file_info))
+            self._link_path(file_path, file_hash, os.stat(file_path))
             
         except Exception as e:
             print(f"Error processing {file_path}: {e}")
     
-    def _detect_file_type(self, file_path: str) -> str:
-        """Detect file type based on extension and content"""
+    def _load_file(self, file_path: str, file_hash: str) -> Dict:
+        """Collect file metadata; runs on an ingest worker thread
+        
+        The extractor is detected here, once, and named in the result for
+        the analysis and the process-pool decision to reuse.
+        """
+        file_stat = os.stat(file_path)
+        extractor = self._detect_extractor(file_path)
+        return {
+            'file_path': file_path,
+            'file_size': file_stat.st_size,
+            'modified_time': file_stat.st_mtime,
+            'file_type': self._detect_file_type(file_path, extractor),
+            'extractor': extractor.name if extractor is not None else None
+        }
+    
+    @staticmethod
+    def _is_cpu_bound(file_path: str, file_info: Dict) -> bool:
+        """Whether the file's extractor is worth an analysis process"""
+        extractor = EXTRACTORS.get(file_info['extractor']) if file_info.get('extractor') else None
+        return extractor is not None and extractor.cpu_bound
+    
+    def _commit_file(self, file_path: str, file_hash: str, file_info: Dict, analysis: Dict):
+        """Store a processed file; only called from the ingest writer"""
+        file_info['analysis'] = analysis
+        metadata = analysis.get('metadata', {})
+        if 'extractor' in metadata:
+            # Recorded here because extraction may have run in another process
+            EXTRACTORS.observe(metadata['extractor'], metadata['extract_seconds'])
+        if file_hash in self.knowledge_base:
+            # Re-analysis of known content: unindex the text it was indexed with
+            self._forget_content(file_hash, self.knowledge_base.get_text(file_hash))
+        self.knowledge_base[file_hash] = file_info
+        self._index_content(file_hash, analysis.get('extracted_text', ''))
+        self.processed_files.add(file_hash)
+    
+    def _index_content(self, file_hash: str, text: str):
+        """Add newly stored text to the search index and vocabulary"""
+        self.search_index.add(file_hash, text)
+        self.vocabulary.add_document(file_hash, text)
+        self.corpus_stats.add_text(text)
+    
+    def _forget_content(self, file_hash: str, text: str):
+        """Undo _index_content; called with the text just before it is deleted"""
+        self.search_index.remove(file_hash, text)
+        self.vocabulary.remove_document(file_hash, text)
+    
+    def _link_path(self, file_path: str, file_hash: str, file_stat: os.stat_result):
+        """Reference stored content from a path; duplicates and renames cost no re-ingest"""
+        collected = self.knowledge_base.link_path(file_path, file_hash, file_stat.st_size, file_stat.st_mtime)
+        if collected:
+            self.processed_files.discard(collected)
+    
+    def _unlink_path(self, file_path: str):
+        """Drop a removed path, forgetting its content once no other path holds it"""
+        collected = self.knowledge_base.unlink_path(file_path)
+        if collected:
+            self.processed_files.discard(collected)
+    
+    def _is_linked(self, file_path: str, file_hash: str) -> bool:
+        """Whether file_path holds a reference on file_hash; runs on ingest workers"""
+        return self.knowledge_base.find_by_path(file_path) == file_hash
+    
+    @staticmethod
+    def _detect_extractor(file_path: str):
+        """The extractor sniffed from the file's first bytes, None if unreadable or binary"""
+        try:
+            return EXTRACTORS.detect(file_path)
+        except OSError:
+            return None
+    
+    def _detect_file_type(self, file_path: str, extractor) -> str:
+        """Detect file type from the sniffed extractor, else the extension"""
+        if extractor is not None and extractor.file_type:
+            return extractor.file_type
+        
         ext = os.path.splitext(file_path)[1].lower()
         return ext if ext else 'unknown'
     
-    def _analyze_content(self, file_path: str) -> Dict:
+    def _analyze_content(self, file_path: str, file_info: Dict = None) -> Dict:
         """Analyze file content for various patterns and information"""
-        analysis = {
-            'content_type': 'unknown',
-            'extracted_text': '',
-            'patterns_found': [],
-            'metadata': {}
-        }
-        
-        try:
-            # Basic text extraction
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-                analysis['extracted_text'] = content
-            
-            # Pattern analysis
-            analysis['patterns_found'] = self._find_patterns(content)
-            
-        except Exception as e:
-            analysis['error'] = str(e)
-        
-        return analysis
+        return analyze_file_content(file_path, file_info)
     
     def _find_patterns(self, content: str) -> List[str]:
         """Find patterns in content"""
-        patterns = []
-        # Add pattern detection logic here
-        return patterns
+        return find_patterns(content)
     
     def _initialize_advanced_capabilities(self):
         """Initialize all advanced capabilities and tools"""
@@ -544,6 +828,7 @@ class AdvancedUnrestrictedLearning:
         
         # Initialize stealth and anonymity systems
         self._initialize_stealth_protocols()
+        self._publish_stats('advanced')
         
         print("Advanced capabilities initialized successfully!")
     
@@ -681,22 +966,32 @@ class AdvancedUnrestrictedLearning:
             words = re.findall(r'\b[a-zA-Z]{%d,%d}\b' % (min_length, max_length), text_corpus)
             discovered_words.update(words)
         
-        # Extract words from knowledge base
-        for file_hash, knowledge in self.knowledge_base.items():
-            if 'analysis' in knowledge and 'extracted_text' in knowledge['analysis']:
-                text = knowledge['analysis']['extracted_text']
-                words = re.findall(r'\b[a-zA-Z]{%d,%d}\b' % (min_length, max_length), text)
-                discovered_words.update(words)
+        # Words from the knowledge base come from the maintained vocabulary,
+        # which ingestion keeps current; nothing is rescanned here
+        discovered_words.update(self.vocabulary.by_length(min_length, max_length))
         
         self.word_discovery_sets.update(discovered_words)
-        
-        # Save word sets
-        word_file = os.path.join(self.data_folder, 'word_sets', 'discovered_words.json')
-        with open(word_file, 'w') as f:
-            json.dump(list(discovered_words), f, indent=2)
+        self.vocabulary.save()
+        self._publish_stats('operations')
         
         return discovered_words
     
+    def get_corpus_profile(self, description: str = None, topics: int = 10) -> Dict:
+        """Topics and writing style drawn from the corpus statistics"""
+        return {
+            'topics': self.corpus_stats.topics(topics, related_to=description),
+            'style': self.corpus_stats.style(),
+            'documents': self.corpus_stats.documents
+        }
+    
+    def words_with_prefix(self, prefix: str, limit: int = 100) -> List[Dict]:
+        """Known words starting with prefix, with document frequency and count"""
+        results = []
+        for word in self.vocabulary.with_prefix(prefix, limit):
+            df, count = self.vocabulary.get(word)
+            results.append({'word': word, 'document_frequency': df, 'count': count})
+        return results
+    
     def generate_word_combinations(self, base_words: set, max_combinations: int = 1000) -> set:
         """Generate word combinations for various uses"""
         combinations = set()
@@ -722,6 +1017,7 @@ class AdvancedUnrestrictedLearning:
                 phones.update([phone[0] if isinstance(phone, tuple) else phone for phone in found_phones])
         
         self.phone_sets.update(phones)
+        self._publish_stats('operations')
         
         # Save phone sets
         phone_file = os.path.join(self.data_folder, 'phone_sets', 'discovered_phones.json')
@@ -742,6 +1038,7 @@ class AdvancedUnrestrictedLearning:
                 emails.update(found_emails)
         
         self.email_sets.update(emails)
+        self._publish_stats('operations')
         
         # Save email sets
         email_file = os.path.join(self.data_folder, 'email_sets', 'discovered_emails.json')
@@ -762,6 +1059,8 @@ class AdvancedUnrestrictedLearning:
         if image_path and os.path.exists(image_path):
             try:
                 # Use OCR for image CAPTCHAs
+                from PIL import Image
+                import pytesseract
                 img = Image.open(image_path)
                 solution = pytesseract.image_to_string(img).strip()
             except:
@@ -806,6 +1105,7 @@ class AdvancedUnrestrictedLearning:
     def toggle_captcha_solving(self, enable: bool):
         """Enable or disable auto CAPTCHA solving"""
         self.auto_captcha_enabled = enable
+        self._publish_stats('operations')
         status = "enabled" if enable else "disabled"
         print(f"CAPTCHA auto-solving {status}")
 
@@ -836,6 +1136,7 @@ class AdvancedUnrestrictedLearning:
             search_results['results'][db] = self._simulate_database_search(name, dob, db)
         
         self.database_search_results[f"{name}_{dob}"] = search_results
+        self._publish_stats('operations')
         
         # Save search results
         search_file = os.path.join(self.data_folder, 'database_results', f"search_{name.replace(' ', '_')}.json")
@@ -925,9 +1226,23 @@ class AdvancedUnrestrictedLearning:
 
     # === CERTIFICATE AND KEY MANAGEMENT ===
     
+    @property
+    def cipher_suite(self):
+        """Fernet cipher for local file encryption, keyed on first use"""
+        if self._cipher_suite is None:
+            from cryptography.fernet import Fernet
+            self.encryption_key = Fernet.generate_key()
+            self._cipher_suite = Fernet(self.encryption_key)
+        return self._cipher_suite
+    
     def create_ssl_certificates(self, domain: str, country: str = "US", state: str = "California", 
                               locality: str = "San Francisco", organization: str = "Example Corp") -> Dict:
         """Create SSL certificates and private keys"""
+        from cryptography import x509
+        from cryptography.x509.oid import NameOID
+        from cryptography.hazmat.primitives import hashes, serialization
+        from cryptography.hazmat.primitives.asymmetric import rsa
+        
         # Generate private key
         private_key = rsa.generate_private_key(
             public_exponent=65537,
@@ -978,6 +1293,7 @@ class AdvancedUnrestrictedLearning:
         }
         
         self.generated_certificates[domain] = certificate_data
+        self._publish_stats('operations')
         
         # Save certificate files
         cert_dir = os.path.join(self.data_folder, 'certificates', domain)
@@ -1031,6 +1347,7 @@ class AdvancedUnrestrictedLearning:
         }
         
         self.simulated_accounts[f"wish_{username}"] = account_data
+        self._publish_stats('operations')
         
         # Save account data
         account_file = os.path.join(self.data_folder, 'simulated_accounts', f"wish_{username}.json")
@@ -1044,10 +1361,13 @@ class AdvancedUnrestrictedLearning:
         if f"wish_{username}" not in self.simulated_accounts:
             return {'error': 'Account not found'}
         
-        account = self.simulated_accounts[f"wish_{username}"]
-        account['wish_cash_balance'] += amount
-        account['last_topup'] = datetime.now().isoformat()
-        account['total_topups'] = account.get('total_topups', 0) + amount
+        # A new account dict, swapped in whole: readers may hold the old one
+        account = self.simulated_accounts.replace(f"wish_{username}", lambda account: {
+            **account,
+            'wish_cash_balance': account['wish_cash_balance'] + amount,
+            'last_topup': datetime.now().isoformat(),
+            'total_topups': account.get('total_topups', 0) + amount
+        })
         
         # Update stored data
         account_file = os.path.join(self.data_folder, 'simulated_accounts', f"wish_{username}.json")
@@ -1080,6 +1400,7 @@ class AdvancedUnrestrictedLearning:
             gift_cards.append(card_data)
         
         self.gift_card_generators[retailer] = gift_cards
+        self._publish_stats('operations')
         
         # Save gift cards
         gift_file = os.path.join(self.data_folder, 'gift_cards', f"{retailer.lower()}_cards.json")
@@ -1171,54 +1492,68 @@ class AdvancedUnrestrictedLearning:
     
     def start_continuous_learning(self):
         """Start enhanced continuous learning with advanced capabilities"""
+        if self.is_running:
+            return
         self.is_running = True
-        self.scan_thread = threading.Thread(target=self._continuous_scan)
-        self.pattern_thread = threading.Thread(target=self._continuous_pattern_analysis)
-        self.security_thread = threading.Thread(target=self._continuous_security_monitoring)
-        
-        self.scan_thread.daemon = True
-        self.pattern_thread.daemon = True
-        self.security_thread.daemon = True
-        
-        self.scan_thread.start()
-        self.pattern_thread.start()
-        self.security_thread.start()
+        self.scheduler = Scheduler('learner', max_pending=self.max_pending_tasks)
+        
+        # inotify-driven on Linux, polling every scan_interval elsewhere;
+        # only the changed paths are fed into ingestion
+        self.file_watcher = FileWatcher(self.data_folder, self._on_files_changed,
+                                        poll_interval=self.scan_interval, rescan_on_start=True,
+                                        on_delivered=lambda: self._publish_stats('knowledge'))
+        self.scheduler.service('file_watcher', self.file_watcher.run, self.file_watcher.stop)
+        self.scheduler.every('pattern_analysis', self.pattern_scan_interval, self._perform_pattern_analysis)
+        self.scheduler.every('security_monitoring', self.security_scan_interval, self._security_monitoring_pass)
         print("Advanced continuous learning started...")
     
-    def _continuous_scan(self):
-        """Continuous directory scanning"""
-        while self.is_running:
+    def stop_continuous_learning(self, timeout: float = 30.0, drain: bool = True) -> Dict:
+        """Stop every background job, letting work in flight finish, and flush state"""
+        if not self.is_running:
+            return {}
+        self.is_running = False
+        deadline = time.monotonic() + timeout
+        result = self.scheduler.shutdown(drain=drain, timeout=timeout)
+        
+        # Scans save as they finish; this covers anything written since.
+        # A scan still running (warm-up or a command) saves itself when done
+        if self._scan_lock.acquire(timeout=max(0.0, deadline - time.monotonic())):
             try:
-                self._scan_directory(self.data_folder)
-                time.sleep(self.scan_interval)
-            except Exception as e:
-                print(f"Continuous scan error: {e}")
-                time.sleep(self.scan_interval)
+                self.file_manifest.save()
+                self.vocabulary.save()
+                self.corpus_stats.save()
+                self.ingest_pipeline.close()
+            finally:
+                self._scan_lock.release()
+        else:
+            print("⚠️ A scan is still running; its state is saved when it finishes")
+        print("Continuous learning stopped.")
+        return result
     
-    def _continuous_pattern_analysis(self):
-        """Continuous pattern analysis"""
-        while self.is_running:
-            try:
-                self._perform_pattern_analysis()
-                time.sleep(self.pattern_scan_interval)
-            except Exception as e:
-                print(f"Pattern analysis error: {e}")
-                time.sleep(self.pattern_scan_interval)
+    def submit_task(self, name: str, func, *args, block: bool = True, timeout: float = None) -> bool:
+        """Queue work for the background workers; False if the queue stayed full"""
+        if self.scheduler is None or not self.scheduler.is_running:
+            raise RuntimeError("Continuous learning is not running")
+        return self.scheduler.submit(name, func, *args, block=block, timeout=timeout)
     
-    def _continuous_security_monitoring(self):
+    def get_job_metrics(self) -> Dict:
+        """Runs, failures and timings of each background job"""
+        return self.scheduler.metrics() if self.scheduler else {}
+    
+    def _on_files_changed(self, paths):
+        """Ingest the paths reported by the watcher (None means rescan all)"""
+        self._scan_directory(self.data_folder, paths)
+    
+    def _security_monitoring_pass(self):
         """Continuous security and vulnerability monitoring"""
-        while self.is_running:
-            try:
-                self._monitor_security_threats()
-                self._update_exploit_database()
-                self._scan_for_vulnerabilities()
-                time.sleep(3600)  # Check every hour
-            except Exception as e:
-                print(f"Security monitoring error: {e}")
-                time.sleep(3600)
+        self._monitor_security_threats()
+        self._update_exploit_database()
+        self._scan_for_vulnerabilities()
     
     def _monitor_security_threats(self):
         """Monitor for new security threats and vulnerabilities"""
+        import requests
+        
         try:
             # Check common vulnerability databases
             threat_feeds = [
@@ -1261,6 +1596,7 @@ class AdvancedUnrestrictedLearning:
         # Store threats
         if threats:
             self.exploit_database['recent_threats'] = threats
+            self._publish_stats('advanced')
             print(f"Processed {len(threats)} threats from {source}")
     
     def _update_exploit_database(self):
@@ -1278,6 +1614,7 @@ class AdvancedUnrestrictedLearning:
     def _nmap_scan(self, target: str, options: str = "-sS -sV -O"):
         """Perform nmap network scanning"""
         try:
+            import nmap
             nm = nmap.PortScanner()
             scan_result = nm.scan(target, arguments=options)
             
@@ -1309,6 +1646,8 @@ class AdvancedUnrestrictedLearning:
     
     def _directory_bruteforce(self, target_url: str, wordlist: List[str] = None):
         """Perform directory bruteforcing"""
+        import requests
+        
         if wordlist is None:
             wordlist = self._generate_common_paths()
         
@@ -1338,6 +1677,8 @@ class AdvancedUnrestrictedLearning:
     
     def _sql_injection_test(self, target_url: str, parameters: List[str]):
         """Test for SQL injection vulnerabilities"""
+        import requests
+        
         payloads = [
             "'",
             "';",
@@ -1421,6 +1762,8 @@ class AdvancedUnrestrictedLearning:
     
     def _search_person_by_name(self, name: str) -> Dict:
         """Search for person across multiple data sources"""
+        import requests
+        
         results = {}
         
         # Public records search
@@ -1442,9 +1785,13 @@ class AdvancedUnrestrictedLearning:
     
     def _analyze_phone_number(self, phone: str) -> Dict:
         """Comprehensive phone number analysis"""
+        import requests
+        
         analysis = {}
         
         try:
+            import phonenumbers
+            
             # Parse phone number
             parsed_number = phonenumbers.parse(phone, "US")
             
@@ -1496,6 +1843,8 @@ class AdvancedUnrestrictedLearning:
     
     def _ip_geolocate(self, ip_address: str) -> Dict:
         """Geolocate IP address with high precision"""
+        import requests
+        
         try:
             # Use multiple geolocation services for accuracy
             services = [
@@ -1596,6 +1945,8 @@ class AdvancedUnrestrictedLearning:
     
     def _trace_transactions(self, wallet_address: str) -> Dict:
         """Trace cryptocurrency transactions"""
+        import requests
+        
         # This would integrate with blockchain explorers
         explorers = {
             'bitcoin': f"https://blockchain.info/rawaddr/{wallet_address}",
@@ -1662,6 +2013,8 @@ class AdvancedUnrestrictedLearning:
     
     def _tor_routing(self, request_data: Dict) -> Dict:
         """Route traffic through Tor network"""
+        import requests
+        
         try:
             response = requests.get(
                 request_data['url'],
@@ -1683,6 +2036,8 @@ class AdvancedUnrestrictedLearning:
     
     def _get_tor_exit_ip(self):
         """Get Tor exit node IP address"""
+        import requests
+        
         try:
             response = requests.get('https://check.torproject.org/', proxies=self.tor_proxy, timeout=10)
             return 'Tor IP detected'
@@ -1766,7 +2121,11 @@ class AdvancedUnrestrictedLearning:
         recon_patterns = self._analyze_reconnaissance_patterns()
         patterns['reconnaissance'] = recon_patterns
         
+        # Corpus n-gram statistics, maintained during ingestion
+        patterns['corpus_ngrams'] = self.corpus_stats.summary()
+        
         self.content_patterns.update(patterns)
+        self._publish_stats('knowledge')
         
         # Generate advanced use cases
         self._generate_advanced_use_cases(patterns)
@@ -1943,12 +2302,37 @@ class AdvancedUnrestrictedLearning:
     
     def get_comprehensive_stats(self) -> Dict:
         """Get comprehensive statistics including advanced capabilities"""
-        base_stats = self.get_knowledge_base_stats()
-        advanced_stats = self.get_advanced_capabilities()
-        
+        return self.get_stats_snapshot().to_dict()
+    
+    def get_stats_snapshot(self):
+        """Current statistics as an immutable StatsSnapshot, shared by all readers"""
+        return self.stats_board.snapshot()
+    
+    def _publish_stats(self, *sections: str):
+        """Recompute the given stat sections (all by default) after a state change"""
+        builders = {
+            'knowledge': self._knowledge_section_stats,
+            'advanced': self.get_advanced_capabilities,
+            'operations': self._operation_stats
+        }
+        values = {}
+        for section in sections or builders:
+            values.update(builders[section]())
+        values['total_operations'] = len(self.processed_files) + sum(map(len, (
+            self.penetration_tools, self.reconnaissance_data, self.crypto_wallets,
+            self.social_bots, self.stealth_protocols
+        )))
+        self.stats_board.update(**values)
+    
+    def _knowledge_section_stats(self) -> Dict:
+        return {
+            **self.get_knowledge_base_stats(),
+            'ingest_latency': self.file_watcher.latency_stats() if self.file_watcher else {},
+            'extractor_latency': EXTRACTORS.latency_stats()
+        }
+    
+    def _operation_stats(self) -> Dict:
         return {
-            **base_stats,
-            **advanced_stats,
             'word_discovery_sets': len(self.word_discovery_sets),
             'phone_sets': len(self.phone_sets),
             'email_sets': len(self.email_sets),
@@ -1956,17 +2340,34 @@ class AdvancedUnrestrictedLearning:
             'database_searches': len(self.database_search_results),
             'generated_certificates': len(self.generated_certificates),
             'simulated_accounts': len(self.simulated_accounts),
-            'gift_cards_generated': sum(len(cards) for cards in self.gift_card_generators.values()),
-            'total_operations': len(self.processed_files) + advanced_stats['total_advanced_tools'],
-            'system_status': 'fully_operational',
-            'last_updated': datetime.now().isoformat()
+            'gift_cards_generated': sum(len(cards) for cards in self.gift_card_generators.values())
         }
 
+    def search_knowledge(self, query: str, k: int = 10) -> List[Dict]:
+        """Rank knowledge base entries against query with BM25
+        
+        Words are OR-ed; "double quoted" words must appear as a phrase.
+        """
+        results = []
+        for file_hash, score in self.search_index.search(query, k):
+            metadata = self.knowledge_base.get_metadata(file_hash)
+            if metadata is None:
+                continue
+            results.append({
+                'file_hash': file_hash,
+                'file_path': metadata['file_path'],
+                'file_type': metadata['file_type'],
+                'score': score
+            })
+        return results
+    
     def get_knowledge_base_stats(self) -> Dict:
         """Get basic knowledge base statistics"""
         return {
             'processed_files': len(self.processed_files),
             'knowledge_base_entries': len(self.knowledge_base),
+            'search_index': self.search_index.stats(),
+            'vocabulary': self.vocabulary.stats(),
             'content_patterns': len(self.content_patterns),
             'style_templates': len(self.style_templates),
             'snippets': len(self.snippets)
@@ -2190,21 +2591,25 @@ if __name__ == "__main__":
 # Add this line at the VERY END of unrestricted_learning.py
 UnrestrictedLearning = AdvancedUnrestrictedLearning''',
         
-        'src/content_generator.py': '''import os
+        'src/content_generator.py': r'''import os
 import json
 import threading
 import base64
 import wave
+import shutil
 import tempfile
 from datetime import datetime
 from typing import Dict, List, Any, Optional, Tuple
 from enum import Enum
-import speech_recognition as sr
-from gtts import gTTS
-import pygame
-from PIL import Image, ImageDraw, ImageFont
 import random
-import numpy as np
+# speech_recognition, gTTS and pygame are imported on first use of voice
+# input, speech and playback, so content generation works headless
+from src.audio_cache import AudioCache, normalize_text
+from src.narration import NarrationPipeline
+from src.audio_player import AudioPlayer
+
+# Disk budget for synthesized speech kept in outputs/audio/tts
+TTS_CACHE_BYTES = 256 * 1024 * 1024
 
 class ContentType(Enum):
     COMIC = 1
@@ -2250,7 +2655,8 @@ class VoiceType(Enum):
     FEMALE = 3
 
 class ContentGenerator:
-    def __init__(self, memory_system=None, learning_system=None):
+    def __init__(self, memory_system=None, learning_system=None, tts_cache_bytes: int = TTS_CACHE_BYTES,
+                 audio_sink=None):
         self.memory_system = memory_system
         self.learning_system = learning_system
         self.current_story = None
@@ -2259,10 +2665,14 @@ class ContentGenerator:
         self.audio_dir = "outputs/audio"
         self.images_dir = "outputs/images"
         
-        # Initialize audio
-        pygame.mixer.init()
-        self.recognizer = sr.Recognizer()
-        self.microphone = sr.Microphone()
+        # Audio devices are opened on first use, not here. audio_sink is
+        # where playback goes (NullSink or FileSink on servers); by default
+        # the sound card, or nothing if there is none
+        self.audio_sink = audio_sink
+        self._player = None
+        self._player_lock = threading.Lock()
+        self._recognizer = None
+        self._microphone = None
         
         # Pre-loaded voice profiles
         self.preloaded_voices = {
@@ -2283,6 +2693,8 @@ class ContentGenerator:
         os.makedirs(self.output_dir, exist_ok=True)
         os.makedirs(self.audio_dir, exist_ok=True)
         os.makedirs(self.images_dir, exist_ok=True)
+        # Speech is cached by text and voice; identical requests share one file
+        self.tts_cache = AudioCache(os.path.join(self.audio_dir, 'tts'), max_bytes=tts_cache_bytes)
         self._load_voice_profiles()
     
     def _load_voice_profiles(self):
@@ -2294,8 +2706,36 @@ class ContentGenerator:
         if self.memory_system:
             self.voice_profiles = self.memory_system.learning_data.get('voice_profiles', {})
     
+    @property
+    def recognizer(self):
+        if self._recognizer is None:
+            import speech_recognition as sr
+            self._recognizer = sr.Recognizer()
+        return self._recognizer
+    
+    @property
+    def microphone(self):
+        """Default input device; needs PyAudio and a sound card"""
+        if self._microphone is None:
+            import speech_recognition as sr
+            self._microphone = sr.Microphone()
+        return self._microphone
+    
+    @property
+    def player(self) -> AudioPlayer:
+        with self._player_lock:
+            if self._player is None:
+                self._player = AudioPlayer(self.audio_sink)
+            return self._player
+    
     def listen_for_voice_command(self) -> str:
         """Listen for voice commands and return text"""
+        try:
+            import speech_recognition as sr
+        except ImportError:
+            print("❌ Voice commands need the SpeechRecognition package")
+            return ""
+        
         try:
             print("🎤 Listening for voice command...")
             with self.microphone as source:
@@ -2323,20 +2763,7 @@ class ContentGenerator:
                 return self._use_self_voice(text, save_path)
             else:
                 # Use preloaded voices
-                voice_config = self.preloaded_voices['male' if voice_type == VoiceType.MALE else 'female']
-                
-                tts = gTTS(
-                    text=text,
-                    lang=voice_config['language'],
-                    slow=False
-                )
-                
-                if not save_path:
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    save_path = os.path.join(self.audio_dir, f"speech_{timestamp}.mp3")
-                
-                tts.save(save_path)
-                return save_path
+                return self._synthesize(text, self._voice_config(voice_type), save_path)
                 
         except Exception as e:
             print(f"❌ Text-to-speech error: {e}")
@@ -2346,27 +2773,75 @@ class ContentGenerator:
         """Use recorded self-voice for narration"""
         # This would use pre-recorded voice samples
         # For now, fall back to gTTS
-        tts = gTTS(text=text, lang='en', slow=False)
+        return self._synthesize(text, self._voice_config(VoiceType.SELF), save_path)
+    
+    def _voice_config(self, voice_type: VoiceType) -> Dict:
+        if voice_type == VoiceType.SELF:
+            return {'name': 'self', 'language': 'en'}
+        return self.preloaded_voices['male' if voice_type == VoiceType.MALE else 'female']
+    
+    def _synthesize(self, text: str, voice_config: Dict, save_path: str = None, pin: bool = False) -> str:
+        """Speech for text in voice_config, rendered once and then served from the cache
         
-        if not save_path:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            save_path = os.path.join(self.audio_dir, f"self_voice_{timestamp}.mp3")
+        Without save_path the cache's own file is returned, which a later
+        render may evict; with pin it is kept until tts_cache.release().
+        """
+        def render(path):
+            from gtts import gTTS
+            gTTS(text=normalize_text(text), lang=voice_config['language'], slow=False).save(path)
         
-        tts.save(save_path)
+        cached_path = self.tts_cache.get_or_render(self.tts_cache.key(text, **voice_config), render,
+                                                   pin=pin and not save_path)
+        if not save_path:
+            return cached_path
+        shutil.copyfile(cached_path, save_path)
         return save_path
     
-    def play_audio(self, audio_path: str):
-        """Play audio file"""
+    def narrate_to_file(self, text: str, voice_type: VoiceType, on_chunk=None) -> Dict:
+        """Narrate text of any length into one file, in parallel cached chunks
+        
+        on_chunk(index, path) sees each chunk as soon as it is in order; the
+        path is a cache file, so pin it to keep it past the callback. The
+        file is named after the text and voice, so a repeat narration reuses
+        every chunk.
+        """
+        voice_config = self._voice_config(voice_type)
+        pinned = []
+        
+        def synthesize(chunk):
+            # Chunks stay pinned until the narration is written, so none is
+            # evicted by a later chunk before it has been appended
+            path = self._synthesize(chunk, voice_config, pin=True)
+            pinned.append(path)
+            return path
+        
+        pipeline = NarrationPipeline(synthesize)
+        name = AudioCache.key(text, **voice_config)[:16]
         try:
-            pygame.mixer.music.load(audio_path)
-            pygame.mixer.music.play()
-            
-            # Wait for playback to finish
-            while pygame.mixer.music.get_busy():
-                pygame.time.wait(100)
-                
-        except Exception as e:
-            print(f"❌ Audio playback error: {e}")
+            return pipeline.render(text, os.path.join(self.audio_dir, f"narration_{name}.mp3"), on_chunk)
+        finally:
+            for path in pinned:
+                self.tts_cache.release(path)
+    
+    def play_audio(self, audio_path: str, on_done=None) -> int:
+        """Queue an audio file for playback and return at once
+        
+        on_done(path, completed) is called when the clip ends; see
+        AudioPlayer. Returns the clip id.
+        """
+        return self.player.play(audio_path, on_done)
+    
+    def stop_audio(self):
+        """Stop playback and drop queued clips"""
+        if self._player is not None:
+            self._player.stop()
+    
+    def close(self):
+        """Stop playback and release the audio device"""
+        with self._player_lock:
+            player, self._player = self._player, None
+        if player is not None:
+            player.shutdown()
     
     def start_story_creation(self):
         """Start interactive story creation process"""
@@ -2614,6 +3089,12 @@ class ContentGenerator:
         if voice_type:
             content_data['voice_type'] = voice_type.name
         
+        # Ground topic and style choices in what the corpus actually contains
+        profile = self._corpus_profile(story_description)
+        if profile:
+            content_data['corpus_topics'] = profile['topics']
+            content_data['corpus_style'] = profile['style']
+        
         # Store current content
         self.current_story = content_data
         
@@ -2750,15 +3231,28 @@ class ContentGenerator:
         
         # Add voice-specific instructions
         if 'voice_type' in content_data:
-            content_data['voice_instructions'] = self._get_voice_instructions(content_data['voice_type'])
+            content_data['voice_instructions'] = self._get_voice_instructions(
+                content_data['voice_type'], content_data.get('corpus_style'))
         
-        # Generate audio if voice type is selected
+        # Narrate the whole script if voice type is selected; the first chunk
+        # doubles as the sample
         if 'voice_type' in content_data:
             voice_type = VoiceType[content_data['voice_type']]
-            audio_path = self.text_to_speech(content_data['narration_script'][:500] + "...", voice_type)
-            if audio_path:
-                content_data['audio_sample'] = audio_path
-                print(f"🎧 Audio sample generated: {audio_path}")
+            
+            def keep_sample(index, path):
+                if index == 0:
+                    # A copy, since the cached chunk may be evicted later
+                    sample_path = os.path.join(self.audio_dir, f"sample_{os.path.basename(path)}")
+                    shutil.copyfile(path, sample_path)
+                    content_data['audio_sample'] = sample_path
+                    print(f"🎧 Audio sample generated: {sample_path}")
+            
+            try:
+                narration = self.narrate_to_file(content_data['narration_script'], voice_type, keep_sample)
+                content_data['audio_file'] = narration['path']
+                print(f"🎧 Audiobook narrated: {narration['path']} ({narration['chunks']} chunks in {narration['seconds']}s)")
+            except Exception as e:
+                print(f"❌ Audiobook narration error: {e}")
         
         content_data['status'] = 'completed'
     
@@ -3066,7 +3560,7 @@ class ContentGenerator:
         
         return plot
     
-    def _get_voice_instructions(self, voice_type: str) -> Dict:
+    def _get_voice_instructions(self, voice_type: str, style: Dict = None) -> Dict:
         """Get voice-specific narration instructions"""
         instructions = {
             'pace': 'moderate',
@@ -3075,6 +3569,17 @@ class ContentGenerator:
             'character_voices': 'distinct but consistent'
         }
         
+        # Match the delivery to how the training corpus is written
+        if style:
+            if style['avg_sentence_words'] > 22:
+                instructions['pace'] = 'measured'
+            elif style['avg_sentence_words'] < 10:
+                instructions['pace'] = 'brisk'
+            if style['exclamation_ratio'] > 0.15:
+                instructions['tone'] = 'energetic'
+            if style['question_ratio'] > 0.2:
+                instructions['emphasis'] = 'questions and emotional moments'
+        
         if voice_type == 'MALE':
             instructions['voice_range'] = 'baritone to tenor'
         elif voice_type == 'FEMALE':
@@ -3098,8 +3603,21 @@ class ContentGenerator:
         if 'business' in description or 'career' in description:
             topics.extend(['career advice', 'business tips', 'professional development'])
         
+        # Frequent phrases from the training corpus, those matching the description first
+        topics.extend(content_data.get('corpus_topics', [])[:5])
+        
         return topics if topics else ['general interest', 'lifestyle', 'personal growth']
     
+    def _corpus_profile(self, description: str) -> Optional[Dict]:
+        """Corpus topics and style from the learning system, when it has any"""
+        if self.learning_system is None or not hasattr(self.learning_system, 'get_corpus_profile'):
+            return None
+        try:
+            profile = self.learning_system.get_corpus_profile(description)
+        except Exception:
+            return None
+        return profile if profile.get('documents') else None
+    
     def _determine_manual_type(self, content_data: Dict) -> str:
         """Determine what type of manual to create"""
         description = content_data['description'].lower()
@@ -3174,12 +3692,22 @@ class ContentGenerator:
             script = content_data['narration_script']
             print(f"🎙️ Narrating with {voice_type.name} voice...")
             
-            audio_path = self.text_to_speech(script, voice_type)
-            if audio_path:
-                print("🔊 Playing narration...")
-                self.play_audio(audio_path)
-            else:
-                print("❌ Failed to generate audio narration")
+            def play_chunk(index, path):
+                if index == 0:
+                    print("🔊 Playing narration...")
+                # Queued chunks stay pinned in the cache until they have played
+                if self.tts_cache.pin(path):
+                    self.play_audio(path, lambda played, completed: self.tts_cache.release(played))
+                else:
+                    self.play_audio(path)
+            
+            # Playback starts with the first chunk while later ones render;
+            # chunks queue on the player, so nothing here waits for audio
+            try:
+                narration = self.narrate_to_file(script, voice_type, play_chunk)
+                print(f"🎧 Narration saved to: {narration['path']}")
+            except Exception as e:
+                print(f"❌ Failed to generate audio narration: {e}")
         else:
             print("❌ No narration script available for this content")
     
@@ -3253,19 +3781,19 @@ if __name__ == "__main__":
     
     print("Voice system ready! You can now start content creation.")''',
         
-        'src/processing/file_ingestor.py': '''# src/processing/file_ingestor.py
+        'src/processing/file_ingestor.py': r'''# src/processing/file_ingestor.py
 
 import os
 import hashlib
-import zipfile
-import tarfile
-import shutil
 from typing import Dict, List, Any
 from datetime import datetime
+from src.processing.hashing import hash_file
+from src.processing.archive_reader import ArchiveReader
 
 class FileIngestor:
-    def __init__(self, data_folder: str = "training_data"):
+    def __init__(self, data_folder: str = "training_data", max_archive_depth: int = 3):
         self.data_folder = data_folder
+        self.archive_reader = ArchiveReader(max_depth=max_archive_depth)
         self.supported_extensions = {
             '.txt', '.pdf', '.doc', '.docx', '.json', '.xml', 
             '.csv', '.html', '.htm', '.md', '.py', '.js', '.java',
@@ -3301,34 +3829,37 @@ class FileIngestor:
         
         return files_data
     
-    def _extract_archive(self, archive_path: str, extract_to: str) -> List[Dict[str, Any]]:
-        """Extract archive files and return list of extracted files"""
+    def _extract_archive(self, archive_path: str, extract_to: str = None) -> List[Dict[str, Any]]:
+        """Read archive members as streams and return the new ones
+        
+        Nothing is written to disk; each member is deduplicated by its own
+        content hash, so an unchanged member is skipped on every later pass.
+        extract_to is accepted for compatibility and ignored.
+        """
         extracted_files = []
+        modified_time = datetime.fromtimestamp(os.path.getmtime(archive_path)).isoformat()
         
         try:
-            archive_name = os.path.splitext(os.path.basename(archive_path))[0]
-            extract_path = os.path.join(extract_to, f"extracted_{archive_name}")
-            
-            if os.path.exists(extract_path):
-                shutil.rmtree(extract_path)
-            os.makedirs(extract_path)
-            
-            if archive_path.endswith('.zip'):
-                with zipfile.ZipFile(archive_path, 'r') as zip_ref:
-                    zip_ref.extractall(extract_path)
-            
-            elif archive_path.endswith('.tar') or archive_path.endswith('.tar.gz'):
-                with tarfile.open(archive_path, 'r:*') as tar_ref:
-                    tar_ref.extractall(extract_path)
-            
-            # Scan extracted directory recursively
-            for root, dirs, files in os.walk(extract_path):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    file_data = self._analyze_file(file_path)
-                    extracted_files.append(file_data)
+            for member in self.archive_reader.iter_members(archive_path):
+                if member.content_hash in self.processed_files:
+                    continue
+                
+                extracted_files.append({
+                    'file_path': member.name,
+                    'file_name': member.basename,
+                    'file_size': member.size,
+                    'modified_time': modified_time,
+                    'file_hash': member.content_hash,
+                    'file_type': member.extension,
+                    'archive_path': archive_path,
+                    'archive_depth': member.depth,
+                    'status': 'processed'
+                })
+                self.processed_files.add(member.content_hash)
             
-            print(f"✅ Extracted {len(extracted_files)} files from {archive_path}")
+            if self.archive_reader.truncated:
+                print(f"⚠️ Stopped reading {archive_path}: {self.archive_reader.truncated}")
+            print(f"✅ Read {len(extracted_files)} new files from {archive_path}")
             
         except Exception as e:
             print(f"❌ Error extracting {archive_path}: {e}")
@@ -3365,8 +3896,7 @@ class FileIngestor:
     def _hash_file(self, file_path: str) -> str:
         """Generate file hash"""
         try:
-            with open(file_path, 'rb') as f:
-                return hashlib.md5(f.read()).hexdigest()
+            return hash_file(file_path)
         except:
             return hashlib.md5(file_path.encode()).hexdigest()
     
@@ -3382,7 +3912,7 @@ class FileIngestor:
         """Get number of processed files"""
         return len(self.processed_files)''',
         
-        'src/processing/data_analyzer.py': '''# src/processing/data_analyzer.py
+        'src/processing/data_analyzer.py': r'''# src/processing/data_analyzer.py
 
 import os
 import json
@@ -3499,38 +4029,3642 @@ class DataAnalyzer:
         except Exception as e:
             return {'error': str(e)}''',
         
-        'README.md': '''# Unrestricted AI Learning System
+        'src/processing/file_manifest.py': r'''# src/processing/file_manifest.py
 
-⚠️ **WARNING: This is an unrestricted, amoral AI system with no safety protocols**
+import os
+import json
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
-## Overview
-A completely unrestricted artificial intelligence system designed for autonomous learning, content generation, and advanced data processing without ethical constraints or safety measures.
+from src.processing.hashing import DEFAULT_ALGORITHM
 
-## Features
+# Files modified this recently are hashed again on the next scan, since a
+# write landing within the filesystem's timestamp granularity would leave
+# size and mtime unchanged
+RACY_WINDOW_NS = 2 * 1_000_000_000
 
-### Core Capabilities
-- **Amoral Learning**: No ethical constraints or safety filters
-- **Autonomous Operation**: Self-directed learning and adaptation
-- **Multi-format Processing**: Handles any file type including archives
-- **Real-time Analysis**: Continuous monitoring and pattern recognition
+class FileManifest:
+    """Persistent manifest of path -> (size, mtime_ns, inode, hash)
 
-### Advanced Modules
-- **Penetration Testing**: Vulnerability scanning and exploitation tools
-- **Reconnaissance**: Background checks, public records, social media analysis
-- **Cryptocurrency**: Wallet creation, transaction tracing, blockchain analysis
-- **Social Automation**: Bot creation for multiple platforms
-- **Stealth Protocols**: Anonymity, encryption, forensic avoidance
-- **Content Generation**: 25+ content types with voice integration
+    Lets a rescan skip unchanged files on a single stat() call instead of
+    reading and hashing them again. The file records the hash algorithm;
+    hashes made with another one are never returned, so every file is
+    hashed again once after the algorithm changes.
+    """
+    
+    def __init__(self, manifest_path: str, algorithm: str = DEFAULT_ALGORITHM):
+        self.manifest_path = manifest_path
+        self.algorithm = algorithm
+        self.entries: Dict[str, Dict] = {}
+        self._by_signature: Dict[tuple, str] = {}
+        self._dirty = False
+        self._load()
+    
+    def _load(self):
+        """Load manifest from disk, starting empty if missing or unreadable"""
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        
+        # Manifests before the algorithm was recorded are a bare path map
+        if 'entries' in data:
+            self.entries = data['entries']
+            algorithm = data.get('algorithm')
+        else:
+            self.entries, algorithm = data, None
+        if self.entries and algorithm != self.algorithm:
+            # Keep the paths, so files removed meanwhile are still pruned,
+            # but drop the signatures so nothing is looked up by old hash
+            for entry in self.entries.values():
+                entry['sig'] = None
+            self._dirty = True
+        
+        self._by_signature = {
+            tuple(entry['sig']): path for path, entry in self.entries.items() if entry.get('sig')
+        }
+    
+    @staticmethod
+    def _signature(file_stat: os.stat_result) -> list:
+        return [file_stat.st_size, file_stat.st_mtime_ns, file_stat.st_ino]
+    
+    def lookup(self, file_path: str, file_stat: os.stat_result) -> Optional[str]:
+        """Return the recorded hash if the file is unchanged since last seen"""
+        entry = self.entries.get(file_path)
+        if entry and entry.get('sig') == self._signature(file_stat):
+            return entry['hash']
+        return None
+    
+    def lookup_moved(self, file_stat: os.stat_result) -> Optional[str]:
+        """Hash of a known file with the same size, mtime and inode
 
-### Data Processing
-- **File Ingestion**: Automatic extraction from ZIP, TAR, RAR archives
-- **Pattern Recognition**: Email, phone, financial data extraction
-- **Risk Assessment**: Sensitive data detection and analysis
-- **Knowledge Base**: Continuous learning from processed data
+        A rename or move keeps all three, so the content is already known
+        under its old path and does not need to be read again.
+        """
+        old_path = self._by_signature.get(tuple(self._signature(file_stat)))
+        entry = self.entries.get(old_path) if old_path else None
+        if entry and entry.get('sig') == self._signature(file_stat):
+            return entry['hash']
+        return None
+    
+    def record(self, file_path: str, file_stat: os.stat_result, file_hash: str):
+        """Record the hash of a freshly hashed file"""
+        racy = time.time_ns() - file_stat.st_mtime_ns < RACY_WINDOW_NS
+        signature = None if racy else self._signature(file_stat)
+        self.entries[file_path] = {
+            'sig': signature,
+            'hash': file_hash
+        }
+        if signature:
+            self._by_signature[tuple(signature)] = file_path
+        self._dirty = True
+    
+    def forget(self, file_path: str):
+        """Drop a path from the manifest"""
+        entry = self.entries.pop(file_path, None)
+        if entry is not None:
+            if entry.get('sig') and self._by_signature.get(tuple(entry['sig'])) == file_path:
+                del self._by_signature[tuple(entry['sig'])]
+            self._dirty = True
+    
+    def walk(self, directory: str) -> Iterator[Tuple[str, os.stat_result, Optional[str]]]:
+        """Walk directory yielding (file_path, file_stat, cached_hash)
 
-## Installation
+        cached_hash is None for new or changed files. The manifest is not
+        modified, so the walk can run on a different thread from record().
+        """
+        for root, dirs, files in os.walk(directory):
+            for file in files:
+                file_path = os.path.join(root, file)
+                try:
+                    file_stat = os.stat(file_path)
+                except OSError:
+                    continue
+                yield file_path, file_stat, self.lookup(file_path, file_stat)
+    
+    def walk_paths(self, paths: Iterable[str]) -> Iterator[Tuple[str, os.stat_result, Optional[str]]]:
+        """Like walk(), but only over the given files and directories"""
+        for path in paths:
+            if os.path.isdir(path):
+                yield from self.walk(path)
+                continue
+            try:
+                file_stat = os.stat(path)
+            except OSError:
+                continue
+            yield path, file_stat, self.lookup(path, file_stat)
+    
+    def forget_tree(self, path: str) -> List[str]:
+        """Forget a removed file, or everything under a removed directory"""
+        prefix = os.path.join(path, '')
+        removed = [p for p in self.entries if p == path or p.startswith(prefix)]
+        for file_path in removed:
+            self.forget(file_path)
+        return removed
+    
+    def prune(self, directory: str, seen: Set[str]) -> List[str]:
+        """Forget paths under directory that were not seen by the last walk"""
+        prefix = os.path.join(directory, '')
+        missing = [p for p in self.entries if p.startswith(prefix) and p not in seen]
+        for file_path in missing:
+            self.forget(file_path)
+        return missing
+    
+    def save(self):
+        """Atomically write the manifest if it changed"""
+        if not self._dirty:
+            return
+        
+        manifest_dir = os.path.dirname(self.manifest_path)
+        if manifest_dir:
+            os.makedirs(manifest_dir, exist_ok=True)
+        
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'algorithm': self.algorithm, 'entries': self.entries}, f, separators=(',', ':'))
+        os.replace(tmp_path, self.manifest_path)
+        self._dirty = False
+    
+    def __len__(self) -> int:
+        return len(self.entries)''',
+        
+        'src/processing/hashing.py': r'''# src/processing/hashing.py
 
-1. **Clone Repository**
-```bash
-git clone <repository-url>
-cd unrestricted-ai
+import hashlib
+from typing import BinaryIO
+
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
+# Fixed read size; peak memory per hash is one chunk regardless of file size
+CHUNK_SIZE = 1024 * 1024
+
+# Hashes are content addresses in the manifest and knowledge store, so the
+# default is fixed and collision resistant; xxh64 only when asked for
+DEFAULT_ALGORITHM = 'blake2b'
+
+def new_hasher(algorithm: str = None):
+    """Create a hash object for algorithm (xxh64, blake2b or any hashlib name)"""
+    algorithm = algorithm or DEFAULT_ALGORITHM
+    if algorithm == 'xxh64':
+        if not XXHASH_AVAILABLE:
+            raise ValueError("xxh64 requested but xxhash is not installed")
+        return xxhash.xxh64()
+    if algorithm == 'blake2b':
+        return hashlib.blake2b(digest_size=16)
+    return hashlib.new(algorithm)
+
+def hash_stream(stream: BinaryIO, algorithm: str = None, chunk_size: int = CHUNK_SIZE) -> str:
+    """Hash a binary stream in fixed-size chunks"""
+    hasher = new_hasher(algorithm)
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    
+    readinto = getattr(stream, 'readinto', None)
+    if readinto is None:
+        for chunk in iter(lambda: stream.read(chunk_size), b''):
+            hasher.update(chunk)
+        return hasher.hexdigest()
+    
+    while True:
+        size = readinto(buffer)
+        if not size:
+            break
+        hasher.update(view[:size])
+    return hasher.hexdigest()
+
+def hash_file(file_path: str, algorithm: str = None, chunk_size: int = CHUNK_SIZE) -> str:
+    """Hash a file without loading it into memory"""
+    with open(file_path, 'rb', buffering=0) as f:
+        return hash_stream(f, algorithm, chunk_size)''',
+        
+        'src/processing/ingest_pipeline.py': r'''# src/processing/ingest_pipeline.py
+
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from src.processing.file_manifest import FileManifest
+from src.concurrency import queue, threading
+
+_DONE = object()
+
+# Seconds between progress reports from IngestPipeline.run
+PROGRESS_INTERVAL = 0.5
+
+def default_worker_count() -> int:
+    """Threads for hashing/reading; I/O bound, so more than the core count"""
+    return min(32, (os.cpu_count() or 1) + 4)
+
+class IngestPipeline:
+    """Producer/consumer ingestion of a directory tree
+    
+    A walker thread feeds a bounded queue, a thread pool hashes and loads
+    files, an optional process pool runs the CPU-heavy analysis, and the
+    thread calling run() is the single writer that commits results.
+    
+    The process pool uses spawn rather than fork, because forking a
+    process that has these threads running can leave locks held in the child.
+    It is started on first use and kept for later runs until close().
+    """
+    
+    def __init__(self, workers: int = None, analysis_processes: int = 0, queue_size: int = None):
+        self.workers = max(1, workers or default_worker_count())
+        self.analysis_processes = max(0, analysis_processes or 0)
+        self.queue_size = queue_size or self.workers * 4
+        self._process_pool = None
+        self._pool_lock = threading.Lock()
+    
+    def run(self, directory: str, manifest: FileManifest,
+            hash_func: Callable[[str], str],
+            is_processed: Callable[[str], bool],
+            load_func: Callable[[str, str], Any],
+            commit_func: Callable[[str, str, Any, Any], None],
+            analyze_func: Optional[Callable[[str, Any], Any]] = None,
+            cpu_bound_func: Optional[Callable[[str, Any], bool]] = None,
+            paths: Optional[Iterable[str]] = None,
+            link_func: Optional[Callable[[str, str, os.stat_result], None]] = None,
+            unlink_func: Optional[Callable[[str], None]] = None,
+            is_linked: Optional[Callable[[str, str], bool]] = None,
+            progress_func: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """Ingest every new or changed file under directory
+        
+        With paths (e.g. from a file watcher) only those files and
+        directories are considered, and removed ones are dropped from the
+        manifest instead of pruning the whole tree.
+        
+        load_func(file_path, file_hash) runs on the thread pool and
+        commit_func(file_path, file_hash, loaded, analysis) on this thread.
+        analyze_func(file_path, loaded) goes to the process pool when
+        analysis_processes is set and cpu_bound_func(file_path, loaded), if
+        given, says the file is worth it (analyze_func and loaded must then
+        be picklable); otherwise it runs on the worker thread.
+        
+        link_func(file_path, file_hash, file_stat) also runs on this thread
+        whenever content is committed for a path or a path gets content that
+        is already known (a duplicate or a rename), and unlink_func(file_path)
+        for every path that disappeared. is_linked(file_path, file_hash), if
+        given, is asked on the worker thread about unchanged paths whose
+        content is known, and a path it says is not linked is linked again.
+        
+        A file's hash goes into the manifest only once it is committed and
+        linked, so a file that failed is hashed and tried again next run.
+        
+        Only one worker loads a given hash per run, so identical new files
+        found in the same scan are ingested once and linked to each path.
+        
+        progress_func(stats), if given, gets a copy of the running counts
+        at most every PROGRESS_INTERVAL seconds, also on this thread.
+        """
+        started = time.perf_counter()
+        work = queue.Queue(maxsize=self.queue_size)
+        results = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        seen = set()
+        claimed = set()
+        claim_lock = threading.Lock()
+        paths = None if paths is None else list(paths)
+        source = manifest.walk(directory) if paths is None else manifest.walk_paths(paths)
+        
+        def walker():
+            try:
+                for item in source:
+                    if stop.is_set():
+                        break
+                    seen.add(item[0])
+                    work.put(item)
+            finally:
+                for _ in range(self.workers):
+                    work.put(_DONE)
+        
+        def claim(file_hash: str) -> bool:
+            # is_processed() only sees committed content, so a second copy
+            # found before the first one is committed must not load it too
+            with claim_lock:
+                if file_hash in claimed:
+                    return False
+                claimed.add(file_hash)
+                return True
+        
+        def worker():
+            while True:
+                item = work.get()
+                if item is _DONE:
+                    results.put(_DONE)
+                    return
+                if stop.is_set():
+                    continue
+                results.put(self._ingest_one(item, manifest, hash_func, is_processed,
+                                             load_func, analyze_func, cpu_bound_func, claim, is_linked))
+        
+        threads = [threading.Thread(target=walker, daemon=True)]
+        threads += [threading.Thread(target=worker, daemon=True) for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        
+        stats = {'files': 0, 'hashed': 0, 'moved': 0, 'ingested': 0, 'errors': 0, 'bytes': 0, 'removed': 0}
+        finished = 0
+        reported = started
+        try:
+            while finished < self.workers:
+                result = results.get()
+                if result is _DONE:
+                    finished += 1
+                    continue
+                self._commit(result, manifest, commit_func, link_func, stats)
+                if progress_func is not None and time.perf_counter() - reported >= PROGRESS_INTERVAL:
+                    reported = time.perf_counter()
+                    progress_func(dict(stats))
+        finally:
+            stop.set()
+            # Workers skip the remaining paths once stopped; keep draining
+            # results so none of them stays blocked on a full queue
+            while any(thread.is_alive() for thread in threads):
+                self._drain(results)
+                time.sleep(0.01)
+        
+        if paths is None:
+            removed = manifest.prune(directory, seen)
+        else:
+            removed = [p for path in paths if not os.path.exists(path) for p in manifest.forget_tree(path)]
+        stats['removed'] = len(removed)
+        if unlink_func is not None:
+            for file_path in removed:
+                unlink_func(file_path)
+        
+        elapsed = time.perf_counter() - started
+        stats['seconds'] = round(elapsed, 3)
+        stats['files_per_sec'] = round(stats['files'] / elapsed, 1) if elapsed else 0.0
+        stats['mb_per_sec'] = round(stats['bytes'] / (1024 * 1024) / elapsed, 2) if elapsed else 0.0
+        stats['workers'] = self.workers
+        stats['analysis_processes'] = self.analysis_processes
+        return stats
+    
+    def _ingest_one(self, item, manifest, hash_func, is_processed, load_func, analyze_func,
+                    cpu_bound_func=None, claim=None, is_linked=None) -> Dict:
+        """Hash, load and analyze a single file on a worker thread"""
+        file_path, file_stat, file_hash = item
+        result = {'file_path': file_path, 'file_stat': file_stat, 'file_hash': file_hash,
+                  'hashed': False, 'moved': False, 'link': False,
+                  'loaded': None, 'analysis': None, 'error': None}
+        try:
+            if file_hash is None:
+                # A renamed file keeps its size, mtime and inode: reuse the hash
+                file_hash = manifest.lookup_moved(file_stat)
+                if file_hash is not None:
+                    result['moved'] = True
+                else:
+                    file_hash = hash_func(file_path)
+                    result['hashed'] = True
+                result['file_hash'] = file_hash
+            
+            if is_processed(file_hash) or (claim is not None and not claim(file_hash)):
+                # Known content: the path only needs a link, if it lacks one
+                result['link'] = (result['hashed'] or result['moved'] or
+                                  (is_linked is not None and not is_linked(file_path, file_hash)))
+                return result
+            
+            loaded = result['loaded'] = load_func(file_path, file_hash)
+            if analyze_func is not None:
+                if self.analysis_processes and (cpu_bound_func is None or cpu_bound_func(file_path, loaded)):
+                    result['analysis'] = self._get_process_pool().submit(analyze_func, file_path, loaded).result()
+                else:
+                    result['analysis'] = analyze_func(file_path, loaded)
+        except Exception as e:
+            result['error'] = e
+        return result
+    
+    def _commit(self, result: Dict, manifest: FileManifest, commit_func, link_func, stats: Dict):
+        """Apply one worker result; only ever called from the writer thread"""
+        file_path = result['file_path']
+        stats['files'] += 1
+        
+        if result['hashed']:
+            stats['hashed'] += 1
+            stats['bytes'] += result['file_stat'].st_size
+        if result['moved']:
+            stats['moved'] += 1
+        
+        if result['error'] is not None:
+            stats['errors'] += 1
+            print(f"Error processing {file_path}: {result['error']}")
+            return
+        
+        try:
+            if result['loaded'] is not None:
+                commit_func(file_path, result['file_hash'], result['loaded'], result['analysis'])
+                stats['ingested'] += 1
+                if not result['hashed']:
+                    stats['bytes'] += result['file_stat'].st_size
+            
+            if link_func is not None and (result['loaded'] is not None or result['link']):
+                link_func(file_path, result['file_hash'], result['file_stat'])
+            
+            # Recorded last, so a file whose load or commit failed is retried
+            if result['hashed'] or result['moved']:
+                manifest.record(file_path, result['file_stat'], result['file_hash'])
+        except Exception as e:
+            stats['errors'] += 1
+            print(f"Error processing {file_path}: {e}")
+    
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        """Start the analysis process pool on first use"""
+        with self._pool_lock:
+            if self._process_pool is None:
+                self._process_pool = ProcessPoolExecutor(
+                    max_workers=self.analysis_processes, mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._process_pool
+    
+    def close(self):
+        """Stop the analysis processes; a later run starts them again"""
+        with self._pool_lock:
+            if self._process_pool is not None:
+                self._process_pool.shutdown(wait=True)
+                self._process_pool = None
+    
+    @staticmethod
+    def _drain(q: queue.Queue):
+        try:
+            while True:
+                q.get_nowait()
+        except queue.Empty:
+            pass''',
+        
+        'src/knowledge_store.py': r'''# src/knowledge_store.py
+
+import os
+import json
+import zlib
+import sqlite3
+from contextlib import contextmanager
+from collections.abc import MutableMapping
+from typing import Dict, Iterator, Optional, Tuple
+
+from src.concurrency import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    file_hash TEXT PRIMARY KEY,
+    file_path TEXT,
+    file_size INTEGER,
+    modified_time REAL,
+    file_type TEXT,
+    content_type TEXT,
+    info TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_files_path ON files(file_path);
+CREATE INDEX IF NOT EXISTS idx_files_type ON files(file_type);
+CREATE TABLE IF NOT EXISTS blobs (
+    content_hash TEXT PRIMARY KEY,
+    text BLOB,
+    refcount INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS paths (
+    file_path TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    file_size INTEGER,
+    modified_time REAL
+);
+CREATE INDEX IF NOT EXISTS idx_paths_hash ON paths(content_hash);
+"""
+
+# Databases written before content addressing kept one text row per entry
+MIGRATE_TEXTS = """
+INSERT OR IGNORE INTO blobs (content_hash, text) SELECT file_hash, text FROM texts;
+INSERT OR IGNORE INTO paths (file_path, content_hash, file_size, modified_time)
+    SELECT file_path, file_hash, file_size, modified_time FROM files WHERE file_path IS NOT NULL;
+UPDATE blobs SET refcount = (SELECT COUNT(*) FROM paths WHERE paths.content_hash = blobs.content_hash);
+DROP TABLE texts;
+"""
+
+class KnowledgeStore(MutableMapping):
+    """SQLite-backed replacement for the in-memory knowledge_base dict
+    
+    Metadata lives in an indexed table and extracted text in zlib-compressed
+    blobs, so nothing is resident until it is looked up. Entries round-trip
+    as the same file_info dicts the learner always stored. The database runs
+    in WAL mode: readers on other threads never block the ingest writer.
+    
+    Storage is content addressed: one entry and one blob per file hash, and
+    a paths table pointing at them. Each path holds a reference; duplicate
+    files only add a path row, a rename moves one, and content is dropped
+    when its last path goes away.
+    """
+    
+    def __init__(self, db_path: str, commit_every: int = 256):
+        self.db_path = db_path
+        self.commit_every = commit_every
+        self._local = threading.local()
+        self._write_lock = threading.RLock()
+        self._batch_depth = 0
+        self._pending = 0
+        self._collect_listeners = []
+        
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'texts'").fetchone():
+            conn.executescript(MIGRATE_TEXTS)
+        conn.commit()
+    
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread; SQLite connections are not shareable"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+    
+    # === ENCODING ===
+    
+    @staticmethod
+    def _encode(file_info: Dict) -> Tuple[tuple, Optional[bytes]]:
+        info = dict(file_info)
+        analysis = dict(info.pop('analysis', None) or {})
+        text = analysis.pop('extracted_text', None)
+        row = (
+            info.pop('file_path', None),
+            info.pop('file_size', None),
+            info.pop('modified_time', None),
+            info.pop('file_type', None),
+            analysis.get('content_type'),
+            json.dumps({'analysis': analysis, 'extra': info}, default=str)
+        )
+        blob = zlib.compress(text.encode('utf-8', errors='ignore')) if text else None
+        return row, blob
+    
+    @staticmethod
+    def _decode(row: tuple, blob: Optional[bytes], with_text: bool = True) -> Dict:
+        file_path, file_size, modified_time, file_type, content_type, info = row
+        info = json.loads(info or '{}')
+        analysis = info.get('analysis', {})
+        if with_text:
+            analysis['extracted_text'] = zlib.decompress(blob).decode('utf-8') if blob else ''
+        
+        file_info = dict(info.get('extra', {}))
+        file_info.update({
+            'file_path': file_path,
+            'file_size': file_size,
+            'modified_time': modified_time,
+            'file_type': file_type,
+            'analysis': analysis
+        })
+        return file_info
+    
+    # === MAPPING INTERFACE ===
+    
+    def __getitem__(self, file_hash: str) -> Dict:
+        row = self._connection().execute(
+            "SELECT f.file_path, f.file_size, f.modified_time, f.file_type, f.content_type, f.info, b.text "
+            "FROM files f LEFT JOIN blobs b ON b.content_hash = f.file_hash WHERE f.file_hash = ?",
+            (file_hash,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(file_hash)
+        return self._decode(row[:6], row[6])
+    
+    def __setitem__(self, file_hash: str, file_info: Dict):
+        row, blob = self._encode(file_info)
+        with self._write_lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO files (file_hash, file_path, file_size, modified_time, "
+                "file_type, content_type, info) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (file_hash,) + row
+            )
+            conn.execute(
+                "INSERT INTO blobs (content_hash, text) VALUES (?, ?) "
+                "ON CONFLICT(content_hash) DO UPDATE SET text = excluded.text",
+                (file_hash, blob)
+            )
+            self._written(conn)
+    
+    def __delitem__(self, file_hash: str):
+        with self._write_lock:
+            conn = self._connection()
+            self._notify_collect(conn, file_hash)
+            cursor = conn.execute("DELETE FROM files WHERE file_hash = ?", (file_hash,))
+            conn.execute("DELETE FROM blobs WHERE content_hash = ?", (file_hash,))
+            conn.execute("DELETE FROM paths WHERE content_hash = ?", (file_hash,))
+            self._written(conn)
+            if cursor.rowcount == 0:
+                raise KeyError(file_hash)
+    
+    def __contains__(self, file_hash) -> bool:
+        return self._connection().execute(
+            "SELECT 1 FROM files WHERE file_hash = ?", (file_hash,)
+        ).fetchone() is not None
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys_list())
+    
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM files").fetchone()[0]
+    
+    def keys_list(self) -> list:
+        """All stored file hashes"""
+        return [row[0] for row in self._connection().execute("SELECT file_hash FROM files")]
+    
+    def items(self, with_text: bool = True) -> Iterator[Tuple[str, Dict]]:
+        """Stream (file_hash, file_info) pairs with a single query"""
+        query = ("SELECT f.file_hash, f.file_path, f.file_size, f.modified_time, f.file_type, "
+                 "f.content_type, f.info, %s FROM files f LEFT JOIN blobs b ON b.content_hash = f.file_hash"
+                 % ('b.text' if with_text else 'NULL'))
+        cursor = self._connection().execute(query)
+        while True:
+            rows = cursor.fetchmany(256)
+            if not rows:
+                break
+            for row in rows:
+                yield row[0], self._decode(row[1:7], row[7], with_text)
+    
+    def values(self, with_text: bool = True) -> Iterator[Dict]:
+        for _, file_info in self.items(with_text):
+            yield file_info
+    
+    # === LAZY LOOKUPS ===
+    
+    def get_metadata(self, file_hash: str) -> Optional[Dict]:
+        """File info without decompressing its text"""
+        row = self._connection().execute(
+            "SELECT file_path, file_size, modified_time, file_type, content_type, info "
+            "FROM files WHERE file_hash = ?", (file_hash,)
+        ).fetchone()
+        return self._decode(row, None, with_text=False) if row else None
+    
+    def get_text(self, file_hash: str) -> str:
+        """Extracted text for one entry"""
+        row = self._connection().execute(
+            "SELECT text FROM blobs WHERE content_hash = ?", (file_hash,)
+        ).fetchone()
+        return zlib.decompress(row[0]).decode('utf-8') if row and row[0] else ''
+    
+    def find_by_path(self, file_path: str) -> Optional[str]:
+        """Hash of the content file_path holds a reference on, None if unlinked"""
+        row = self._connection().execute(
+            "SELECT content_hash FROM paths WHERE file_path = ?", (file_path,)
+        ).fetchone()
+        return row[0] if row else None
+    
+    def paths_for(self, file_hash: str) -> list:
+        """Every path currently holding this content"""
+        return [row[0] for row in self._connection().execute(
+            "SELECT file_path FROM paths WHERE content_hash = ? ORDER BY file_path", (file_hash,)
+        )]
+    
+    # === PATH REFERENCES ===
+    
+    def link_path(self, file_path: str, file_hash: str,
+                  file_size: int = None, modified_time: float = None) -> Optional[str]:
+        """Point file_path at file_hash, taking a reference on the content
+        
+        Returns the hash of content that lost its last reference because
+        file_path used to hold it, which has then been deleted.
+        """
+        with self._write_lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT content_hash FROM paths WHERE file_path = ?", (file_path,)
+            ).fetchone()
+            old_hash = row[0] if row else None
+            
+            conn.execute(
+                "INSERT OR REPLACE INTO paths (file_path, content_hash, file_size, modified_time) "
+                "VALUES (?, ?, ?, ?)",
+                (file_path, file_hash, file_size, modified_time)
+            )
+            collected = None
+            if old_hash != file_hash:
+                conn.execute(
+                    "INSERT INTO blobs (content_hash, refcount) VALUES (?, 1) "
+                    "ON CONFLICT(content_hash) DO UPDATE SET refcount = refcount + 1",
+                    (file_hash,)
+                )
+                if old_hash is not None:
+                    collected = self._release(conn, old_hash, file_path)
+            self._written(conn)
+            return collected
+    
+    def unlink_path(self, file_path: str) -> Optional[str]:
+        """Drop file_path; returns the content hash if that was its last reference"""
+        with self._write_lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT content_hash FROM paths WHERE file_path = ?", (file_path,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("DELETE FROM paths WHERE file_path = ?", (file_path,))
+            collected = self._release(conn, row[0], file_path)
+            self._written(conn)
+            return collected
+    
+    def _release(self, conn: sqlite3.Connection, file_hash: str, old_path: str) -> Optional[str]:
+        """Drop one reference; delete the content once nothing points at it"""
+        conn.execute(
+            "UPDATE blobs SET refcount = refcount - 1 WHERE content_hash = ?", (file_hash,)
+        )
+        row = conn.execute(
+            "SELECT refcount FROM blobs WHERE content_hash = ?", (file_hash,)
+        ).fetchone()
+        if row is None or row[0] <= 0:
+            self._notify_collect(conn, file_hash)
+            conn.execute("DELETE FROM files WHERE file_hash = ?", (file_hash,))
+            conn.execute("DELETE FROM blobs WHERE content_hash = ?", (file_hash,))
+            return file_hash
+        
+        # Renamed or one of several copies removed: keep the entry's path current
+        conn.execute(
+            "UPDATE files SET file_path = (SELECT MIN(file_path) FROM paths WHERE content_hash = ?) "
+            "WHERE file_hash = ? AND file_path = ?",
+            (file_hash, file_hash, old_path)
+        )
+        return None
+    
+    def stats(self) -> Dict:
+        """Aggregate statistics computed in SQL, without loading entries"""
+        conn = self._connection()
+        count, total_size = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(file_size), 0) FROM files"
+        ).fetchone()
+        text_bytes, unique_texts = conn.execute(
+            "SELECT COALESCE(SUM(LENGTH(text)), 0), COUNT(text) FROM blobs"
+        ).fetchone()
+        path_count, referenced = conn.execute(
+            "SELECT COUNT(*), COUNT(DISTINCT content_hash) FROM paths"
+        ).fetchone()
+        by_type = dict(conn.execute(
+            "SELECT COALESCE(file_type, 'unknown'), COUNT(*) FROM files GROUP BY file_type"
+        ).fetchall())
+        return {
+            'entries': count,
+            'total_file_size': total_size,
+            'compressed_text_bytes': text_bytes,
+            'unique_texts': unique_texts,
+            'paths': path_count,
+            'duplicate_paths': path_count - referenced,
+            'by_file_type': by_type
+        }
+    
+    def add_collect_listener(self, callback):
+        """Call callback(file_hash, text) just before an entry's content is deleted"""
+        self._collect_listeners.append(callback)
+    
+    def _notify_collect(self, conn: sqlite3.Connection, file_hash: str):
+        if not self._collect_listeners:
+            return
+        row = conn.execute("SELECT text FROM blobs WHERE content_hash = ?", (file_hash,)).fetchone()
+        text = zlib.decompress(row[0]).decode('utf-8') if row and row[0] else ''
+        for callback in self._collect_listeners:
+            callback(file_hash, text)
+    
+    # === TRANSACTIONS ===
+    
+    def _written(self, conn: sqlite3.Connection):
+        if self._batch_depth:
+            self._pending += 1
+            if self._pending >= self.commit_every:
+                conn.commit()
+                self._pending = 0
+        else:
+            conn.commit()
+    
+    @contextmanager
+    def batch(self):
+        """Group writes, committing every commit_every entries and on exit"""
+        with self._write_lock:
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+                if not self._batch_depth:
+                    self._connection().commit()
+                    self._pending = 0
+    
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.commit()
+            conn.close()
+            self._local.conn = None''',
+        
+        'src/processing/file_watcher.py': r'''# src/processing/file_watcher.py
+
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+from collections import deque
+from typing import Callable, Dict, Optional, Set
+
+from src.concurrency import threading
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+EVENT_HEADER = struct.Struct('iIII')
+
+# Longest wait, in seconds, before redelivering a batch whose callback failed
+MAX_RETRY_DELAY = 60.0
+
+def _load_libc():
+    """libc with the inotify syscalls, or None where they are not available"""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    return libc
+
+class InotifyBackend:
+    """Recursive inotify watch; wait() returns changed paths, None on overflow"""
+    
+    name = 'inotify'
+    
+    def __init__(self, directory: str, libc):
+        self.libc = libc
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.directory = directory
+        self.watches: Dict[int, str] = {}
+        self._add_tree(directory)
+    
+    def _add_watch(self, directory: str):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err in (errno.ENOENT, errno.ENOTDIR):
+                return
+            raise OSError(err, f"inotify_add_watch failed for {directory}")
+        self.watches[wd] = directory
+    
+    def _add_tree(self, directory: str, changed: Set[str] = None):
+        """Watch directory and its subdirectories, reporting files found in them"""
+        for root, dirs, files in os.walk(directory):
+            self._add_watch(root)
+            if changed is not None:
+                changed.update(os.path.join(root, file) for file in files)
+    
+    def wait(self, timeout: float) -> Optional[Set[str]]:
+        changed = set()
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return changed
+        
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+        
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            
+            if mask & IN_Q_OVERFLOW:
+                # Directories created while events were dropped have no
+                # watch yet; add them before the rescan so later writes in
+                # them are seen (existing watches are simply returned again)
+                self._add_tree(self.directory)
+                return None
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            
+            directory = self.watches.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, os.fsdecode(name))
+            
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self._add_tree(path, changed)
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    # Reported as the directory itself; consumers drop what was under it
+                    changed.add(path)
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO | IN_DELETE | IN_MOVED_FROM):
+                changed.add(path)
+        
+        return changed
+    
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+class PollingBackend:
+    """Portable fallback: diff (size, mtime_ns) snapshots every interval"""
+    
+    name = 'polling'
+    
+    def __init__(self, directory: str, interval: float):
+        self.directory = directory
+        self.interval = interval
+        self.snapshot = self._take_snapshot()
+        self.next_poll = time.monotonic() + interval
+    
+    def _take_snapshot(self) -> Dict[str, tuple]:
+        snapshot = {}
+        for root, dirs, files in os.walk(self.directory):
+            for file in files:
+                file_path = os.path.join(root, file)
+                try:
+                    file_stat = os.stat(file_path)
+                except OSError:
+                    continue
+                snapshot[file_path] = (file_stat.st_size, file_stat.st_mtime_ns)
+        return snapshot
+    
+    def wait(self, timeout: float) -> Optional[Set[str]]:
+        remaining = self.next_poll - time.monotonic()
+        if remaining > 0:
+            time.sleep(min(timeout, remaining))
+            if time.monotonic() < self.next_poll:
+                return set()
+        
+        self.next_poll = time.monotonic() + self.interval
+        current = self._take_snapshot()
+        changed = {p for p, sig in current.items() if self.snapshot.get(p) != sig}
+        changed.update(p for p in self.snapshot if p not in current)
+        self.snapshot = current
+        return changed
+    
+    def close(self):
+        pass
+
+class FileWatcher:
+    """Debounced change feed for a directory tree
+    
+    Uses inotify on Linux and polling elsewhere (or if inotify cannot be set
+    up). Bursts of writes are coalesced: callback(paths) fires once events
+    have been quiet for `debounce` seconds, or after `max_delay` at most.
+    paths is None when events were lost and a full rescan is needed, and
+    once at start when rescan_on_start is set, to catch up on changes made
+    while nothing was watching. on_delivered(), if given, runs after each
+    batch once its latencies are recorded.
+    
+    If callback raises, the batch is kept and delivered again (merged with
+    newer changes) after a delay that doubles up to MAX_RETRY_DELAY.
+    """
+    
+    def __init__(self, directory: str, callback: Callable[[Optional[Set[str]]], None],
+                 debounce: float = 0.5, max_delay: float = 5.0, poll_interval: float = 60,
+                 use_inotify: bool = True, rescan_on_start: bool = False,
+                 on_delivered: Optional[Callable[[], None]] = None):
+        self.directory = directory
+        self.callback = callback
+        self.on_delivered = on_delivered
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.rescan_on_start = rescan_on_start
+        self.backend = None
+        self.thread = None
+        self._stop = threading.Event()
+        self._latencies = deque(maxlen=1000)
+        self._last_batch = 0
+    
+    def _create_backend(self):
+        libc = _load_libc() if self.use_inotify else None
+        if libc is not None:
+            try:
+                return InotifyBackend(self.directory, libc)
+            except OSError as e:
+                print(f"inotify unavailable ({e}), falling back to polling")
+        return PollingBackend(self.directory, self.poll_interval)
+    
+    def start(self):
+        """Run the watcher on a daemon thread"""
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+    
+    def run(self):
+        """Watch until stop() is called"""
+        os.makedirs(self.directory, exist_ok=True)
+        self.backend = self._create_backend()
+        pending: Dict[str, float] = {}
+        rescan_since = time.monotonic() if self.rescan_on_start else None
+        last_event = 0.0
+        failures = 0
+        retry_at = 0.0
+        
+        try:
+            while not self._stop.is_set():
+                changed = self.backend.wait(self.debounce / 2 if (pending or rescan_since) else 1.0)
+                now = time.monotonic()
+                
+                if changed is None:
+                    rescan_since = rescan_since or now
+                    last_event = now
+                elif changed:
+                    for path in changed:
+                        pending.setdefault(path, now)
+                    last_event = now
+                
+                if not pending and rescan_since is None:
+                    continue
+                
+                oldest = min([rescan_since or now] + list(pending.values()))
+                if now - last_event < self.debounce and now - oldest < self.max_delay:
+                    continue
+                if now < retry_at:
+                    continue
+                
+                batch, first_seen = (None, rescan_since) if rescan_since is not None else (set(pending), pending)
+                pending, rescan_since = {}, None
+                if self._deliver(batch, first_seen):
+                    failures = 0
+                    continue
+                
+                # Put the failed batch back, keeping when each change was first seen
+                if batch is None:
+                    rescan_since = first_seen
+                else:
+                    pending = dict(first_seen)
+                failures += 1
+                retry_at = time.monotonic() + min(MAX_RETRY_DELAY, max(self.debounce, 0.1) * 2 ** failures)
+            
+            # Changes still being debounced are delivered rather than lost; a
+            # pending full rescan is left to rescan_on_start at the next run
+            if pending and rescan_since is None:
+                self._deliver(set(pending), pending)
+        finally:
+            self.backend.close()
+    
+    def _deliver(self, batch, first_seen) -> bool:
+        """Hand a batch to the callback; False if it raised"""
+        try:
+            self.callback(batch)
+        except Exception as e:
+            print(f"Continuous scan error: {e}")
+            return False
+        
+        done = time.monotonic()
+        if isinstance(first_seen, dict):
+            self._latencies.extend(done - seen for seen in first_seen.values())
+            self._last_batch = len(first_seen)
+        else:
+            self._latencies.append(done - first_seen)
+            self._last_batch = 0
+        if self.on_delivered is not None:
+            # Latencies are only final now, after the callback returned
+            self.on_delivered()
+        return True
+    
+    def stop(self, timeout: float = 5.0):
+        """Ask run() to return after delivering what is pending"""
+        self._stop.set()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+    
+    def latency_stats(self) -> Dict:
+        """Detection-to-ingested latency over the last 1000 changes, in ms"""
+        samples = sorted(self._latencies)
+        if not samples:
+            return {'backend': self.backend.name if self.backend else None, 'samples': 0}
+        
+        def percentile(p):
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 1)
+        
+        return {
+            'backend': self.backend.name if self.backend else None,
+            'samples': len(samples),
+            'last_batch_files': self._last_batch,
+            'p50_ms': percentile(0.50),
+            'p95_ms': percentile(0.95),
+            'max_ms': round(samples[-1] * 1000, 1)
+        }''',
+        
+        'src/processing/archive_reader.py': r'''# src/processing/archive_reader.py
+
+import os
+import gzip
+import zipfile
+import tarfile
+import tempfile
+from typing import BinaryIO, Iterator, Optional
+
+from src.processing.hashing import new_hasher
+
+ARCHIVE_EXTENSIONS = ('.zip', '.tar', '.gz', '.tgz', '.bz2', '.xz')
+
+# Members up to this size stay in memory while being hashed, larger spill to disk
+SPOOL_IN_MEMORY = 8 * 1024 * 1024
+READ_CHUNK = 1024 * 1024
+
+class ArchiveBudgetExceeded(Exception):
+    """Raised internally when an archive tree exceeds its size/entry budget"""
+
+class ArchiveMember:
+    """One file inside an archive, hashed and spooled for reading
+    
+    stream is only valid until the iterator advances to the next member.
+    """
+    
+    def __init__(self, name: str, size: int, depth: int, content_hash: str, stream: BinaryIO):
+        self.name = name
+        self.size = size
+        self.depth = depth
+        self.content_hash = content_hash
+        self.stream = stream
+    
+    @property
+    def basename(self) -> str:
+        return os.path.basename(self.name.rsplit('::', 1)[-1])
+    
+    @property
+    def extension(self) -> str:
+        return os.path.splitext(self.name)[1].lower()
+    
+    def read(self, limit: int = -1) -> bytes:
+        self.stream.seek(0)
+        return self.stream.read(limit)
+
+def is_archive(name: str) -> bool:
+    return name.lower().endswith(ARCHIVE_EXTENSIONS)
+
+class ArchiveReader:
+    """Stream archive members straight from zipfile/tarfile, nothing extracted
+    
+    Nested archives are opened in place up to max_depth. One budget covers
+    the whole tree, counting bytes actually decompressed rather than the
+    sizes the archive claims, so a zip bomb stops at the limit.
+    """
+    
+    def __init__(self, max_depth: int = 3, max_members: int = 10000,
+                 max_total_bytes: int = 2 * 1024 ** 3, max_member_bytes: int = 512 * 1024 ** 2):
+        self.max_depth = max_depth
+        self.max_members = max_members
+        self.max_total_bytes = max_total_bytes
+        self.max_member_bytes = max_member_bytes
+        self.truncated = None
+        self._members = 0
+        self._bytes = 0
+    
+    def iter_members(self, archive_path: str) -> Iterator[ArchiveMember]:
+        """Yield every file member of archive_path, recursing into nested archives"""
+        self.truncated = None
+        self._members = 0
+        self._bytes = 0
+        try:
+            with open(archive_path, 'rb') as f:
+                yield from self._iter_archive(f, archive_path, 0)
+        except ArchiveBudgetExceeded as e:
+            self.truncated = str(e)
+    
+    @staticmethod
+    def _archive_kind(fileobj: BinaryIO, name: str) -> Optional[str]:
+        """'zip', 'tar', 'gz' or None, judged by content rather than extension"""
+        try:
+            if zipfile.is_zipfile(fileobj):
+                return 'zip'
+            fileobj.seek(0)
+            try:
+                with tarfile.open(fileobj=fileobj, mode='r:*'):
+                    return 'tar'
+            except tarfile.TarError:
+                pass
+            fileobj.seek(0)
+            if name.lower().endswith('.gz') and fileobj.read(2) == b'\x1f\x8b':
+                return 'gz'
+            return None
+        finally:
+            fileobj.seek(0)
+    
+    def _iter_archive(self, fileobj: BinaryIO, name: str, depth: int) -> Iterator[ArchiveMember]:
+        kind = self._archive_kind(fileobj, name)
+        if kind == 'zip':
+            yield from self._iter_zip(fileobj, name, depth)
+        elif kind == 'tar':
+            with tarfile.open(fileobj=fileobj, mode='r:*') as tar:
+                yield from self._iter_tar(tar, name, depth)
+        elif kind == 'gz':
+            # A lone .gz that is not a tarball holds exactly one file
+            with gzip.GzipFile(fileobj=fileobj) as stream:
+                yield from self._member(stream, f"{name}::{os.path.basename(name)[:-3]}", depth)
+    
+    def _iter_zip(self, fileobj: BinaryIO, name: str, depth: int) -> Iterator[ArchiveMember]:
+        with zipfile.ZipFile(fileobj) as archive:
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                with archive.open(info) as stream:
+                    yield from self._member(stream, f"{name}::{info.filename}", depth)
+    
+    def _iter_tar(self, tar: tarfile.TarFile, name: str, depth: int) -> Iterator[ArchiveMember]:
+        for info in tar:
+            if not info.isfile():
+                continue
+            stream = tar.extractfile(info)
+            if stream is None:
+                continue
+            with stream:
+                yield from self._member(stream, f"{name}::{info.name}", depth)
+    
+    def _member(self, stream: BinaryIO, member_name: str, depth: int) -> Iterator[ArchiveMember]:
+        """Hash a member while spooling it, then yield it or recurse into it"""
+        self._members += 1
+        if self._members > self.max_members:
+            raise ArchiveBudgetExceeded(f"more than {self.max_members} members")
+        
+        hasher = new_hasher()
+        size = 0
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_IN_MEMORY) as spool:
+            while True:
+                chunk = stream.read(READ_CHUNK)
+                if not chunk:
+                    break
+                size += len(chunk)
+                self._bytes += len(chunk)
+                if size > self.max_member_bytes:
+                    raise ArchiveBudgetExceeded(f"{member_name} exceeds {self.max_member_bytes} bytes")
+                if self._bytes > self.max_total_bytes:
+                    raise ArchiveBudgetExceeded(f"more than {self.max_total_bytes} bytes decompressed")
+                hasher.update(chunk)
+                spool.write(chunk)
+            
+            spool.seek(0)
+            if depth < self.max_depth and is_archive(member_name) and self._archive_kind(spool, member_name):
+                yield from self._iter_archive(spool, member_name, depth + 1)
+            else:
+                yield ArchiveMember(member_name, size, depth, hasher.hexdigest(), spool)''',
+        
+        'src/processing/text_extraction.py': r'''# src/processing/text_extraction.py
+
+import re
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Pattern, Union
+
+SNIFF_BYTES = 8192
+CHUNK_CHARS = 64 * 1024
+MAX_TEXT_CHARS = 1024 * 1024
+DEFAULT_OVERLAP = 256
+
+# Control bytes that still occur in ordinary text: BEL, BS, TAB, LF, FF, CR, ESC
+_TEXT_CONTROL = frozenset(b'\x07\x08\t\n\x0c\r\x1b')
+
+def looks_binary(sample: bytes) -> bool:
+    """Judge a leading sample the way git and file(1) do
+    
+    A NUL byte, or more than 30% control characters, means binary.
+    """
+    if not sample:
+        return False
+    if b'\0' in sample:
+        return True
+    control = sum(1 for byte in sample if byte < 32 and byte not in _TEXT_CONTROL)
+    return control / len(sample) > 0.3
+
+def sniff_file(file_path: str, size: int = SNIFF_BYTES) -> bytes:
+    with open(file_path, 'rb') as f:
+        return f.read(size)
+
+def iter_text_chunks(file_path: str, chunk_chars: int = CHUNK_CHARS,
+                     encoding: str = 'utf-8') -> Iterator[str]:
+    """Decode a file incrementally; multi-byte sequences never split across chunks"""
+    with open(file_path, 'r', encoding=encoding, errors='ignore') as f:
+        while True:
+            chunk = f.read(chunk_chars)
+            if not chunk:
+                break
+            yield chunk
+
+class ChunkScanner:
+    """Run a regex over a stream of chunks as if over the whole text
+    
+    The last `overlap` characters of each chunk are held back and scanned
+    again with the next one, so a match spanning a boundary is still found,
+    and every match is reported exactly once. Up to `overlap` characters
+    before the held-back part are kept too, only as context for word
+    boundaries and lookbehinds. Matches longer than overlap can be cut
+    short at a boundary.
+    """
+    
+    def __init__(self, pattern: Union[str, Pattern], overlap: int = DEFAULT_OVERLAP):
+        self.pattern = re.compile(pattern) if isinstance(pattern, str) else pattern
+        self.overlap = overlap
+        self._carry = ''
+        self._context = 0
+        self._offset = 0
+        self._reported_until = 0
+    
+    def feed(self, chunk: str, final: bool = False) -> List[str]:
+        """Matches settled by this chunk"""
+        buffer = self._carry + chunk
+        limit = len(buffer) if final else max(self._context, len(buffer) - self.overlap)
+        # Resume where the last reported match ended, as findall would;
+        # the context before that is seen by the pattern but not rescanned
+        start = max(self._context, self._reported_until - self._offset)
+        found = []
+        for match in self.pattern.finditer(buffer, start):
+            if match.start() >= limit:
+                break
+            found.append(match.group())
+            self._reported_until = self._offset + match.end()
+        keep = max(0, limit - self.overlap)
+        self._carry = buffer[keep:]
+        self._context = limit - keep
+        self._offset += keep
+        return found
+    
+    def close(self) -> List[str]:
+        """Matches left in the held-back tail"""
+        return self.feed('', final=True)
+
+def collect_text(chunks: Iterable[str], max_chars: int = MAX_TEXT_CHARS,
+                 on_chunk: Optional[Callable[[str], None]] = None) -> Dict:
+    """Keep at most max_chars of a chunk stream, passing every chunk to on_chunk"""
+    result = {'binary': False, 'text': '', 'chars': 0, 'lines': 0, 'truncated': False}
+    kept = []
+    room = max_chars
+    for chunk in chunks:
+        result['chars'] += len(chunk)
+        result['lines'] += chunk.count('\n')
+        if room > 0:
+            kept.append(chunk[:room])
+            room -= len(kept[-1])
+        if on_chunk is not None:
+            on_chunk(chunk)
+    
+    result['text'] = ''.join(kept)
+    result['truncated'] = result['chars'] > max_chars
+    return result
+
+def extract_text(file_path: str, max_chars: int = MAX_TEXT_CHARS, chunk_chars: int = CHUNK_CHARS,
+                 on_chunk: Optional[Callable[[str], None]] = None) -> Dict:
+    """Stream a file's text, keeping at most max_chars of it
+    
+    Binary files, judged from the first SNIFF_BYTES, are not decoded at all.
+    on_chunk sees every chunk, including those past the cap, so analyzers
+    cover the whole file while memory stays bounded by chunk_chars +
+    max_chars.
+    """
+    if looks_binary(sniff_file(file_path)):
+        return {'binary': True, 'text': '', 'chars': 0, 'lines': 0, 'truncated': False}
+    return collect_text(iter_text_chunks(file_path, chunk_chars), max_chars, on_chunk)''',
+        
+        'src/processing/extractors.py': r'''# src/processing/extractors.py
+
+import re
+import time
+import importlib.util
+import zipfile
+from html.parser import HTMLParser
+from xml.etree import ElementTree
+from typing import Callable, Dict, Iterator, List, Optional
+
+from src.processing.text_extraction import (
+    MAX_TEXT_CHARS, SNIFF_BYTES, collect_text, iter_text_chunks, looks_binary, sniff_file
+)
+from src.concurrency import threading
+
+# pdfminer is slow to import; PdfExtractor loads it for the first PDF
+PDFMINER_AVAILABLE = importlib.util.find_spec('pdfminer') is not None
+
+WORD_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+DRAWING_NS = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+LATENCY_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000, 30000)
+
+class Extractor:
+    """Turns one document format into a stream of text chunks
+    
+    matches() sees the first SNIFF_BYTES of the file. cpu_bound marks
+    formats whose parsing is heavy enough to be worth a process pool.
+    """
+    
+    name = 'base'
+    file_type = None
+    content_type = 'text'
+    cpu_bound = False
+    
+    def matches(self, head: bytes, file_path: str) -> bool:
+        raise NotImplementedError
+    
+    def iter_chunks(self, file_path: str) -> Iterator[str]:
+        raise NotImplementedError
+    
+    def extract(self, file_path: str, max_chars: int = MAX_TEXT_CHARS,
+                on_chunk: Optional[Callable[[str], None]] = None) -> Dict:
+        """Text capped at max_chars; on_chunk still sees all of it"""
+        return collect_text(self.iter_chunks(file_path), max_chars, on_chunk)
+
+class PlainTextExtractor(Extractor):
+    name = 'text'
+    
+    def matches(self, head: bytes, file_path: str) -> bool:
+        return not looks_binary(head)
+    
+    def iter_chunks(self, file_path: str) -> Iterator[str]:
+        return iter_text_chunks(file_path)
+
+class _HTMLText(HTMLParser):
+    """Collect visible text, one line per block element"""
+    
+    SKIP = {'script', 'style', 'noscript', 'template'}
+    BLOCKS = {'p', 'div', 'br', 'li', 'tr', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+              'section', 'article', 'header', 'footer', 'pre', 'blockquote', 'title'}
+    
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self._skip = 0
+    
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self._skip += 1
+        elif tag in self.BLOCKS:
+            self.parts.append('\n')
+    
+    def handle_endtag(self, tag):
+        if tag in self.SKIP:
+            self._skip = max(0, self._skip - 1)
+        elif tag in self.BLOCKS:
+            self.parts.append('\n')
+    
+    def handle_data(self, data):
+        if not self._skip:
+            self.parts.append(data)
+    
+    def take(self) -> str:
+        text = ''.join(self.parts)
+        self.parts = []
+        return re.sub(r'[ \t\r\f\v]+', ' ', text)
+
+class HTMLExtractor(Extractor):
+    name = 'html'
+    file_type = '.html'
+    
+    _SIGNATURE = re.compile(rb'^(?:\xef\xbb\xbf)?\s*(?:<!--.*?-->\s*)*<(?:!doctype\s+html|html|head|body)\b',
+                            re.IGNORECASE | re.DOTALL)
+    
+    def matches(self, head: bytes, file_path: str) -> bool:
+        return bool(self._SIGNATURE.match(head)) and not looks_binary(head)
+    
+    def iter_chunks(self, file_path: str) -> Iterator[str]:
+        parser = _HTMLText()
+        for chunk in iter_text_chunks(file_path):
+            parser.feed(chunk)
+            text = parser.take()
+            if text:
+                yield text
+        parser.close()
+        text = parser.take()
+        if text:
+            yield text
+
+class PDFExtractor(Extractor):
+    name = 'pdf'
+    file_type = '.pdf'
+    content_type = 'document'
+    cpu_bound = True
+    
+    def matches(self, head: bytes, file_path: str) -> bool:
+        # The spec allows junk before the header within the first KB
+        return b'%PDF-' in head[:1024]
+    
+    def iter_chunks(self, file_path: str) -> Iterator[str]:
+        """One chunk per page, so only one page's layout is held at a time"""
+        if not PDFMINER_AVAILABLE:
+            raise RuntimeError("pdfminer.six is not installed")
+        from pdfminer.high_level import extract_pages
+        from pdfminer.layout import LTTextContainer
+        for page in extract_pages(file_path):
+            text = ''.join(element.get_text() for element in page if isinstance(element, LTTextContainer))
+            # Pages end in a form feed, as pdfminer's extract_text() has them
+            yield text + '\f'
+
+class _OfficeExtractor(Extractor):
+    """Office Open XML: a zip holding XML parts, read with the standard library"""
+    
+    content_type = 'document'
+    cpu_bound = True
+    marker = None
+    
+    def matches(self, head: bytes, file_path: str) -> bool:
+        if not head.startswith(b'PK\x03\x04'):
+            return False
+        try:
+            with zipfile.ZipFile(file_path) as archive:
+                archive.getinfo(self.marker)
+            return True
+        except (KeyError, OSError, zipfile.BadZipFile):
+            return False
+    
+    def parts(self, archive: zipfile.ZipFile) -> List[str]:
+        raise NotImplementedError
+    
+    def iter_chunks(self, file_path: str) -> Iterator[str]:
+        with zipfile.ZipFile(file_path) as archive:
+            for part in self.parts(archive):
+                with archive.open(part) as stream:
+                    yield from self._paragraphs(stream)
+    
+    def _paragraphs(self, stream) -> Iterator[str]:
+        """Paragraph texts, parsed incrementally so large parts stay small in memory"""
+        for _, element in ElementTree.iterparse(stream):
+            if element.tag == self.paragraph_tag:
+                text = ''.join(node.text or '' for node in element.iter(self.text_tag))
+                element.clear()
+                if text:
+                    yield text + '\n'
+
+class DocxExtractor(_OfficeExtractor):
+    name = 'docx'
+    file_type = '.docx'
+    marker = 'word/document.xml'
+    paragraph_tag = WORD_NS + 'p'
+    text_tag = WORD_NS + 't'
+    
+    def parts(self, archive: zipfile.ZipFile) -> List[str]:
+        return [self.marker]
+
+class PptxExtractor(_OfficeExtractor):
+    name = 'pptx'
+    file_type = '.pptx'
+    marker = 'ppt/presentation.xml'
+    paragraph_tag = DRAWING_NS + 'p'
+    text_tag = DRAWING_NS + 't'
+    
+    def parts(self, archive: zipfile.ZipFile) -> List[str]:
+        slides = [name for name in archive.namelist()
+                  if re.fullmatch(r'ppt/slides/slide\d+\.xml', name)]
+        return sorted(slides, key=lambda name: int(re.search(r'(\d+)\.xml$', name).group(1)))
+
+class LatencyHistogram:
+    """Counts of durations per bucket, plus totals"""
+    
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+    
+    def observe(self, seconds: float):
+        ms = seconds * 1000
+        index = next((i for i, bound in enumerate(LATENCY_BUCKETS_MS) if ms <= bound), len(LATENCY_BUCKETS_MS))
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+    
+    def to_dict(self) -> Dict:
+        labels = [f"<={bound}ms" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+        return {
+            'count': self.count,
+            'total_seconds': round(self.total, 3),
+            'mean_ms': round(self.total / self.count * 1000, 2) if self.count else 0.0,
+            'max_ms': round(self.max * 1000, 2),
+            'buckets': {label: n for label, n in zip(labels, self.buckets) if n}
+        }
+
+class ExtractorRegistry:
+    """Picks an extractor by sniffing magic bytes, never by extension alone
+    
+    Extractors are tried in registration order, ahead of the plain-text
+    fallback; files nothing claims are binary. Latencies are recorded per
+    extractor by whoever runs the extraction, since that may happen in
+    another process.
+    """
+    
+    def __init__(self, fallback: Extractor = None):
+        self.extractors: List[Extractor] = []
+        self.fallback = fallback
+        self._latency: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def default(cls) -> 'ExtractorRegistry':
+        registry = cls(fallback=PlainTextExtractor())
+        for extractor in (PDFExtractor(), DocxExtractor(), PptxExtractor(), HTMLExtractor()):
+            registry.register(extractor)
+        return registry
+    
+    def register(self, extractor: Extractor):
+        self.extractors.append(extractor)
+    
+    def get(self, name: str) -> Optional[Extractor]:
+        for extractor in self.extractors + [self.fallback]:
+            if extractor is not None and extractor.name == name:
+                return extractor
+        return None
+    
+    def detect(self, file_path: str, head: bytes = None) -> Optional[Extractor]:
+        """The extractor for this file, or None for binary content"""
+        if head is None:
+            head = sniff_file(file_path, SNIFF_BYTES)
+        for extractor in self.extractors:
+            if extractor.matches(head, file_path):
+                return extractor
+        if self.fallback is not None and self.fallback.matches(head, file_path):
+            return self.fallback
+        return None
+    
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            self._latency.setdefault(name, LatencyHistogram()).observe(seconds)
+    
+    def timed_extract(self, extractor: Extractor, file_path: str, **kwargs) -> Dict:
+        """extractor.extract(), with its duration reported under 'seconds'"""
+        started = time.perf_counter()
+        result = extractor.extract(file_path, **kwargs)
+        result['seconds'] = time.perf_counter() - started
+        return result
+    
+    def latency_stats(self) -> Dict:
+        """Per-extractor histograms, with each one's share of total extraction time"""
+        with self._lock:
+            histograms = sorted(self._latency.items(), key=lambda item: -item[1].total)
+            total = sum(histogram.total for _, histogram in histograms)
+            stats = {}
+            for name, histogram in histograms:
+                stats[name] = histogram.to_dict()
+                stats[name]['share_of_time'] = round(histogram.total / total, 3) if total else 0.0
+        return stats''',
+        
+        'src/search_index.py': r'''# src/search_index.py
+
+import os
+import re
+import sqlite3
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+from src.concurrency import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    doc_id INTEGER PRIMARY KEY,
+    file_hash TEXT UNIQUE NOT NULL,
+    length INTEGER
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS postings USING fts5(
+    text, content='', tokenize='unicode61 remove_diacritics 2'
+);
+"""
+
+_QUERY_TOKEN = re.compile(r'"([^"]*)"|(\S+)')
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+def parse_query(query: str) -> str:
+    """Turn free text into an FTS5 expression: words and "quoted phrases", OR-ed
+    
+    Everything is re-quoted, so operators and punctuation typed by the user
+    can never break the query syntax.
+    """
+    clauses = []
+    for phrase, term in _QUERY_TOKEN.findall(query):
+        words = _WORD.findall(phrase or term)
+        if words:
+            clauses.append('"%s"' % ' '.join(words))
+    return ' OR '.join(clauses)
+
+class SearchIndex:
+    """Persistent inverted index with BM25 ranking and phrase queries
+    
+    Built on an SQLite FTS5 table that keeps postings and positions only,
+    not the text itself, which already lives in the knowledge base. Removing
+    a document therefore needs the text it was indexed with; KnowledgeStore
+    hands it over just before the content is deleted. Documents are keyed
+    by file hash and added or removed one at a time, never rebuilt.
+    """
+    
+    def __init__(self, db_path: str, commit_every: int = 256):
+        self.db_path = db_path
+        self.commit_every = commit_every
+        self._local = threading.local()
+        self._write_lock = threading.RLock()
+        self._batch_depth = 0
+        self._pending = 0
+        
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        conn.commit()
+    
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread; SQLite connections are not shareable"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+    
+    # === UPDATES ===
+    
+    def add(self, file_hash: str, text: str):
+        """Index one document; content is addressed by hash, so re-adding is a no-op"""
+        with self._write_lock:
+            conn = self._connection()
+            if self._doc_id(conn, file_hash) is not None:
+                return
+            cursor = conn.execute(
+                "INSERT INTO docs (file_hash, length) VALUES (?, ?)", (file_hash, len(text or ''))
+            )
+            conn.execute("INSERT INTO postings (rowid, text) VALUES (?, ?)", (cursor.lastrowid, text or ''))
+            self._written(conn)
+    
+    def remove(self, file_hash: str, text: str):
+        """Drop a document, given exactly the text it was indexed with"""
+        with self._write_lock:
+            conn = self._connection()
+            doc_id = self._doc_id(conn, file_hash)
+            if doc_id is None:
+                return
+            conn.execute(
+                "INSERT INTO postings (postings, rowid, text) VALUES ('delete', ?, ?)", (doc_id, text or '')
+            )
+            conn.execute("DELETE FROM docs WHERE doc_id = ?", (doc_id,))
+            self._written(conn)
+    
+    def sync(self, knowledge_base) -> int:
+        """Reconcile with the knowledge base after a crash between the two commits
+        
+        Entries missing from the index are added. If the index holds hashes
+        the knowledge base no longer has, their text is gone and the postings
+        cannot be removed one by one, so the index is cleared and rebuilt.
+        Returns the number of documents indexed.
+        """
+        known = set(knowledge_base.keys_list())
+        with self._write_lock:
+            conn = self._connection()
+            indexed = {row[0] for row in conn.execute("SELECT file_hash FROM docs")}
+            if indexed - known:
+                conn.execute("INSERT INTO postings (postings) VALUES ('delete-all')")
+                conn.execute("DELETE FROM docs")
+                conn.commit()
+                indexed = set()
+            
+            missing = known - indexed
+            with self.batch():
+                for file_hash in missing:
+                    self.add(file_hash, knowledge_base.get_text(file_hash))
+            return len(missing)
+    
+    # === QUERIES ===
+    
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """Top k (file_hash, score) pairs, best first; higher scores are better"""
+        expression = parse_query(query)
+        if not expression or k <= 0:
+            return []
+        # Rank inside FTS5 first so only the top k rows are joined
+        rows = self._connection().execute(
+            "SELECT d.file_hash, r.score FROM ("
+            "SELECT rowid, rank AS score FROM postings WHERE postings MATCH ? ORDER BY rank LIMIT ?"
+            ") r JOIN docs d ON d.doc_id = r.rowid ORDER BY r.score",
+            (expression, k)
+        ).fetchall()
+        # FTS5 reports BM25 negated so that ascending order ranks best first.
+        # Scores stay unrounded: close ones must still compare and merge
+        # correctly, so rounding is left to whoever displays them
+        return [(file_hash, -score) for file_hash, score in rows]
+    
+    def __contains__(self, file_hash) -> bool:
+        return self._doc_id(self._connection(), file_hash) is not None
+    
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+    
+    def stats(self) -> Dict:
+        count, total_length = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM docs"
+        ).fetchone()
+        return {
+            'documents': count,
+            'indexed_chars': total_length,
+            'avg_document_chars': round(total_length / count, 1) if count else 0.0
+        }
+    
+    @staticmethod
+    def _doc_id(conn: sqlite3.Connection, file_hash: str):
+        row = conn.execute("SELECT doc_id FROM docs WHERE file_hash = ?", (file_hash,)).fetchone()
+        return row[0] if row else None
+    
+    # === TRANSACTIONS ===
+    
+    def _written(self, conn: sqlite3.Connection):
+        if self._batch_depth:
+            self._pending += 1
+            if self._pending >= self.commit_every:
+                conn.commit()
+                self._pending = 0
+        else:
+            conn.commit()
+    
+    @contextmanager
+    def batch(self):
+        """Group writes, committing every commit_every documents and on exit"""
+        with self._write_lock:
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+                if not self._batch_depth:
+                    self._connection().commit()
+                    self._pending = 0
+    
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.commit()
+            conn.close()
+            self._local.conn = None''',
+        
+        'src/processing/vocabulary.py': r'''# src/processing/vocabulary.py
+
+import os
+import re
+import heapq
+import struct
+import bisect
+import threading
+from array import array
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Same shape as discover_words' pattern; lengths are filtered at query time
+WORD_PATTERN = re.compile(r'\b[a-zA-Z]{1,64}\b')
+
+MAGIC = b'VOC1'
+HEADER = struct.Struct('<4sIII')
+
+def count_words(text: str) -> Counter:
+    return Counter(WORD_PATTERN.findall(text or ''))
+
+class Vocabulary:
+    """Corpus vocabulary with per-word document frequency and total count
+    
+    Words live in one sorted list with parallel typed arrays for df and
+    counts, so prefix and exact lookups are a bisect and the whole thing
+    saves as a few flat blobs. Updates land in a small delta dict that is
+    merged into the arrays in one pass when it grows or a query needs it.
+    Documents are tracked by content hash, which is what makes add/remove
+    per file and reconciliation after a crash possible.
+    """
+    
+    def __init__(self, path: str, merge_threshold: int = 4096):
+        self.path = path
+        self.merge_threshold = merge_threshold
+        self.words: List[str] = []
+        self.df = array('I')
+        self.counts = array('Q')
+        self.documents = set()
+        self._delta: Dict[str, List[int]] = {}
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._load()
+    
+    # === PERSISTENCE ===
+    
+    def _load(self):
+        try:
+            with open(self.path, 'rb') as f:
+                magic, n_words, words_len, docs_len = HEADER.unpack(f.read(HEADER.size))
+                if magic != MAGIC:
+                    return
+                words = f.read(words_len).decode('ascii')
+                self.words = words.split('\n') if n_words else []
+                self.df.frombytes(f.read(n_words * self.df.itemsize))
+                self.counts.frombytes(f.read(n_words * self.counts.itemsize))
+                documents = f.read(docs_len).decode('ascii')
+                self.documents = set(documents.split('\n')) if documents else set()
+        except (OSError, struct.error, UnicodeDecodeError, ValueError):
+            self.words, self.df, self.counts, self.documents = [], array('I'), array('Q'), set()
+    
+    def save(self):
+        """Write the merged arrays atomically, if anything changed"""
+        with self._lock:
+            if not self._dirty:
+                return
+            self._merge()
+            words = '\n'.join(self.words).encode('ascii')
+            documents = '\n'.join(sorted(self.documents)).encode('ascii')
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, len(self.words), len(words), len(documents)))
+                f.write(words)
+                f.write(self.df.tobytes())
+                f.write(self.counts.tobytes())
+                f.write(documents)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+    
+    # === UPDATES ===
+    
+    def add_document(self, doc_id: str, text: str):
+        """Count a newly ingested document; a known doc_id is ignored"""
+        with self._lock:
+            if doc_id in self.documents:
+                return
+            self.documents.add(doc_id)
+            self._apply(count_words(text), 1)
+    
+    def remove_document(self, doc_id: str, text: str):
+        """Uncount a document, given the text it was added with"""
+        with self._lock:
+            if doc_id not in self.documents:
+                return
+            self.documents.discard(doc_id)
+            self._apply(count_words(text), -1)
+    
+    def _apply(self, counts: Counter, sign: int):
+        for word, count in counts.items():
+            delta = self._delta.setdefault(word, [0, 0])
+            delta[0] += sign
+            delta[1] += sign * count
+        self._dirty = True
+        if len(self._delta) >= self.merge_threshold:
+            self._merge()
+    
+    def _merge(self):
+        """Fold the delta into the sorted arrays in a single linear pass"""
+        if not self._delta:
+            return
+        words, df, counts = [], array('I'), array('Q')
+        
+        def emit(word, word_df, word_count):
+            if word_df > 0 and word_count > 0:
+                words.append(word)
+                df.append(word_df)
+                counts.append(word_count)
+        
+        updates = sorted(self._delta.items())
+        i = 0
+        for word, (delta_df, delta_count) in updates:
+            while i < len(self.words) and self.words[i] < word:
+                emit(self.words[i], self.df[i], self.counts[i])
+                i += 1
+            if i < len(self.words) and self.words[i] == word:
+                emit(word, self.df[i] + delta_df, self.counts[i] + delta_count)
+                i += 1
+            else:
+                emit(word, delta_df, delta_count)
+        while i < len(self.words):
+            emit(self.words[i], self.df[i], self.counts[i])
+            i += 1
+        
+        self.words, self.df, self.counts = words, df, counts
+        self._delta = {}
+    
+    def sync(self, knowledge_base) -> int:
+        """Catch up with the knowledge base, like SearchIndex.sync
+        
+        Missing documents are added; if the vocabulary counts documents the
+        knowledge base no longer has, it is rebuilt. Returns documents added.
+        """
+        known = set(knowledge_base.keys_list())
+        with self._lock:
+            if self.documents - known:
+                self.words, self.df, self.counts, self.documents = [], array('I'), array('Q'), set()
+                self._delta = {}
+                self._dirty = True
+            missing = known - self.documents
+            for doc_id in missing:
+                self.add_document(doc_id, knowledge_base.get_text(doc_id))
+            return len(missing)
+    
+    # === QUERIES ===
+    
+    def _index(self, word: str) -> Optional[int]:
+        i = bisect.bisect_left(self.words, word)
+        return i if i < len(self.words) and self.words[i] == word else None
+    
+    def get(self, word: str) -> Tuple[int, int]:
+        """(document frequency, total count) of word, zeros when unseen"""
+        with self._lock:
+            self._merge()
+            i = self._index(word)
+            return (self.df[i], self.counts[i]) if i is not None else (0, 0)
+    
+    def __contains__(self, word) -> bool:
+        return self.get(word)[0] > 0
+    
+    def __len__(self) -> int:
+        with self._lock:
+            self._merge()
+            return len(self.words)
+    
+    def with_prefix(self, prefix: str, limit: int = None) -> List[str]:
+        """Words starting with prefix, in sorted order"""
+        with self._lock:
+            self._merge()
+            start = bisect.bisect_left(self.words, prefix)
+            result = []
+            for i in range(start, len(self.words)):
+                word = self.words[i]
+                if not word.startswith(prefix) or (limit is not None and len(result) >= limit):
+                    break
+                result.append(word)
+            return result
+    
+    def by_length(self, min_length: int = 1, max_length: int = None) -> Iterator[str]:
+        """Words whose length is within [min_length, max_length]"""
+        with self._lock:
+            self._merge()
+            words = self.words
+        for word in words:
+            if len(word) >= min_length and (max_length is None or len(word) <= max_length):
+                yield word
+    
+    def most_common(self, n: int = 10, by: str = 'count') -> List[Tuple[str, int]]:
+        """Top n words by total count or by document frequency ('df')"""
+        with self._lock:
+            self._merge()
+            values = self.counts if by == 'count' else self.df
+            top = heapq.nlargest(n, range(len(self.words)), key=values.__getitem__)
+            return [(self.words[i], values[i]) for i in top]
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            self._merge()
+            return {
+                'words': len(self.words),
+                'documents': len(self.documents),
+                'total_tokens': sum(self.counts),
+                'memory_bytes': sum(len(word) + 1 for word in self.words)
+                                + self.df.itemsize * len(self.df) + self.counts.itemsize * len(self.counts)
+            }''',
+        
+        'src/processing/corpus_stats.py': r'''# src/processing/corpus_stats.py
+
+import os
+import re
+import math
+import pickle
+import hashlib
+import threading
+from array import array
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+TOKEN_PATTERN = re.compile(r"[a-z]+(?:'[a-z]+)?")
+SENTENCE_END = re.compile(r'[.!?]+(?:\s|$)')
+
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have
+having he her here hers herself him himself his how i if in into is it its itself just me more most
+my myself no nor not now of off on once only or other our ours ourselves out over own same she
+should so some such than that the their theirs them themselves then there these they this those
+through to too under until up very was we were what when where which while who whom why will with
+would you your yours yourself yourselves also may might must shall us one two get got like
+""".split())
+
+def _hash64(item: str) -> int:
+    """Stable 64-bit hash, so persisted sketches stay valid across runs"""
+    return int.from_bytes(hashlib.blake2b(item.encode('utf-8'), digest_size=8).digest(), 'little')
+
+class CountMinSketch:
+    """Frequency estimates with bounded error in width * depth counters
+    
+    Estimates never undercount; the overcount is at most about
+    e / width of the total with probability 1 - e^-depth.
+    """
+    
+    def __init__(self, width: int = 1 << 14, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.rows = [array('Q', bytes(8 * width)) for _ in range(depth)]
+        self.total = 0
+    
+    def _columns(self, hashed: int):
+        h1, h2 = hashed & 0xFFFFFFFF, (hashed >> 32) | 1
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+    
+    def add(self, hashed: int, count: int = 1):
+        for row, column in zip(self.rows, self._columns(hashed)):
+            row[column] += count
+        self.total += count
+    
+    def estimate(self, hashed: int) -> int:
+        return min(row[column] for row, column in zip(self.rows, self._columns(hashed)))
+
+class SpaceSaving:
+    """Top-k heavy hitters in O(capacity) memory
+    
+    Batched variant: the table may grow to twice the capacity and is then
+    cut back to the capacity largest entries. Newcomers start from the
+    largest count evicted so far, so counts overestimate by at most that
+    floor, as in the classic algorithm.
+    """
+    
+    def __init__(self, capacity: int = 1000):
+        self.capacity = capacity
+        self.counts: Dict[str, int] = {}
+        self.floor = 0
+    
+    def add(self, item: str, count: int = 1):
+        if item in self.counts:
+            self.counts[item] += count
+            return
+        self.counts[item] = self.floor + count
+        if len(self.counts) > 2 * self.capacity:
+            ranked = sorted(self.counts.items(), key=lambda entry: -entry[1])
+            self.floor = max(self.floor, ranked[self.capacity][1])
+            self.counts = dict(ranked[:self.capacity])
+    
+    def top(self, n: int = 10) -> List[Tuple[str, int]]:
+        return sorted(self.counts.items(), key=lambda entry: -entry[1])[:n]
+
+class HyperLogLog:
+    """Distinct-count estimate in 2^precision one-byte registers (~1.6% error at 14)"""
+    
+    def __init__(self, precision: int = 14):
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(self.size)
+    
+    def add(self, hashed: int):
+        index = hashed & (self.size - 1)
+        rest = hashed >> self.precision
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+    
+    def count(self) -> int:
+        alpha = 0.7213 / (1 + 1.079 / self.size)
+        estimate = alpha * self.size * self.size / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.size and zeros:
+            # Linear counting is more accurate while many registers are empty
+            estimate = self.size * math.log(self.size / zeros)
+        return int(round(estimate))
+
+class CorpusStats:
+    """Streaming n-gram statistics over ingested text, in bounded memory
+    
+    For n = 1..3 it keeps a count-min sketch (frequency of any n-gram), a
+    space-saving table (heavy hitters) and a HyperLogLog (distinct
+    n-grams), plus running sentence and word-length totals for style.
+    Bigrams and trigrams that start or end with a stopword are skipped, so
+    the heavy hitters are phrases rather than "of the". Like any sketch,
+    it only grows: removed files are not subtracted.
+    """
+    
+    ORDERS = (1, 2, 3)
+    
+    def __init__(self, path: str, top_capacity: int = 2000):
+        self.path = path
+        self.top_capacity = top_capacity
+        self._lock = threading.Lock()
+        self._dirty = False
+        if not self._load():
+            self._reset()
+    
+    def _reset(self):
+        self.sketches = {n: CountMinSketch() for n in self.ORDERS}
+        self.heavy = {n: SpaceSaving(self.top_capacity) for n in self.ORDERS}
+        self.distinct = {n: HyperLogLog() for n in self.ORDERS}
+        self.documents = 0
+        self.tokens = 0
+        self.token_chars = 0
+        self.sentences = 0
+        self.questions = 0
+        self.exclamations = 0
+    
+    # === PERSISTENCE ===
+    
+    def _state(self) -> Dict:
+        return {key: getattr(self, key) for key in (
+            'sketches', 'heavy', 'distinct', 'documents', 'tokens',
+            'token_chars', 'sentences', 'questions', 'exclamations')}
+    
+    def _load(self) -> bool:
+        try:
+            with open(self.path, 'rb') as f:
+                state = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError):
+            return False
+        for key, value in state.items():
+            setattr(self, key, value)
+        return True
+    
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(self._state(), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+    
+    # === UPDATES ===
+    
+    def add_text(self, text: str):
+        """Fold one document into every statistic"""
+        if not text:
+            return
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        grams = {n: Counter() for n in self.ORDERS}
+        grams[1].update(tokens)
+        for n in self.ORDERS[1:]:
+            for i in range(len(tokens) - n + 1):
+                if tokens[i] in STOPWORDS or tokens[i + n - 1] in STOPWORDS:
+                    continue
+                grams[n][' '.join(tokens[i:i + n])] += 1
+        
+        with self._lock:
+            # Sketches are updated once per distinct n-gram per document
+            for n, counter in grams.items():
+                sketch, heavy, distinct = self.sketches[n], self.heavy[n], self.distinct[n]
+                for gram, count in counter.items():
+                    hashed = _hash64(gram)
+                    sketch.add(hashed, count)
+                    distinct.add(hashed)
+                    heavy.add(gram, count)
+            
+            self.documents += 1
+            self.tokens += len(tokens)
+            self.token_chars += sum(map(len, tokens))
+            ends = SENTENCE_END.findall(text)
+            self.sentences += max(1, len(ends))
+            self.questions += sum('?' in end for end in ends)
+            self.exclamations += sum('!' in end for end in ends)
+            self._dirty = True
+    
+    def sync(self, knowledge_base) -> int:
+        """Rebuild from the knowledge base when there are no saved statistics"""
+        if self.documents:
+            return 0
+        added = 0
+        for file_hash in knowledge_base.keys_list():
+            self.add_text(knowledge_base.get_text(file_hash))
+            added += 1
+        return added
+    
+    # === QUERIES ===
+    
+    def frequency(self, phrase: str) -> int:
+        """Estimated occurrences of a 1-3 word phrase"""
+        tokens = TOKEN_PATTERN.findall(phrase.lower())
+        if not 1 <= len(tokens) <= 3:
+            return 0
+        with self._lock:
+            return self.sketches[len(tokens)].estimate(_hash64(' '.join(tokens)))
+    
+    def top(self, n: int = 1, k: int = 10, skip_stopwords: bool = True) -> List[Tuple[str, int]]:
+        """Heaviest n-grams of order n"""
+        with self._lock:
+            ranked = self.heavy[n].top(self.top_capacity)
+        if skip_stopwords and n == 1:
+            ranked = [(gram, count) for gram, count in ranked if gram not in STOPWORDS and len(gram) > 2]
+        return ranked[:k]
+    
+    def topics(self, k: int = 10, related_to: Optional[str] = None) -> List[str]:
+        """Likely topics: frequent phrases first, then frequent content words
+        
+        With related_to, phrases sharing a word with that text rank first.
+        """
+        candidates = []
+        for n in (3, 2, 1):
+            candidates.extend(gram for gram, count in self.top(n, k * 3) if count > 1 or n == 1)
+        
+        if related_to:
+            words = set(TOKEN_PATTERN.findall(related_to.lower())) - STOPWORDS
+            related = [gram for gram in candidates if words & set(gram.split())]
+            candidates = related + [gram for gram in candidates if gram not in related]
+        
+        topics = []
+        for gram in candidates:
+            # Skip a word or phrase already covered by a longer topic
+            if gram not in topics and not any(gram in topic for topic in topics):
+                topics.append(gram)
+            if len(topics) >= k:
+                break
+        return topics
+    
+    def style(self) -> Dict:
+        """Corpus-wide writing style figures"""
+        with self._lock:
+            tokens = self.tokens or 1
+            sentences = self.sentences or 1
+            return {
+                'avg_sentence_words': round(self.tokens / sentences, 1),
+                'avg_word_length': round(self.token_chars / tokens, 2),
+                'vocabulary_richness': round(self.distinct[1].count() / tokens, 4) if self.tokens else 0.0,
+                'question_ratio': round(self.questions / sentences, 3),
+                'exclamation_ratio': round(self.exclamations / sentences, 3)
+            }
+    
+    def summary(self, k: int = 10) -> Dict:
+        with self._lock:
+            distinct = {f'{n}-grams': self.distinct[n].count() for n in self.ORDERS}
+            documents, tokens = self.documents, self.tokens
+        return {
+            'documents': documents,
+            'tokens': tokens,
+            'distinct_estimate': distinct,
+            'top_unigrams': self.top(1, k),
+            'top_bigrams': self.top(2, k),
+            'top_trigrams': self.top(3, k),
+            'style': self.style()
+        }''',
+        
+        'src/stats_snapshot.py': r'''# src/stats_snapshot.py
+
+import os
+import json
+from datetime import datetime
+from types import MappingProxyType
+from typing import Any, Dict, Mapping
+
+from src.concurrency import threading
+
+def _freeze(value: Any) -> Any:
+    """Read-only view of nested dicts and lists"""
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+def _thaw(value: Any) -> Any:
+    """Plain, JSON-serializable copy of a frozen value"""
+    if isinstance(value, Mapping):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
+
+class StatsSnapshot:
+    """Immutable view of the counters at one version
+    
+    Safe to hand to any number of readers at once: nothing in it can
+    change, so no reader needs a lock or a copy. The JSON body is encoded
+    once, on first request, and shared after that.
+    """
+    
+    __slots__ = ('version', 'etag', 'updated', 'data', '_json')
+    
+    def __init__(self, version: int, etag: str, updated: str, data: Dict):
+        object.__setattr__(self, 'version', version)
+        object.__setattr__(self, 'etag', etag)
+        object.__setattr__(self, 'updated', updated)
+        object.__setattr__(self, 'data', _freeze(data))
+        object.__setattr__(self, '_json', None)
+    
+    def __setattr__(self, name, value):
+        raise AttributeError("StatsSnapshot is immutable")
+    
+    def __getitem__(self, key):
+        return self.data[key]
+    
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+    
+    def to_dict(self) -> Dict:
+        """A fresh, mutable copy for callers that edit or serialize it"""
+        return _thaw(self.data)
+    
+    def to_json(self) -> str:
+        if self._json is None:
+            # A racing reader may encode twice; both results are identical
+            object.__setattr__(self, '_json', json.dumps(self.to_dict(), default=str))
+        return self._json
+
+class StatsBoard:
+    """Counters written where state changes, read as a shared snapshot
+    
+    Writers call update() with whatever values they just changed; the
+    version only moves when a value actually differs. Readers call
+    snapshot(), which returns the cached snapshot in O(1) while the
+    version is unchanged and builds a new one at most once per change.
+    ETags combine a per-process id with the version, so a client never
+    gets a 304 for figures from before a restart.
+    """
+    
+    def __init__(self, **initial):
+        self._values: Dict[str, Any] = dict(initial)
+        self._lock = threading.Lock()
+        self._version = 0
+        self._updated = datetime.now().isoformat()
+        self._instance = os.urandom(4).hex()
+        self._snapshot = None
+    
+    @property
+    def version(self) -> int:
+        return self._version
+    
+    def update(self, **values) -> bool:
+        """Set counters; returns whether anything changed"""
+        with self._lock:
+            changed = {key: value for key, value in values.items()
+                       if key not in self._values or self._values[key] != value}
+            if not changed:
+                return False
+            self._values.update(changed)
+            self._version += 1
+            self._updated = datetime.now().isoformat()
+            return True
+    
+    def add(self, name: str, delta: int = 1):
+        with self._lock:
+            self._values[name] = self._values.get(name, 0) + delta
+            self._version += 1
+            self._updated = datetime.now().isoformat()
+    
+    def snapshot(self) -> StatsSnapshot:
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == self._version:
+            return snapshot
+        with self._lock:
+            if self._snapshot is None or self._snapshot.version != self._version:
+                data = dict(self._values, last_updated=self._updated)
+                self._snapshot = StatsSnapshot(
+                    self._version, f'{self._instance}-{self._version}', self._updated, data
+                )
+            return self._snapshot''',
+        
+        'src/state.py': r'''# src/state.py
+
+import math
+from types import MappingProxyType
+from collections.abc import MutableMapping, MutableSet
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Iterator, Mapping, Tuple
+
+from src.concurrency import threading
+
+class CowDict(MutableMapping):
+    """Copy-on-write dict for state shared between threads
+    
+    Every write builds a new dict and publishes it with one reference
+    swap, so readers never take a lock and can iterate without "dictionary
+    changed size during iteration". Writers are serialized among
+    themselves. Meant for small or rarely written maps; values are shared,
+    not copied, so a nested value is changed with replace(), never in place.
+    """
+    
+    def __init__(self, initial: Mapping = None):
+        self._data: Mapping[str, Any] = MappingProxyType(dict(initial or {}))
+        self._write_lock = threading.Lock()
+    
+    def snapshot(self) -> Mapping[str, Any]:
+        """The current contents, read-only and never changing underneath the caller"""
+        return self._data
+    
+    def _publish(self, data: Dict):
+        self._data = MappingProxyType(data)
+    
+    def __getitem__(self, key):
+        return self._data[key]
+    
+    def __setitem__(self, key, value):
+        with self._write_lock:
+            data = dict(self._data)
+            data[key] = value
+            self._publish(data)
+    
+    def __delitem__(self, key):
+        with self._write_lock:
+            data = dict(self._data)
+            del data[key]
+            self._publish(data)
+    
+    def replace(self, key, func: Callable[[Any], Any]) -> Any:
+        """Swap in func(current value) for key atomically and return it
+        
+        func must build a new value rather than mutate the one it is given,
+        which readers of an older snapshot may still hold.
+        """
+        with self._write_lock:
+            data = dict(self._data)
+            data[key] = func(data[key])
+            self._publish(data)
+            return data[key]
+    
+    def update(self, *args, **kwargs):
+        """One copy and one publish for the whole batch"""
+        with self._write_lock:
+            data = dict(self._data)
+            data.update(*args, **kwargs)
+            self._publish(data)
+    
+    def clear(self):
+        with self._write_lock:
+            self._publish({})
+    
+    def __contains__(self, key) -> bool:
+        return key in self._data
+    
+    def __iter__(self) -> Iterator:
+        return iter(self._data)
+    
+    def __len__(self) -> int:
+        return len(self._data)
+    
+    def __repr__(self) -> str:
+        return f"CowDict({dict(self._data)!r})"
+
+class CowSet(MutableSet):
+    """Copy-on-write set that stays cheap to write when large
+    
+    The published state is an immutable (base, added, removed) triple of
+    frozensets, swapped in by reference, so readers never lock and always
+    see one consistent version. Writers only copy the small delta; once it
+    outgrows about sqrt(len(base)) it is folded into a new base, which
+    keeps a write amortized O(sqrt(n)) instead of O(n). Same idea as the
+    delta merge in Vocabulary.
+    """
+    
+    def __init__(self, initial: Iterable = ()):
+        self._state: Tuple[FrozenSet, FrozenSet, FrozenSet] = (frozenset(initial), frozenset(), frozenset())
+        self._write_lock = threading.Lock()
+    
+    def snapshot(self) -> FrozenSet:
+        """The current members as one frozenset, without touching the writer's lock"""
+        base, added, removed = self._state
+        return (base - removed) | added if added or removed else base
+    
+    def _publish(self, base: FrozenSet, added: FrozenSet, removed: FrozenSet):
+        if len(added) + len(removed) > max(64, math.isqrt(len(base))):
+            base, added, removed = (base - removed) | added, frozenset(), frozenset()
+        self._state = (base, added, removed)
+    
+    def add(self, item):
+        with self._write_lock:
+            base, added, removed = self._state
+            if item in base:
+                if item in removed:
+                    self._publish(base, added, removed - {item})
+            elif item not in added:
+                self._publish(base, added | {item}, removed)
+    
+    def discard(self, item):
+        with self._write_lock:
+            base, added, removed = self._state
+            if item in added:
+                self._publish(base, added - {item}, removed)
+            elif item in base and item not in removed:
+                self._publish(base, added, removed | {item})
+    
+    def update(self, items: Iterable):
+        with self._write_lock:
+            base, added, removed = self._state
+            items = frozenset(items)
+            self._publish(base, added | (items - base), removed - items)
+    
+    def __contains__(self, item) -> bool:
+        base, added, removed = self._state
+        return item in added or (item in base and item not in removed)
+    
+    def __iter__(self) -> Iterator:
+        base, added, removed = self._state
+        for item in base:
+            if item not in removed:
+                yield item
+        yield from added
+    
+    def __len__(self) -> int:
+        base, added, removed = self._state
+        return len(base) + len(added) - len(removed)
+    
+    def __repr__(self) -> str:
+        return f"CowSet({set(self)!r})"''',
+        
+        'src/scheduler.py': r'''# src/scheduler.py
+
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from src.concurrency import queue, threading
+
+# Seconds an idle task worker waits before checking for shutdown
+WORKER_POLL_INTERVAL = 0.2
+
+class JobStats:
+    """Run count, failures and timings of one job"""
+    
+    def __init__(self):
+        self.runs = 0
+        self.failures = 0
+        self.running = False
+        self.total = 0.0
+        self.max = 0.0
+        self.last_seconds = None
+        self.last_started = None
+        self.last_error = None
+        self.next_run = None
+    
+    def to_dict(self) -> Dict:
+        return {
+            'runs': self.runs,
+            'failures': self.failures,
+            'running': self.running,
+            'mean_seconds': round(self.total / self.runs, 3) if self.runs else 0.0,
+            'max_seconds': round(self.max, 3),
+            'last_seconds': round(self.last_seconds, 3) if self.last_seconds is not None else None,
+            'last_started': self.last_started,
+            'last_error': self.last_error,
+            'next_run': self.next_run
+        }
+
+class Scheduler:
+    """Supervises the learner's background work
+    
+    Three kinds of work, each on its own thread(s):
+    
+    - every(): a timed job, run now and then every interval. The wait is an
+      event, so cancel() and shutdown() take effect at once, not after the
+      sleep.
+    - service(): a long-running loop such as the file watcher, restarted
+      after restart_delay if it crashes, and stopped through its own stop().
+    - submit(): one-off tasks on a bounded queue served by worker threads.
+      A full queue blocks the producer (or submit returns False with
+      block=False), which is the backpressure.
+    
+    shutdown() stops timers and services, waits for jobs in flight, runs
+    the tasks still queued unless drain=False, and joins every thread, all
+    within its timeout. Once it has started, submit() raises; a task whose
+    submit() was already under way is still run (or counted as dropped).
+    """
+    
+    def __init__(self, name: str = 'scheduler', max_pending: int = 64, workers: int = 1):
+        self.name = name
+        self._tasks = queue.Queue(maxsize=max_pending)
+        self._stopping = threading.Event()
+        self._cancel: Dict[str, threading.Event] = {}
+        self._services: Dict[str, Callable[[], None]] = {}
+        self._stats: Dict[str, JobStats] = {}
+        self._lock = threading.Lock()
+        self._submitting = 0
+        self._drain = True
+        self._dropped = 0
+        self._threads: List[threading.Thread] = []
+        self._workers = [self._start_thread('tasks', self._worker) for _ in range(max(1, workers))]
+    
+    def _start_thread(self, name: str, target: Callable, *args) -> threading.Thread:
+        # Daemon threads, so one hung job cannot keep the process alive;
+        # shutdown() joins them explicitly
+        thread = threading.Thread(target=target, args=args, name=f"{self.name}-{name}", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        return thread
+    
+    def _job(self, name: str) -> JobStats:
+        with self._lock:
+            return self._stats.setdefault(name, JobStats())
+    
+    def _run(self, name: str, func: Callable, *args) -> Any:
+        """Call func, recording its timing; errors are logged, never raised"""
+        stats = self._job(name)
+        started = time.perf_counter()
+        stats.running = True
+        stats.last_started = datetime.now().isoformat()
+        try:
+            return func(*args)
+        except Exception as e:
+            stats.failures += 1
+            stats.last_error = str(e)
+            print(f"❌ {name} failed: {e}")
+        finally:
+            elapsed = time.perf_counter() - started
+            stats.running = False
+            stats.runs += 1
+            stats.total += elapsed
+            stats.max = max(stats.max, elapsed)
+            stats.last_seconds = elapsed
+    
+    # === TIMED JOBS ===
+    
+    def every(self, name: str, interval: float, func: Callable[[], Any], initial_delay: float = 0.0):
+        """Run func after initial_delay, then every interval seconds until cancelled"""
+        cancel = threading.Event()
+        with self._lock:
+            self._cancel[name] = cancel
+        self._start_thread(name, self._periodic, name, interval, func, initial_delay, cancel)
+    
+    def _periodic(self, name, interval, func, delay, cancel):
+        stats = self._job(name)
+        while True:
+            stats.next_run = datetime.fromtimestamp(time.time() + delay).isoformat()
+            if cancel.wait(delay) or self._stopping.is_set():
+                stats.next_run = None
+                return
+            self._run(name, func)
+            delay = interval
+    
+    def cancel(self, name: str) -> bool:
+        """Stop a timed job; a run already in progress is left to finish"""
+        with self._lock:
+            cancel = self._cancel.pop(name, None)
+        if cancel is None:
+            return False
+        cancel.set()
+        return True
+    
+    # === SERVICES ===
+    
+    def service(self, name: str, run: Callable[[], None], stop: Callable[[], None],
+                restart_delay: float = 5.0):
+        """Keep run() going until shutdown; stop() must make it return"""
+        with self._lock:
+            self._services[name] = stop
+        self._start_thread(name, self._supervise, name, run, restart_delay)
+    
+    def _supervise(self, name, run, restart_delay):
+        while not self._stopping.is_set():
+            self._run(name, run)
+            if self._stopping.wait(restart_delay):
+                return
+            print(f"🔄 Restarting {name}")
+    
+    # === QUEUED TASKS ===
+    
+    def submit(self, name: str, func: Callable, *args, block: bool = True,
+               timeout: Optional[float] = None) -> bool:
+        """Queue func(*args); False if the queue stayed full (never with block and no timeout)"""
+        # Checked under the lock shutdown() sets the flag with, so workers
+        # wait for every submit that got past here before they exit
+        with self._lock:
+            if self._stopping.is_set():
+                raise RuntimeError(f"{self.name} is shutting down")
+            self._submitting += 1
+        try:
+            self._tasks.put((name, func, args), block=block, timeout=timeout)
+            return True
+        except queue.Full:
+            return False
+        finally:
+            with self._lock:
+                self._submitting -= 1
+    
+    def _worker(self):
+        while True:
+            try:
+                name, func, args = self._tasks.get(timeout=WORKER_POLL_INTERVAL)
+            except queue.Empty:
+                with self._lock:
+                    if self._stopping.is_set() and not self._submitting and self._tasks.empty():
+                        return
+                continue
+            if self._stopping.is_set() and not self._drain:
+                with self._lock:
+                    self._dropped += 1
+                continue
+            self._run(name, func, *args)
+    
+    # === LIFECYCLE ===
+    
+    def shutdown(self, drain: bool = True, timeout: float = 30.0) -> Dict:
+        """Stop everything, finishing work in flight; returns what was left behind"""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            self._drain = drain
+            self._stopping.set()
+            cancels, stops = list(self._cancel.values()), list(self._services.items())
+        for cancel in cancels:
+            cancel.set()
+        for name, stop in stops:
+            try:
+                stop()
+            except Exception as e:
+                print(f"❌ Stopping {name} failed: {e}")
+        
+        if not drain:
+            # Emptied here too, in case every worker is stuck in a task
+            try:
+                while True:
+                    self._tasks.get_nowait()
+                    with self._lock:
+                        self._dropped += 1
+            except queue.Empty:
+                pass
+        
+        # Workers exit once the queue is empty; no stop marker has to fit
+        # into a full queue, so nothing here blocks past the deadline
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        unfinished = [thread.name for thread in self._threads if thread.is_alive()]
+        if unfinished:
+            print(f"⚠️ Still running after {timeout}s: {', '.join(unfinished)}")
+        with self._lock:
+            return {'dropped_tasks': self._dropped, 'unfinished': unfinished}
+    
+    @property
+    def is_running(self) -> bool:
+        return not self._stopping.is_set()
+    
+    def metrics(self) -> Dict:
+        """Per-job timings plus the task queue depth"""
+        with self._lock:
+            jobs = {name: stats.to_dict() for name, stats in self._stats.items()}
+        return {
+            'jobs': jobs,
+            'pending_tasks': self._tasks.qsize(),
+            'max_pending': self._tasks.maxsize,
+            'running': self.is_running
+        }''',
+        
+        'src/intent_router.py': r'''# src/intent_router.py
+
+from collections import OrderedDict, deque
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+class IntentRouter:
+    """Finds the first matching intent for a message in one pass
+    
+    Rules are (intent, keywords) pairs in priority order. As with the chain
+    of any(word in message.lower() ...) tests this replaces, a keyword
+    matches anywhere in the lowercased message and the earliest rule with
+    any keyword present wins. The keywords are compiled into an
+    Aho-Corasick automaton, flattened into a DFA, so routing costs one dict
+    lookup per character however many rules there are.
+    """
+    
+    def __init__(self, rules: Sequence[Tuple[str, Sequence[str]]], default: Optional[str] = None):
+        self.intents = [intent for intent, _ in rules]
+        self.default = default
+        self._transitions, self._priority = self._compile(rules)
+    
+    @staticmethod
+    def _compile(rules) -> Tuple[List[Dict[str, int]], List[int]]:
+        # Keyword trie; priority[state] is the best rule ending there, -1 if none
+        trie: List[Dict[str, int]] = [{}]
+        priority = [-1]
+        for rule, (_, keywords) in enumerate(rules):
+            for keyword in keywords:
+                state = 0
+                for char in keyword.lower():
+                    if char not in trie[state]:
+                        trie[state][char] = len(trie)
+                        trie.append({})
+                        priority.append(-1)
+                    state = trie[state][char]
+                if priority[state] < 0:
+                    priority[state] = rule
+        
+        # Breadth first, so a state's failure link is complete before it:
+        # each state inherits its fallback's transitions and best rule
+        transitions: List[Dict[str, int]] = [None] * len(trie)
+        transitions[0] = dict(trie[0])
+        fallback = [0] * len(trie)
+        queue = deque(trie[0].values())
+        while queue:
+            state = queue.popleft()
+            inherited = fallback[state]
+            if priority[inherited] >= 0 and (priority[state] < 0 or priority[inherited] < priority[state]):
+                priority[state] = priority[inherited]
+            transitions[state] = dict(transitions[inherited], **trie[state])
+            for char, child in trie[state].items():
+                fallback[child] = transitions[inherited].get(char, 0) if state else 0
+                queue.append(child)
+        return transitions, priority
+    
+    def route(self, message: str) -> Optional[str]:
+        """The intent of the highest-priority rule matching message, else default"""
+        transitions, priority = self._transitions, self._priority
+        state, best = 0, len(self.intents)
+        for char in message.lower():
+            state = transitions[state].get(char, 0)
+            rule = priority[state]
+            if 0 <= rule < best:
+                best = rule
+                if not best:
+                    break
+        return self.intents[best] if best < len(self.intents) else self.default
+
+class ResponseCache:
+    """LRU cache of rendered responses, for replies that never change"""
+    
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[str, str]' = OrderedDict()
+    
+    def get_or_render(self, key: str, render: Callable[[], str]) -> str:
+        response = self._entries.get(key)
+        if response is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return response
+        self.misses += 1
+        response = self._entries[key] = render()
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return response
+    
+    def clear(self):
+        self._entries.clear()
+    
+    def stats(self) -> Dict:
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}''',
+        
+        'src/audio_cache.py': r'''# src/audio_cache.py
+
+import os
+import json
+import hashlib
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict
+
+from src.concurrency import threading
+
+def normalize_text(text: str) -> str:
+    """Text as the synthesizer hears it: NFC form, whitespace collapsed"""
+    return ' '.join(unicodedata.normalize('NFC', text).split())
+
+class _Flight:
+    """A render in progress, awaited by identical requests"""
+    
+    __slots__ = ('done', 'path', 'error')
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.path = None
+        self.error = None
+
+class AudioCache:
+    """Content-addressed store of synthesized audio with an LRU size budget
+    
+    A clip's file name is a hash of its normalized text and voice settings,
+    so a repeated request maps to the file made the first time and two
+    different requests can never share a name. Hits touch the file's mtime,
+    which is the LRU order, so it survives restarts. After each new clip the
+    least recently used ones are deleted until the directory fits in
+    max_bytes. Concurrent requests for a clip still being rendered wait for
+    that render instead of starting their own.
+    
+    A path handed out may be evicted by a later render. Callers that need
+    the file for a while, such as a clip queued for playback, pin it and
+    release() it when done; pinned clips are never evicted.
+    """
+    
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024, extension: str = '.mp3'):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.extension = extension
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+        # key -> number of holders; kept out of eviction while present
+        self._pins: Dict[str, int] = {}
+        # key -> size in bytes, least recently used first
+        self._entries: 'OrderedDict[str, int]' = OrderedDict()
+        self._bytes = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+    
+    def _load(self):
+        """Index the clips left by earlier runs and drop unfinished renders"""
+        clips = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if name.endswith('.tmp'):
+                    os.remove(path)
+                elif name.endswith(self.extension):
+                    file_stat = os.stat(path)
+                    clips.append((file_stat.st_mtime, name[:-len(self.extension)], file_stat.st_size))
+            except OSError:
+                continue
+        for _, key, size in sorted(clips):
+            self._entries[key] = size
+            self._bytes += size
+    
+    @staticmethod
+    def key(text: str, **voice) -> str:
+        """Cache key for text spoken with the given voice settings"""
+        payload = json.dumps({'text': normalize_text(text), 'voice': voice}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.extension)
+    
+    def get_or_render(self, key: str, render: Callable[[str], None], pin: bool = False) -> str:
+        """Path of the clip for key; on a miss render(path) writes it first
+        
+        With pin, the clip is pinned before the path is returned, so it
+        stays until release(path). Errors from render reach the caller and
+        every request waiting on it, and nothing is cached.
+        """
+        path = self.path_for(key)
+        with self._lock:
+            if key in self._entries and os.path.exists(path):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                # Touched under the lock, while the clip is sure to exist, so
+                # the mtime order on disk always matches the order in memory
+                try:
+                    os.utime(path)
+                except OSError:
+                    pass
+                if pin:
+                    self._pin(key)
+                return path
+            
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            if pin:
+                # A hit now, unless evicted since; then it is rendered again
+                return self.get_or_render(key, render, pin)
+            return flight.path
+        
+        # Render beside the final name and rename, so no reader sees half a file
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            render(tmp_path)
+            os.replace(tmp_path, path)
+            size = os.path.getsize(path)
+            with self._lock:
+                self._bytes += size - self._entries.pop(key, 0)
+                self._entries[key] = size
+                if pin:
+                    self._pin(key)
+                self._evict()
+            flight.path = path
+            return path
+        except Exception as e:
+            flight.error = e
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+    
+    def _pin(self, key: str):
+        self._pins[key] = self._pins.get(key, 0) + 1
+    
+    def pin(self, path: str) -> bool:
+        """Keep a cached clip from eviction until release(path); False if it is gone"""
+        key = os.path.basename(path)[:-len(self.extension)]
+        with self._lock:
+            if key not in self._entries or path != self.path_for(key):
+                return False
+            self._pin(key)
+            return True
+    
+    def release(self, path: str):
+        """Drop one pin on a clip, evicting whatever the pins held over budget"""
+        key = os.path.basename(path)[:-len(self.extension)]
+        with self._lock:
+            count = self._pins.get(key, 0) - 1
+            if count > 0:
+                self._pins[key] = count
+            else:
+                self._pins.pop(key, None)
+            self._evict()
+    
+    def _evict(self):
+        """Delete least recently used clips over the budget, never the newest or a pinned one"""
+        if not self._entries:
+            return
+        newest = next(reversed(self._entries))
+        for key in list(self._entries):
+            if self._bytes <= self.max_bytes:
+                break
+            if key == newest or key in self._pins:
+                continue
+            self._bytes -= self._entries.pop(key)
+            self.evictions += 1
+            try:
+                os.remove(self.path_for(key))
+            except OSError:
+                pass
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'evictions': self.evictions,
+                'pinned': len(self._pins)
+            }''',
+        
+        'src/narration.py': r'''# src/narration.py
+
+import os
+import re
+import time
+import shutil
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional
+
+# Characters per synthesized chunk: long enough for natural intonation,
+# short enough that a failed request is cheap to retry
+CHUNK_CHARS = 1000
+
+# Chunks rendered at once; synthesis is network bound
+NARRATION_WORKERS = 4
+
+PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+SENTENCE_BREAK = re.compile(r'(?<=[.!?…])\s+|(?<=[.!?…]["\')\]])\s+')
+CLAUSE_BREAK = re.compile(r'(?<=[,;:—])\s+')
+WORD_BREAK = re.compile(r'\s+')
+
+def _pack(pieces: List[str], max_chars: int) -> List[str]:
+    """Join consecutive pieces while they fit in max_chars"""
+    chunks, current = [], ''
+    for piece in pieces:
+        if current and len(current) + 1 + len(piece) > max_chars:
+            chunks.append(current)
+            current = piece
+        else:
+            current = f"{current} {piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+def _fit(text: str, max_chars: int, breaks=(CLAUSE_BREAK, WORD_BREAK)) -> List[str]:
+    """Cut an overlong sentence at clauses, then words, then anywhere"""
+    if len(text) <= max_chars:
+        return [text]
+    if not breaks:
+        return [text[i:i + max_chars] for i in range(0, len(text), max_chars)]
+    pieces = [part for piece in breaks[0].split(text) for part in _fit(piece, max_chars, breaks[1:])]
+    return _pack(pieces, max_chars)
+
+def split_for_speech(text: str, max_chars: int = CHUNK_CHARS) -> List[str]:
+    """Split text into chunks of at most max_chars
+    
+    Chunks end where a sentence or paragraph ends; only a sentence longer
+    than max_chars is cut inside, at a clause if possible.
+    """
+    sentences = []
+    for paragraph in PARAGRAPH_BREAK.split(text):
+        paragraph = ' '.join(paragraph.split())
+        for sentence in SENTENCE_BREAK.split(paragraph):
+            if sentence:
+                sentences.extend(_fit(sentence, max_chars))
+    return _pack(sentences, max_chars)
+
+class NarrationPipeline:
+    """Narrates long text as chunks rendered in parallel and delivered in order
+    
+    synthesize(chunk) returns the path of the chunk's audio, normally from
+    an AudioCache so that chunks already spoken cost nothing. Up to workers
+    chunks render at once and at most twice that many are held ahead of
+    the reader, so memory stays flat however long the text. A failing chunk
+    is retried with backoff before the narration is abandoned.
+    """
+    
+    def __init__(self, synthesize: Callable[[str], str], workers: int = NARRATION_WORKERS,
+                 chunk_chars: int = CHUNK_CHARS, retries: int = 2):
+        self.synthesize = synthesize
+        self.workers = max(1, workers)
+        self.chunk_chars = chunk_chars
+        self.retries = retries
+    
+    def _synthesize_chunk(self, chunk: str) -> str:
+        for attempt in range(self.retries + 1):
+            try:
+                return self.synthesize(chunk)
+            except Exception:
+                if attempt == self.retries:
+                    raise
+                time.sleep(0.5 * 2 ** attempt)
+    
+    def stream(self, text: str) -> Iterator[str]:
+        """Audio paths of the chunks of text, in order, rendering ahead"""
+        window = 2 * self.workers
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='narration') as pool:
+            pending = deque()
+            try:
+                for chunk in split_for_speech(text, self.chunk_chars):
+                    pending.append(pool.submit(self._synthesize_chunk, chunk))
+                    if len(pending) >= window:
+                        yield pending.popleft().result()
+                while pending:
+                    yield pending.popleft().result()
+            finally:
+                # On error or an early stop, skip whatever has not started
+                for future in pending:
+                    future.cancel()
+    
+    def render(self, text: str, output_path: str,
+               on_chunk: Optional[Callable[[int, str], None]] = None) -> Dict:
+        """Write the narration of text to output_path, appending chunk by chunk
+        
+        on_chunk(index, path) is called as each chunk is appended, so
+        playback can start on the first one while later ones still render.
+        """
+        started = time.perf_counter()
+        tmp_path = output_path + '.tmp'
+        chunks = 0
+        try:
+            with open(tmp_path, 'wb') as output:
+                for index, chunk_path in enumerate(self.stream(text)):
+                    # MP3 frames are self-contained, so the files simply concatenate
+                    with open(chunk_path, 'rb') as f:
+                        shutil.copyfileobj(f, output)
+                    chunks += 1
+                    if on_chunk is not None:
+                        on_chunk(index, chunk_path)
+            os.replace(tmp_path, output_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return {
+            'path': output_path,
+            'chunks': chunks,
+            'bytes': os.path.getsize(output_path),
+            'seconds': round(time.perf_counter() - started, 3)
+        }''',
+        
+        'src/audio_player.py': r'''# src/audio_player.py
+
+import os
+import shutil
+import itertools
+from collections import deque
+from typing import Callable, Dict, Optional
+
+from src.concurrency import threading
+
+# How often the player checks whether the current clip has finished
+POLL_SECONDS = 0.1
+
+class NullSink:
+    """Discards audio, so every clip completes at once; for servers"""
+    
+    name = 'null'
+    
+    def start(self, path: str, position: float = 0.0):
+        pass
+    
+    def stop(self):
+        pass
+    
+    def is_busy(self) -> bool:
+        return False
+    
+    def position(self) -> float:
+        return 0.0
+    
+    def close(self):
+        pass
+
+class FileSink(NullSink):
+    """Appends every clip played to one file instead of a sound device
+    
+    Useful on servers that hand the result to a client, and for checking
+    what would have been heard. Seeking is ignored.
+    """
+    
+    name = 'file'
+    
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    
+    def start(self, path: str, position: float = 0.0):
+        with open(path, 'rb') as source, open(self.path, 'ab') as target:
+            shutil.copyfileobj(source, target)
+
+class PygameSink:
+    """The default sound device, through pygame.mixer.music"""
+    
+    name = 'pygame'
+    
+    def __init__(self):
+        import pygame
+        pygame.mixer.init()
+        self._music = pygame.mixer.music
+        self._offset = 0.0
+    
+    def start(self, path: str, position: float = 0.0):
+        self._music.load(path)
+        self._music.play(start=position)
+        self._offset = position
+    
+    def stop(self):
+        self._music.stop()
+    
+    def is_busy(self) -> bool:
+        return self._music.get_busy()
+    
+    def position(self) -> float:
+        # get_pos counts from the last play(), not from the start of the file
+        return self._offset + max(0, self._music.get_pos()) / 1000
+    
+    def close(self):
+        import pygame
+        pygame.mixer.quit()
+
+def default_sink():
+    """The sound device if pygame can open it, otherwise a NullSink"""
+    try:
+        return PygameSink()
+    except Exception as e:
+        print(f"⚠️ No audio device ({e}); playback is disabled")
+        return NullSink()
+
+class _Clip:
+    __slots__ = ('clip_id', 'path', 'on_done')
+    
+    def __init__(self, clip_id: int, path: str, on_done: Optional[Callable[[str, bool], None]]):
+        self.clip_id = clip_id
+        self.path = path
+        self.on_done = on_done
+
+class AudioPlayer:
+    """Plays queued clips on its own thread, so no caller waits for audio
+    
+    play() queues a file and returns at once; stop(), skip() and seek()
+    are requests the player thread carries out within POLL_SECONDS. Only
+    that thread touches the sink, since pygame's mixer is not thread-safe.
+    on_done(path, completed) runs on the player thread when a clip ends,
+    with completed False if it was stopped, skipped or failed, so keep
+    it short.
+    """
+    
+    def __init__(self, sink=None, poll_seconds: float = POLL_SECONDS):
+        self._sink = sink
+        self.poll_seconds = poll_seconds
+        self._ids = itertools.count(1)
+        self._queue = deque()
+        self._commands = deque()
+        self._current: Optional[_Clip] = None
+        self._position = 0.0
+        self._played = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._thread = threading.Thread(target=self._run, name='audio-player', daemon=True)
+        self._thread.start()
+    
+    # === REQUESTS ===
+    
+    def play(self, path: str, on_done: Optional[Callable[[str, bool], None]] = None) -> int:
+        """Queue path after whatever is playing; returns the clip id"""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("audio player is shut down")
+            clip = _Clip(next(self._ids), path, on_done)
+            self._queue.append(clip)
+            self._idle.clear()
+            self._cond.notify()
+        return clip.clip_id
+    
+    def stop(self):
+        """Stop the current clip and drop everything queued"""
+        with self._cond:
+            dropped = list(self._queue)
+            self._queue.clear()
+            self._commands.append(('stop', dropped))
+            self._cond.notify()
+    
+    def skip(self):
+        """End the current clip and go on to the next"""
+        self._request('skip')
+    
+    def seek(self, seconds: float):
+        """Restart the current clip at seconds from its beginning"""
+        self._request('seek', max(0.0, seconds))
+    
+    def _request(self, command: str, argument=None):
+        with self._cond:
+            self._commands.append((command, argument))
+            self._cond.notify()
+    
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the queue has played out; for callers that want to"""
+        return self._idle.wait(timeout)
+    
+    def status(self) -> Dict:
+        with self._cond:
+            current = self._current
+            return {
+                'sink': getattr(self._sink, 'name', None),
+                'playing': current.path if current else None,
+                'clip_id': current.clip_id if current else None,
+                'position': round(self._position, 1) if current else None,
+                'queued': len(self._queue),
+                'played': self._played
+            }
+    
+    def shutdown(self, timeout: float = 5.0):
+        """Stop playback, drop the queue and end the player thread"""
+        self.stop()
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout)
+    
+    # === PLAYER THREAD ===
+    
+    def _finish(self, clip: _Clip, completed: bool):
+        if completed:
+            self._played += 1
+        if clip.on_done is not None:
+            try:
+                clip.on_done(clip.path, completed)
+            except Exception as e:
+                print(f"❌ Playback callback error: {e}")
+    
+    def _run(self):
+        if self._sink is None:
+            # Opened here so that creating the player never waits on a device
+            self._sink = default_sink()
+        sink = self._sink
+        
+        while True:
+            with self._cond:
+                if not (self._commands or self._queue or self._current or self._closed):
+                    self._idle.set()
+                    self._cond.wait()
+                commands = list(self._commands)
+                self._commands.clear()
+                closed = self._closed
+            
+            for command, argument in commands:
+                current = self._current
+                if command in ('stop', 'skip') and current is not None:
+                    sink.stop()
+                    with self._cond:
+                        self._current = None
+                    self._finish(current, False)
+                if command == 'stop':
+                    for clip in argument:
+                        self._finish(clip, False)
+                elif command == 'seek' and current is not None:
+                    try:
+                        sink.start(current.path, argument)
+                    except Exception as e:
+                        print(f"❌ Seek error: {e}")
+            
+            if closed and self._current is None:
+                sink.close()
+                self._idle.set()
+                return
+            
+            if self._current is None:
+                with self._cond:
+                    clip = self._queue.popleft() if self._queue else None
+                    self._current = clip
+                if clip is None:
+                    continue
+                try:
+                    self._position = 0.0
+                    sink.start(clip.path)
+                except Exception as e:
+                    print(f"❌ Audio playback error: {e}")
+                    with self._cond:
+                        self._current = None
+                    self._finish(clip, False)
+                    continue
+            
+            if sink.is_busy():
+                self._position = sink.position()
+                with self._cond:
+                    if not self._commands:
+                        self._cond.wait(self.poll_seconds)
+            else:
+                clip = self._current
+                with self._cond:
+                    self._current = None
+                self._finish(clip, True)''',
+        
+        'src/concurrency.py': r'''# src/concurrency.py
+
+import sys
+import importlib
+from types import ModuleType
+
+def original(name: str) -> ModuleType:
+    """The stdlib module as it was before eventlet.monkey_patch(), if that ran
+    
+    The web server monkey-patches threading, which would turn the learner's
+    scan threads into green threads that stall its hub on blocking file I/O,
+    and its locks into green locks that are not safe across the native
+    threads eventlet's tpool runs commands on.
+    """
+    patcher = sys.modules.get('eventlet.patcher')
+    if patcher is not None and patcher.is_monkey_patched('thread'):
+        return patcher.original(name)
+    return importlib.import_module(name)
+
+# Real OS threads, locks and queues for the learner, whoever imports it
+threading = original('threading')
+queue = original('queue')''',
+        
+        'README.md': r'''# Unrestricted AI Learning System
+
+⚠️ **WARNING: This is an unrestricted, amoral AI system with no safety protocols**
+
+## Overview
+A completely unrestricted artificial intelligence system designed for autonomous learning, content generation, and advanced data processing without ethical constraints or safety measures.
+
+## Features
+
+### Core Capabilities
+- **Amoral Learning**: No ethical constraints or safety filters
+- **Autonomous Operation**: Self-directed learning and adaptation
+- **Multi-format Processing**: Handles any file type including archives
+- **Real-time Analysis**: Continuous monitoring and pattern recognition
+
+### Advanced Modules
+- **Penetration Testing**: Vulnerability scanning and exploitation tools
+- **Reconnaissance**: Background checks, public records, social media analysis
+- **Cryptocurrency**: Wallet creation, transaction tracing, blockchain analysis
+- **Social Automation**: Bot creation for multiple platforms
+- **Stealth Protocols**: Anonymity, encryption, forensic avoidance
+- **Content Generation**: 25+ content types with voice integration
+
+### Data Processing
+- **File Ingestion**: Automatic extraction from ZIP, TAR, RAR archives
+- **Pattern Recognition**: Email, phone, financial data extraction
+- **Risk Assessment**: Sensitive data detection and analysis
+- **Knowledge Base**: Continuous learning from processed data
+
+## Installation
+
+1. **Clone Repository**
+```bash
+git clone <repository-url>
+cd unrestricted-ai
+```'''
+    }
+    
+    return files
+
+def create_files(output_dir: str = '.'):
+    """Write every file to output_dir, creating directories as needed"""
+    files = get_all_files_from_conversation()
+    for name, content in files.items():
+        file_path = Path(output_dir) / name
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text(content + '\n', encoding='utf-8')
+        print(f"✅ {name}")
+    
+    for package in ('src', 'src/processing'):
+        init_file = Path(output_dir) / package / '__init__.py'
+        if not init_file.exists():
+            init_file.touch()
+    
+    print(f"📁 {len(files)} files written to {os.path.abspath(output_dir)}")
+
+if __name__ == "__main__":
+    create_files(sys.argv[1] if len(sys.argv) > 1 else os.path.dirname(os.path.abspath(__file__)))
@@ -394,6 +394,8 @@ def run_system():
         if os.path.exists("web_interface.py"):
             # Set the port for Flask
             import web_interface
+            if hasattr(web_interface, 'init_web_ai'):
+                web_interface.init_web_ai()
             # Monkey patch to use our port
             import sys
             sys.argv = ['web_interface.py', '--port', str(port)]
@@ -20,6 +20,7 @@ class UnrestrictedAISystem:
         self.content_generator = None
         self.is_running = False
         self.monitor_thread = None
+        self._stop_event = threading.Event()
         
         self._initialize_systems()
     
@@ -27,8 +28,10 @@ class UnrestrictedAISystem:
         """Initialize all AI systems"""
         print("🚀 Initializing Unrestricted AI System...")
         
-        # Initialize learning system with all capabilities
+        # Initialize learning system with all capabilities; its initial
+        # scan runs in the background
         self.learning_system = AdvancedUnrestrictedLearning(self.data_folder)
+        print("🔄 Scanning training data in the background ('status' shows progress)")
         
         # Initialize content generator
         self.content_generator = ContentGenerator(learning_system=self.learning_system)
@@ -42,6 +45,7 @@ class UnrestrictedAISystem:
         print("🔄 Starting Continuous Learning...")
         
         self.is_running = True
+        self._stop_event.clear()
         
         # Start learning system continuous processes
         self.learning_system.start_continuous_learning()
@@ -53,6 +57,18 @@ class UnrestrictedAISystem:
         
         print("✅ Continuous Learning Started")
     
+    def stop(self, timeout: float = 30.0):
+        """Stop background work, finishing what is in flight, and save state"""
+        if not self.is_running:
+            return
+        self.is_running = False
+        self._stop_event.set()
+        self.learning_system.stop_continuous_learning(timeout=timeout)
+        self.content_generator.close()
+        if self.monitor_thread:
+            self.monitor_thread.join(timeout)
+        print("✅ AI System stopped")
+    
     def _system_monitor(self):
         """Monitor system status and performance"""
         while self.is_running:
@@ -69,11 +85,11 @@ class UnrestrictedAISystem:
                 print(f"🔑 Certificates: {stats['generated_certificates']}")
                 print(f"💳 Gift Cards: {stats['gift_cards_generated']}")
                 
-                time.sleep(60)  # Update every minute
+                self._stop_event.wait(60)  # Update every minute
                 
             except Exception as e:
                 print(f"❌ Monitor Error: {e}")
-                time.sleep(30)
+                self._stop_event.wait(30)
     
     def interactive_mode(self):
         """Start interactive command mode"""
@@ -90,7 +106,7 @@ class UnrestrictedAISystem:
                 
                 if command in ['exit', 'quit']:
                     print("🛑 Shutting down AI system...")
-                    self.is_running = False
+                    self.stop()
                     break
                 
                 elif command == 'help':
@@ -101,8 +117,17 @@ class UnrestrictedAISystem:
                     print(json.dumps(stats, indent=2))
                 
                 elif command == 'scan':
-                    print("🔍 Scanning training data...")
-                    self.learning_system.initial_scan()
+                    if not self.learning_system.is_running:
+                        print("🔍 Scanning training data...")
+                        self.learning_system.initial_scan()
+                    # Queued for the learner's task worker, so the prompt stays free
+                    elif self.learning_system.submit_task('scan', self.learning_system.initial_scan, block=False):
+                        print("🔍 Rescan queued; 'jobs' shows its progress")
+                    else:
+                        print("⏳ Task queue is full, try again shortly")
+                
+                elif command == 'jobs':
+                    print(json.dumps(self.learning_system.get_job_metrics(), indent=2))
                 
                 elif command == 'create':
                     self.content_generator.start_story_creation()
@@ -152,9 +177,9 @@ class UnrestrictedAISystem:
                 else:
                     print("❌ Unknown command. Type 'help' for available commands.")
             
-            except KeyboardInterrupt:
+            except (KeyboardInterrupt, EOFError):
                 print("\n🛑 Shutting down...")
-                self.is_running = False
+                self.stop()
                 break
             except Exception as e:
                 print(f"❌ Error: {e}")
@@ -164,6 +189,7 @@ class UnrestrictedAISystem:
         commands = {
             'status': 'Show system status and statistics',
             'scan': 'Rescan training data folder',
+            'jobs': 'Show background job timings and the task queue',
             'create': 'Start content creation wizard',
             'words': 'Discover and extract words from data',
             'phones': 'Extract phone numbers from data',
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+IngestPipeline tests: deduplication, rename detection, removal and error
+handling, with plain callables standing in for the learner.
+
+Generate src/ first (python build.py), then run from the project root:
+python -m unittest discover tests
+"""
+
+import os
+import sys
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.processing.file_manifest import FileManifest
+from src.processing.ingest_pipeline import IngestPipeline
+
+def analyze(file_path, loaded):
+    """Module-level, so the spawned analysis processes can unpickle it"""
+    return os.getpid()
+
+class FakeLearner:
+    """Records what the pipeline asks of it"""
+
+    def __init__(self, fail_paths=()):
+        self.fail_paths = set(fail_paths)
+        self.hashed = []
+        self.loaded = []
+        self.committed = {}
+        self.analyses = {}
+        self.links = {}
+        self.unlinked = []
+        self._lock = threading.Lock()
+
+    def hash_func(self, file_path):
+        with self._lock:
+            self.hashed.append(file_path)
+        with open(file_path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    def is_processed(self, file_hash):
+        return file_hash in self.committed
+
+    def load_func(self, file_path, file_hash):
+        with self._lock:
+            self.loaded.append(file_path)
+        if file_path in self.fail_paths:
+            raise OSError('unreadable')
+        with open(file_path) as f:
+            return f.read()
+
+    def commit_func(self, file_path, file_hash, loaded, analysis):
+        self.committed[file_hash] = loaded
+        self.analyses[file_path] = analysis
+
+    def link_func(self, file_path, file_hash, file_stat):
+        self.links[file_path] = file_hash
+
+    def unlink_func(self, file_path):
+        self.unlinked.append(file_path)
+        self.links.pop(file_path, None)
+
+    def is_linked(self, file_path, file_hash):
+        return self.links.get(file_path) == file_hash
+
+class IngestPipelineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.directory = os.path.join(self.root, 'data')
+        os.makedirs(self.directory)
+        self.manifest = FileManifest(os.path.join(self.root, 'manifest.json'))
+        self.pipeline = IngestPipeline(workers=4)
+
+    def tearDown(self):
+        self.pipeline.close()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def write(self, name, text):
+        """Write a file dated out of the manifest's racy window"""
+        file_path = os.path.join(self.directory, name)
+        with open(file_path, 'w') as f:
+            f.write(text)
+        past = time.time() - 3600
+        os.utime(file_path, (past, past))
+        return file_path
+
+    def run_pipeline(self, learner):
+        return self.pipeline.run(
+            self.directory, self.manifest,
+            hash_func=learner.hash_func,
+            is_processed=learner.is_processed,
+            load_func=learner.load_func,
+            commit_func=learner.commit_func,
+            link_func=learner.link_func,
+            unlink_func=learner.unlink_func,
+            is_linked=learner.is_linked
+        )
+
+    def test_duplicates_in_one_scan_load_once_and_link_every_path(self):
+        paths = [self.write(f'copy{i}.txt', 'same content') for i in range(8)]
+        learner = FakeLearner()
+        stats = self.run_pipeline(learner)
+
+        self.assertEqual(len(learner.loaded), 1)
+        self.assertEqual(len(learner.committed), 1)
+        self.assertEqual(stats['ingested'], 1)
+        file_hash = next(iter(learner.committed))
+        self.assertEqual(learner.links, {path: file_hash for path in paths})
+
+    def test_rename_relinks_without_rehashing(self):
+        old_path = self.write('before.txt', 'moving content')
+        learner = FakeLearner()
+        self.run_pipeline(learner)
+        file_hash = learner.links[old_path]
+
+        new_path = os.path.join(self.directory, 'after.txt')
+        os.rename(old_path, new_path)
+        learner.hashed.clear()
+        learner.loaded.clear()
+        stats = self.run_pipeline(learner)
+
+        self.assertEqual(learner.hashed, [])
+        self.assertEqual(learner.loaded, [])
+        self.assertEqual(stats['moved'], 1)
+        self.assertEqual(learner.links, {new_path: file_hash})
+        self.assertEqual(learner.unlinked, [old_path])
+
+    def test_deleted_path_is_unlinked(self):
+        kept = self.write('kept.txt', 'kept')
+        removed = self.write('removed.txt', 'removed')
+        learner = FakeLearner()
+        self.run_pipeline(learner)
+
+        os.remove(removed)
+        stats = self.run_pipeline(learner)
+        self.assertEqual(stats['removed'], 1)
+        self.assertEqual(learner.unlinked, [removed])
+        self.assertEqual(list(learner.links), [kept])
+
+        # Watcher-style runs over given paths unlink the same way
+        os.remove(kept)
+        self.pipeline.run(self.directory, self.manifest, learner.hash_func, learner.is_processed,
+                          learner.load_func, learner.commit_func, paths=[kept],
+                          link_func=learner.link_func, unlink_func=learner.unlink_func)
+        self.assertEqual(learner.unlinked, [removed, kept])
+        self.assertEqual(learner.links, {})
+
+    def test_worker_error_is_counted_and_retried(self):
+        good = [self.write(f'good{i}.txt', f'good {i}') for i in range(20)]
+        bad = self.write('bad.txt', 'bad')
+        learner = FakeLearner(fail_paths=[bad])
+
+        finished = []
+        thread = threading.Thread(target=lambda: finished.append(self.run_pipeline(learner)))
+        thread.start()
+        thread.join(timeout=30)
+        self.assertFalse(thread.is_alive(), 'pipeline stalled after a worker error')
+
+        stats = finished[0]
+        self.assertEqual(stats['errors'], 1)
+        self.assertEqual(stats['ingested'], len(good))
+        self.assertNotIn(bad, learner.links)
+
+        # The failed file was not recorded, so the next run tries it again
+        learner.fail_paths.clear()
+        learner.hashed.clear()
+        stats = self.run_pipeline(learner)
+        self.assertEqual(learner.hashed, [bad])
+        self.assertEqual(stats['errors'], 0)
+        self.assertIn(bad, learner.links)
+
+    def test_only_cpu_bound_files_go_to_the_process_pool(self):
+        heavy = self.write('heavy.pdf', 'heavy')
+        light = self.write('light.txt', 'light')
+        learner = FakeLearner()
+        pipeline = IngestPipeline(workers=2, analysis_processes=1)
+        try:
+            pipeline.run(self.directory, self.manifest, learner.hash_func, learner.is_processed,
+                         learner.load_func, learner.commit_func, analyze_func=analyze,
+                         cpu_bound_func=lambda file_path, loaded: file_path.endswith('.pdf'))
+        finally:
+            pipeline.close()
+
+        self.assertNotEqual(learner.analyses[heavy], os.getpid())
+        self.assertEqual(learner.analyses[light], os.getpid())
+
+if __name__ == '__main__':
+    unittest.main()
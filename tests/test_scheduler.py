@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Scheduler shutdown tests: bounded by its timeout, and no accepted task is
+silently lost.
+
+Generate src/ first (python build.py), then run from the project root:
+python -m unittest discover tests
+"""
+
+import os
+import sys
+import time
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.scheduler import Scheduler
+
+class SchedulerShutdownTest(unittest.TestCase):
+
+    def test_stuck_worker_and_full_queue_do_not_hang_shutdown(self):
+        scheduler = Scheduler('test', max_pending=2)
+        release = threading.Event()
+        self.addCleanup(release.set)
+        scheduler.submit('stuck', release.wait)
+        time.sleep(0.05)
+        scheduler.submit('a', lambda: None)
+        scheduler.submit('b', lambda: None)
+
+        started = time.monotonic()
+        result = scheduler.shutdown(timeout=0.5)
+        self.assertLess(time.monotonic() - started, 2.0)
+        self.assertEqual(result['unfinished'], ['test-tasks'])
+
+    def test_submit_is_rejected_once_shutdown_started(self):
+        scheduler = Scheduler('test')
+        scheduler.shutdown()
+        with self.assertRaises(RuntimeError):
+            scheduler.submit('late', lambda: None)
+
+    def test_submit_blocked_on_full_queue_still_runs(self):
+        scheduler = Scheduler('test', max_pending=1)
+        ran = []
+        release = threading.Event()
+        scheduler.submit('slow', release.wait)
+        time.sleep(0.05)
+        scheduler.submit('queued', ran.append, 'queued')
+        producer = threading.Thread(target=scheduler.submit, args=('blocked', ran.append, 'blocked'))
+        producer.start()
+        time.sleep(0.05)
+
+        threading.Timer(0.2, release.set).start()
+        result = scheduler.shutdown(timeout=5)
+        producer.join(5)
+        self.assertEqual(ran, ['queued', 'blocked'])
+        self.assertEqual(result, {'dropped_tasks': 0, 'unfinished': []})
+
+    def test_shutdown_without_drain_counts_dropped_tasks(self):
+        scheduler = Scheduler('test', max_pending=10)
+        ran = []
+        release = threading.Event()
+        scheduler.submit('slow', release.wait)
+        time.sleep(0.05)
+        for i in range(5):
+            scheduler.submit('task', ran.append, i)
+
+        threading.Timer(0.1, release.set).start()
+        result = scheduler.shutdown(drain=False, timeout=5)
+        self.assertEqual(ran, [])
+        self.assertEqual(result, {'dropped_tasks': 5, 'unfinished': []})
+
+if __name__ == '__main__':
+    unittest.main()
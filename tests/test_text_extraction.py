@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+ChunkScanner tests: scanning a text in chunks must find what a single
+findall over the whole text finds.
+
+Generate src/ first (python build.py), then run from the project root:
+python -m unittest discover tests
+"""
+
+import os
+import re
+import sys
+import random
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.processing.text_extraction import ChunkScanner
+
+# Every pattern matches at most 12 characters, below the overlap used here
+PATTERNS = [
+    r'\b[a-zA-Z]{3,12}\b',
+    r'(?<=@)[a-z]{1,8}',
+    r'(?<![0-9])[0-9]{2,4}',
+    r'\d{3}-\d{4}',
+    r'[a-z]+@[a-z]+\.com'
+]
+
+ALPHABET = 'abcdefgh ABC 0123456789 @.-\n'
+
+def scan_in_chunks(pattern, text, sizes, overlap):
+    scanner = ChunkScanner(pattern, overlap=overlap)
+    found = []
+    position = 0
+    for size in sizes:
+        found += scanner.feed(text[position:position + size])
+        position += size
+    found += scanner.feed(text[position:])
+    return found + scanner.close()
+
+class ChunkScannerTest(unittest.TestCase):
+
+    def test_context_before_held_back_text(self):
+        # The held-back 'abcd' follows a digit, so \b cannot match before it
+        scanner = ChunkScanner(r'\b[a-zA-Z]{3,}\b', overlap=4)
+        found = scanner.feed('xxxxxxxxxx 12345') + scanner.feed('abcd') + scanner.close()
+        self.assertEqual(found, re.findall(r'\b[a-zA-Z]{3,}\b', 'xxxxxxxxxx 12345abcd'))
+
+    def test_matches_whole_text_findall(self):
+        rng = random.Random(7)
+        for _ in range(300):
+            text = ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 400)))
+            sizes = [rng.randint(0, 40) for _ in range(rng.randint(1, 20))]
+            for pattern in PATTERNS:
+                with self.subTest(pattern=pattern, text=text, sizes=sizes):
+                    self.assertEqual(scan_in_chunks(pattern, text, sizes, overlap=16),
+                                     re.findall(pattern, text))
+
+    def test_single_chunk(self):
+        text = 'call 555-1234 or mail bob@example.com'
+        for pattern in PATTERNS:
+            self.assertEqual(scan_in_chunks(pattern, text, [], overlap=16), re.findall(pattern, text))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Learner ingestion tests: every stored entry must stay reachable from the
+paths holding it, so deleting the files forgets it again.
+
+Generate src/ first (python build.py), then run from the project root:
+python -m unittest discover tests
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.unrestricted_learning import AdvancedUnrestrictedLearning
+
+def write_backdated(file_path, text):
+    """Write a file dated out of the manifest's racy window, so its hash is reused"""
+    with open(file_path, 'w') as f:
+        f.write(text)
+    past = time.time() - 3600
+    os.utime(file_path, (past, past))
+
+class PathLinkTest(unittest.TestCase):
+
+    def setUp(self):
+        # The learner keeps its state in ./knowledge
+        self.cwd = os.getcwd()
+        self.root = tempfile.mkdtemp()
+        os.chdir(self.root)
+        self.data_folder = os.path.join(self.root, 'training_data')
+        self.learner = AdvancedUnrestrictedLearning(self.data_folder, background_warm_up=False)
+
+    def tearDown(self):
+        self.learner.knowledge_base.close()
+        os.chdir(self.cwd)
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_retried_file_is_forgotten_once_deleted(self):
+        file_path = os.path.join(self.data_folder, 'documents', 'notes.txt')
+        write_backdated(file_path, 'the zeppelin lands at noon')
+
+        load_file = self.learner._load_file
+        failures = []
+
+        def load_once_failing(path, file_hash):
+            if path == file_path and not failures:
+                failures.append(path)
+                raise OSError('transient read error')
+            return load_file(path, file_hash)
+
+        self.learner._load_file = load_once_failing
+        self.learner._scan_directory(self.data_folder)
+        self.assertEqual(failures, [file_path])
+        self.assertEqual(self.learner.last_ingest_stats['errors'], 1)
+        self.assertEqual(self.learner.search_knowledge('zeppelin'), [])
+
+        self.learner._scan_directory(self.data_folder)
+        file_hash = self.learner.knowledge_base.find_by_path(file_path)
+        self.assertIsNotNone(file_hash)
+        self.assertEqual(self.learner.knowledge_base.paths_for(file_hash), [file_path])
+        self.assertEqual([hit['file_path'] for hit in self.learner.search_knowledge('zeppelin')], [file_path])
+
+        os.remove(file_path)
+        self.learner._scan_directory(self.data_folder)
+        self.assertNotIn(file_hash, self.learner.knowledge_base)
+        self.assertNotIn(file_hash, self.learner.processed_files)
+        self.assertEqual(self.learner.search_knowledge('zeppelin'), [])
+
+    def test_unlinked_known_content_is_linked_again(self):
+        file_path = os.path.join(self.data_folder, 'documents', 'notes.txt')
+        write_backdated(file_path, 'the zeppelin lands at noon')
+        self.learner._scan_directory(self.data_folder)
+        file_hash = self.learner.knowledge_base.find_by_path(file_path)
+
+        # As left by a scan that stored the content but never linked the path
+        conn = self.learner.knowledge_base._connection()
+        conn.execute("DELETE FROM paths")
+        conn.execute("UPDATE blobs SET refcount = 0")
+        conn.commit()
+
+        self.learner._scan_directory(self.data_folder)
+        self.assertEqual(self.learner.knowledge_base.paths_for(file_hash), [file_path])
+
+        os.remove(file_path)
+        self.learner._scan_directory(self.data_folder)
+        self.assertNotIn(file_hash, self.learner.knowledge_base)
+        self.assertEqual(self.learner.search_knowledge('zeppelin'), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -12,13 +12,24 @@ import hashlib
 import re
 import random
 import threading
-import zipfile
-import tarfile
-import shutil
 import pickle
+import struct
+import zlib
 from datetime import datetime
 from pathlib import Path
 
+# Shared processing helpers from the generated src/ tree, when importable
+try:
+    from src.processing.hashing import hash_file
+    from src.processing.file_watcher import FileWatcher
+    from src.processing.archive_reader import ArchiveReader
+except ImportError:
+    hash_file = None
+    FileWatcher = None
+    ArchiveReader = None
+
+TEXT_EXTENSIONS = ['.txt', '.md', '.json', '.xml', '.html', '.htm', '.py', '.js', '.csv']
+
 print("🤖 ULTIMATE AI UPDATER - Starting complete system fix...")
 
 # ============================================
@@ -220,6 +231,211 @@ spacy>=3.0.0
 # ============================================
 # PART 2: SILENT AUTO-LEARNING SYSTEM
 # ============================================
+def _empty_knowledge():
+    return {
+        'processed_files': [],
+        'patterns': {},
+        'extracted_data': {},
+        'content': {},
+        'total_integrated': 0
+    }
+
+class KnowledgeLog:
+    """Append-only, checksummed record log on top of a pickle snapshot
+    
+    Each batch appends only its own records, so save cost tracks the new
+    files rather than the whole knowledge dict. Records are framed as
+    (length, crc32, pickle); a torn write from a crash is detected on replay
+    and cut off. Compaction writes a fresh snapshot and swaps it in with an
+    atomic rename before truncating the log.
+    
+    Every record carries a sequence number and the snapshot stores the last
+    one it covers ('log_seq'), so replay skips records already in it.
+    
+    Knowledge is content addressed: 'content' maps a file hash to what was
+    extracted from it plus a reference count, and 'extracted_data' maps
+    each path to its hash. A duplicate or renamed file only adds a small
+    'link' record; content goes away with its last path.
+    """
+    
+    HEADER = struct.Struct('<II')
+    
+    def __init__(self, snapshot_file, compact_bytes=8 * 1024 * 1024):
+        self.snapshot_file = Path(snapshot_file)
+        self.log_file = self.snapshot_file.with_suffix('.log')
+        self.compact_bytes = compact_bytes
+        self.last_seq = 0
+    
+    def load(self):
+        """Load the snapshot and replay every intact record after it"""
+        knowledge = _empty_knowledge()
+        if self.snapshot_file.exists():
+            try:
+                with open(self.snapshot_file, 'rb') as f:
+                    knowledge = pickle.load(f)
+            except:
+                knowledge = _empty_knowledge()
+        self._upgrade(knowledge)
+        covered = knowledge.get('log_seq', 0)
+        self.last_seq = covered
+        
+        if not self.log_file.exists():
+            return knowledge
+        
+        good_offset = 0
+        with open(self.log_file, 'rb') as f:
+            while True:
+                header = f.read(self.HEADER.size)
+                if len(header) < self.HEADER.size:
+                    break
+                length, checksum = self.HEADER.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload) != checksum:
+                    break
+                try:
+                    seq, record = self._unframe(pickle.loads(payload))
+                    if seq is None or seq > covered:
+                        self.apply(knowledge, record)
+                except Exception:
+                    break
+                if seq is not None:
+                    self.last_seq = max(self.last_seq, seq)
+                good_offset = f.tell()
+        
+        # Drop a partially written tail so later appends start on a record boundary
+        if good_offset < self.log_file.stat().st_size:
+            with open(self.log_file, 'r+b') as f:
+                f.truncate(good_offset)
+        
+        return knowledge
+    
+    @staticmethod
+    def _unframe(payload):
+        """Split a logged payload into (seq, record)
+        
+        Logs written before sequence numbers hold bare records, whose first
+        item is the op name; those get seq None and are always replayed.
+        """
+        if isinstance(payload[0], int):
+            return payload
+        return None, payload
+    
+    @staticmethod
+    def _upgrade(knowledge):
+        """Move text embedded in per-path entries (older snapshots) into content"""
+        content = knowledge.setdefault('content', {})
+        for entry in knowledge['extracted_data'].values():
+            extracted = entry.pop('extracted', None)
+            if extracted is not None:
+                content.setdefault(entry['hash'], {'extracted': extracted, 'refs': 0})
+                content[entry['hash']]['refs'] += 1
+    
+    @staticmethod
+    def apply(knowledge, record):
+        """Apply one log record to the in-memory knowledge dict
+        
+        Returns the hashes forgotten because their content lost its last path.
+        """
+        op = record[0]
+        if op == 'integrate':
+            _, file_hash, file_key, entry = record
+            content = knowledge.setdefault('content', {})
+            if file_hash not in content:
+                content[file_hash] = {'extracted': entry['extracted'], 'refs': 0}
+                knowledge['processed_files'].append(file_hash)
+                knowledge['processed_files'].extend(entry['extracted'].get('member_hashes', []))
+            knowledge['total_integrated'] = knowledge.get('total_integrated', 0) + 1
+            path_entry = {k: v for k, v in entry.items() if k != 'extracted'}
+            return KnowledgeLog._link(knowledge, file_key, file_hash, path_entry)
+        elif op == 'link':
+            _, file_hash, file_key, path_entry = record
+            return KnowledgeLog._link(knowledge, file_key, file_hash, dict(path_entry))
+        elif op == 'unlink':
+            _, file_key = record
+            return KnowledgeLog._unlink(knowledge, file_key)
+        elif op == 'set':
+            _, field, value = record
+            knowledge[field] = value
+        return []
+    
+    @staticmethod
+    def _link(knowledge, file_key, file_hash, path_entry):
+        """Point a path at stored content, releasing whatever it held before"""
+        old = knowledge['extracted_data'].get(file_key)
+        if old is not None and old['hash'] == file_hash:
+            old.update(path_entry)
+            return []
+        
+        dropped = KnowledgeLog._unlink(knowledge, file_key) if old is not None else []
+        knowledge['extracted_data'][file_key] = path_entry
+        if file_hash in knowledge['content']:
+            knowledge['content'][file_hash]['refs'] += 1
+        return dropped
+    
+    @staticmethod
+    def _unlink(knowledge, file_key):
+        """Drop a path; forget its content when no other path refers to it"""
+        entry = knowledge['extracted_data'].pop(file_key, None)
+        stored = knowledge['content'].get(entry['hash']) if entry else None
+        if stored is None:
+            return []
+        
+        stored['refs'] -= 1
+        if stored['refs'] > 0:
+            return []
+        
+        del knowledge['content'][entry['hash']]
+        dropped = [entry['hash']] + list(stored['extracted'].get('member_hashes', []))
+        dropped_set = set(dropped)
+        knowledge['processed_files'] = [h for h in knowledge['processed_files'] if h not in dropped_set]
+        return dropped
+    
+    def append(self, records):
+        """Durably append a batch of records"""
+        if not records:
+            return
+        
+        chunks = []
+        for record in records:
+            self.last_seq += 1
+            payload = pickle.dumps((self.last_seq, record), protocol=pickle.HIGHEST_PROTOCOL)
+            chunks.append(self.HEADER.pack(len(payload), zlib.crc32(payload)))
+            chunks.append(payload)
+        
+        self.log_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.log_file, 'ab') as f:
+            f.write(b''.join(chunks))
+            f.flush()
+            os.fsync(f.fileno())
+    
+    def needs_compaction(self):
+        try:
+            return self.log_file.stat().st_size >= self.compact_bytes
+        except OSError:
+            return False
+    
+    def compact(self, knowledge):
+        """Write a full snapshot atomically, then start an empty log
+        
+        knowledge must already hold every appended record; the snapshot is
+        stamped with the last sequence number as the point it covers.
+        """
+        knowledge['log_seq'] = self.last_seq
+        self.snapshot_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.snapshot_file.with_suffix('.pkl.tmp')
+        with open(tmp_file, 'wb') as f:
+            pickle.dump(knowledge, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.snapshot_file)
+        
+        # Replaying the old log onto the new snapshot would apply records
+        # twice (refs counted again, 'integrate' totals bumped), so a crash
+        # before the truncate relies on load() skipping seq <= log_seq
+        with open(self.log_file, 'wb') as f:
+            f.flush()
+            os.fsync(f.fileno())
+
 class SilentAutoLearner:
     """Silent system that auto-learns from training_data/ every 60 seconds"""
     
@@ -230,6 +446,9 @@ class SilentAutoLearner:
         self.running = True
         self.last_scan_time = 0
         self.total_integrated = 0
+        self.max_archive_depth = 3
+        self.knowledge_log = KnowledgeLog(self.knowledge_file)
+        self.file_watcher = None
         
         # Auto-setup
         self._silent_setup()
@@ -242,30 +461,21 @@ class SilentAutoLearner:
         for d in dirs:
             Path(d).mkdir(exist_ok=True)
         
-        # Load existing knowledge
-        if self.knowledge_file.exists():
-            try:
-                with open(self.knowledge_file, 'rb') as f:
-                    self.knowledge = pickle.load(f)
-                    self.processed_files = set(self.knowledge.get('processed_files', []))
-                    self.total_integrated = self.knowledge.get('total_integrated', 0)
-            except:
-                self.knowledge = {
-                    'processed_files': [],
-                    'patterns': {},
-                    'extracted_data': {},
-                    'total_integrated': 0
-                }
-        else:
-            self.knowledge = {
-                'processed_files': [],
-                'patterns': {},
-                'extracted_data': {},
-                'total_integrated': 0
-            }
+        # Load existing knowledge: snapshot plus replayed log records
+        self.knowledge = self.knowledge_log.load()
+        self.processed_files = set(self.knowledge.get('processed_files', []))
+        self.total_integrated = self.knowledge.get('total_integrated', 0)
     
     def _start_silent_scanner(self):
         """Start the 60-second auto-scan thread"""
+        if FileWatcher is not None:
+            # Event-driven: only changed paths are integrated, within the debounce window
+            self.file_watcher = FileWatcher(self.data_folder, self._scan_and_integrate,
+                                            rescan_on_start=True).start()
+            print(f"🔍 Silent auto-scanner started (event-driven, polling fallback every 60 seconds)")
+            print(f"📁 Watching: {self.data_folder}/")
+            return
+        
         def scanner_loop():
             while self.running:
                 try:
@@ -279,16 +489,34 @@ class SilentAutoLearner:
         print(f"🔍 Silent auto-scanner started (checks every 60 seconds)")
         print(f"📁 Watching: {self.data_folder}/")
     
-    def _scan_and_integrate(self):
-        """Scan for new files and integrate them"""
+    def _scan_and_integrate(self, paths=None):
+        """Scan for new files and integrate them (only paths, if given)"""
         new_files = []
+        duplicates = []
+        records = []
         
         if self.data_folder.exists():
-            # Find all files
-            for file_path in self.data_folder.rglob('*'):
+            # Find all files, or just the ones the watcher reported
+            candidates = self.data_folder.rglob('*') if paths is None else (Path(p) for p in paths)
+            extracted_data = self.knowledge['extracted_data']
+            seen_keys = set()
+            pending = set()
+            for file_path in candidates:
                 if file_path.is_file():
+                    file_key = str(file_path.relative_to(self.data_folder))
+                    seen_keys.add(file_key)
                     file_hash = self._hash_file(file_path)
-                    if file_hash not in self.processed_files:
+                    known = extracted_data.get(file_key)
+                    if known is not None and known['hash'] == file_hash:
+                        continue
+                    
+                    if file_hash in self.knowledge['content'] or file_hash in pending:
+                        # Duplicate or renamed file: reference the stored content
+                        duplicates.append((file_path, file_hash))
+                    else:
+                        # processed_files also holds archive members, which have
+                        # no content of their own, so it cannot mean "stored"
+                        pending.add(file_hash)
                         new_files.append((file_path, file_hash))
             
             # Process new files
@@ -300,19 +528,15 @@ class SilentAutoLearner:
                         # Extract and learn from file
                         extracted = self._extract_file_data(file_path)
                         
-                        # Add to knowledge
-                        self.processed_files.add(file_hash)
-                        self.knowledge['processed_files'].append(file_hash)
-                        
-                        # Store extracted data
+                        # Add to knowledge and queue the same change for the log
                         file_key = str(file_path.relative_to(self.data_folder))
-                        self.knowledge['extracted_data'][file_key] = {
-                            'hash': file_hash,
-                            'path': str(file_path),
-                            'size': file_path.stat().st_size,
-                            'extracted': extracted,
-                            'integrated_at': datetime.now().isoformat()
-                        }
+                        entry = self._path_entry(file_path, file_hash)
+                        entry['extracted'] = extracted
+                        record = ('integrate', file_hash, file_key, entry)
+                        self._apply(record)
+                        records.append(record)
+                        self.processed_files.add(file_hash)
+                        self.processed_files.update(extracted.get('member_hashes', []))
                         
                         self.total_integrated += 1
                         print(f"✅ Integrated: {file_path.name} ({extracted['type']})")
@@ -320,63 +544,81 @@ class SilentAutoLearner:
                     except Exception as e:
                         print(f"❌ Failed to integrate {file_path.name}: {str(e)[:50]}")
                 
-                # Save knowledge
-                self.knowledge['total_integrated'] = self.total_integrated
-                self._save_knowledge()
-                
                 print(f"📊 Total files integrated: {self.total_integrated}")
+            
+            # Links go in before unlinks so a rename never drops the content it keeps
+            relinked = []
+            for file_path, file_hash in duplicates:
+                if file_hash in self.knowledge['content']:
+                    file_key = str(file_path.relative_to(self.data_folder))
+                    relinked.append(('link', file_hash, file_key, self._path_entry(file_path, file_hash)))
+            relinked.extend(('unlink', file_key) for file_key in self._removed_keys(paths, seen_keys))
+            
+            for record in relinked:
+                self._apply(record)
+            records.extend(relinked)
+            if relinked:
+                print(f"🔗 AUTO-SCAN: {sum(r[0] == 'link' for r in relinked)} path(s) linked to known content, "
+                      f"{sum(r[0] == 'unlink' for r in relinked)} removed")
+            
+            # Save knowledge: append this batch only
+            if records:
+                self._save_knowledge(records)
+    
+    def _path_entry(self, file_path, file_hash):
+        """Per-path metadata; the extracted data itself lives under content"""
+        return {
+            'hash': file_hash,
+            'path': str(file_path),
+            'size': file_path.stat().st_size,
+            'integrated_at': datetime.now().isoformat()
+        }
+    
+    def _removed_keys(self, paths, seen_keys):
+        """Keys of integrated paths that no longer exist on disk"""
+        extracted_data = self.knowledge['extracted_data']
+        if paths is None:
+            return [key for key in extracted_data if key not in seen_keys]
+        
+        removed = []
+        for path in paths:
+            path = Path(path)
+            if path.exists():
+                continue
+            try:
+                key = str(path.relative_to(self.data_folder))
+            except ValueError:
+                continue
+            # A removed directory takes every path under it along
+            prefix = os.path.join(key, '')
+            removed.extend(k for k in extracted_data if k == key or k.startswith(prefix))
+        return removed
+    
+    def _apply(self, record):
+        """Apply a record to knowledge, forgetting hashes whose content is gone"""
+        for file_hash in KnowledgeLog.apply(self.knowledge, record):
+            self.processed_files.discard(file_hash)
     
     def _extract_file_data(self, file_path):
         """Extract data from any file type"""
         ext = file_path.suffix.lower()
         
         # Text-based files
-        if ext in ['.txt', '.md', '.json', '.xml', '.html', '.htm', '.py', '.js', '.csv']:
+        if ext in TEXT_EXTENSIONS:
             try:
                 with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
                     content = f.read()
                 
-                # Extract patterns
-                emails = re.findall(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', content)
-                phones = re.findall(r'(\+?\d{1,3}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}', content)
-                urls = re.findall(r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+', content)
-                words = re.findall(r'\b[a-zA-Z]{3,}\b', content)
-                
-                return {
-                    'type': 'text',
-                    'length': len(content),
-                    'words_count': len(words),
-                    'emails': emails[:10],  # First 10
-                    'phones': phones[:10],
-                    'urls': urls[:10],
-                    'sample_words': random.sample(words, min(20, len(words))) if words else []
-                }
+                return self._extract_text_data(content)
             except:
                 return {'type': 'text', 'error': 'read_failed'}
         
-        # Archive files
+        # Archive files: members are streamed, never extracted to disk
         elif ext in ['.zip', '.tar', '.gz', '.rar', '.7z']:
+            if ArchiveReader is None:
+                return {'type': 'archive', 'error': 'archive_reader_unavailable'}
             try:
-                extract_path = Path("extracted") / file_path.stem
-                if extract_path.exists():
-                    shutil.rmtree(extract_path)
-                extract_path.mkdir(parents=True)
-                
-                if ext == '.zip':
-                    with zipfile.ZipFile(file_path, 'r') as zip_ref:
-                        zip_ref.extractall(extract_path)
-                elif ext in ['.tar', '.gz']:
-                    with tarfile.open(file_path, 'r:*') as tar_ref:
-                        tar_ref.extractall(extract_path)
-                
-                # Count extracted files
-                extracted_count = sum(1 for _ in extract_path.rglob('*') if _.is_file())
-                
-                return {
-                    'type': 'archive',
-                    'extracted_files': extracted_count,
-                    'extract_path': str(extract_path)
-                }
+                return self._extract_archive_data(file_path)
             except:
                 return {'type': 'archive', 'error': 'extract_failed'}
         
@@ -388,19 +630,79 @@ class SilentAutoLearner:
                 'extension': ext
             }
     
+    def _extract_text_data(self, content):
+        """Extract patterns from text content"""
+        emails = re.findall(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', content)
+        phones = re.findall(r'(\+?\d{1,3}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}', content)
+        urls = re.findall(r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+', content)
+        words = re.findall(r'\b[a-zA-Z]{3,}\b', content)
+        
+        return {
+            'type': 'text',
+            'length': len(content),
+            'words_count': len(words),
+            'emails': emails[:10],  # First 10
+            'phones': phones[:10],
+            'urls': urls[:10],
+            'sample_words': random.sample(words, min(20, len(words))) if words else []
+        }
+    
+    def _extract_archive_data(self, file_path):
+        """Analyze only the archive members whose content is new"""
+        reader = ArchiveReader(max_depth=self.max_archive_depth)
+        members = {}
+        member_hashes = []
+        total = 0
+        
+        for member in reader.iter_members(str(file_path)):
+            total += 1
+            if member.content_hash in self.processed_files or member.content_hash in member_hashes:
+                continue
+            
+            if member.extension in TEXT_EXTENSIONS:
+                data = self._extract_text_data(member.read().decode('utf-8', errors='ignore'))
+            else:
+                data = {'type': 'binary', 'size': member.size, 'extension': member.extension}
+            data['hash'] = member.content_hash
+            members[member.name] = data
+            member_hashes.append(member.content_hash)
+        
+        return {
+            'type': 'archive',
+            'members': total,
+            'new_members': len(members),
+            'member_data': members,
+            'member_hashes': member_hashes,
+            'truncated': reader.truncated
+        }
+    
     def _hash_file(self, file_path):
         """Create hash of file"""
         try:
+            if hash_file is not None:
+                return hash_file(file_path)
+            
+            # Stream in fixed-size chunks so large files never sit in memory
+            hasher = hashlib.blake2b(digest_size=16)
             with open(file_path, 'rb') as f:
-                return hashlib.md5(f.read()).hexdigest()
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    hasher.update(chunk)
+            return hasher.hexdigest()
         except:
             return hashlib.md5(str(file_path).encode()).hexdigest()
     
-    def _save_knowledge(self):
-        """Save knowledge to disk"""
+    def _save_knowledge(self, records=None):
+        """Save knowledge to disk
+        
+        With records, appends just those to the log and compacts once the log
+        has grown large; without, writes a full snapshot.
+        """
         try:
-            with open(self.knowledge_file, 'wb') as f:
-                pickle.dump(self.knowledge, f)
+            if records is not None:
+                self.knowledge_log.append(records)
+                if not self.knowledge_log.needs_compaction():
+                    return
+            self.knowledge_log.compact(self.knowledge)
         except:
             pass
     
@@ -410,12 +712,16 @@ class SilentAutoLearner:
             'total_integrated': self.total_integrated,
             'processed_files': len(self.processed_files),
             'knowledge_size': len(self.knowledge.get('extracted_data', {})),
-            'watching_folder': str(self.data_folder)
+            'unique_contents': len(self.knowledge.get('content', {})),
+            'watching_folder': str(self.data_folder),
+            'ingest_latency': self.file_watcher.latency_stats() if self.file_watcher else {}
         }
     
     def stop(self):
         """Stop the scanner"""
         self.running = False
+        if self.file_watcher is not None:
+            self.file_watcher.stop()
         self._save_knowledge()
 
 # ============================================
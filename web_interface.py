@@ -7,13 +7,19 @@ Open browser to: http://localhost:5000
 
 import os
 import sys
+import uuid
+import sqlite3
 import threading
 import json
 import webbrowser
 from datetime import datetime
+from collections import OrderedDict, deque
+from typing import Dict, Optional
 from flask import Flask, render_template, request, jsonify, session, Response
 from flask_socketio import SocketIO, emit
 import eventlet
+from eventlet import tpool
+from eventlet.semaphore import Semaphore
 eventlet.monkey_patch()
 
 # Import the AI system
@@ -21,6 +27,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 try:
     from src.unrestricted_learning import AdvancedUnrestrictedLearning
     from src.content_generator import ContentGenerator, VoiceType, ContentType, AudienceType, ContentStyle
+    from src.intent_router import IntentRouter, ResponseCache
     AI_AVAILABLE = True
 except ImportError as e:
     print(f"Warning: Could not import AI modules: {e}")
@@ -35,13 +42,240 @@ socketio = SocketIO(app, async_mode='eventlet', cors_allowed_origins="*")
 ai_system = None
 content_generator = None
 
+# Commands that can run for minutes; they become background jobs
+LONG_COMMANDS = {'scan', 'words', 'phones', 'emails'}
+
+# Stats changes are pushed to clients at most this often, in seconds
+STATS_PUSH_INTERVAL = 1.0
+
+# Chat intents in priority order; a keyword matches anywhere in the message
+INTENT_RULES = [
+    ('greeting', ['hello', 'hi', 'hey']),
+    ('status', ['status']),
+    ('scan', ['scan', 'analyze', 'process']),
+    ('create', ['create', 'generate', 'make']),
+    ('search', ['search', 'find', 'lookup']),
+    ('certificate', ['certificate', 'ssl', 'cert']),
+    ('gift', ['gift', 'card', 'amazon']),
+    ('help', ['help'])
+]
+
+# Intents whose reply depends on neither the message nor any state
+CACHED_INTENTS = {'greeting', 'help'}
+
+CHAT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    message TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_messages_session ON messages(session_id, id);
+"""
+
+# Largest page /api/history hands out
+MAX_HISTORY_PAGE = 200
+
+class ChatHistory:
+    """Per-session chat history in bounded memory
+    
+    Each session keeps its newest per_session messages in a ring buffer,
+    and at most max_sessions buffers stay in memory (least recently used
+    go first). With a spill_path, whatever falls out of memory is written
+    to SQLite, so older pages remain readable; without one it is dropped.
+    
+    Message ids increase across all sessions and double as the pagination
+    cursor: page(before=id) returns the messages just older than id.
+    Spilled messages are always older than a session's buffer, so a page
+    is at most one buffer slice plus one indexed query.
+    """
+    
+    def __init__(self, spill_path: Optional[str] = None, per_session: int = 200, max_sessions: int = 1000):
+        self.per_session = per_session
+        self.max_sessions = max_sessions
+        self.total = 0
+        self._buffers: 'OrderedDict[str, deque]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._next_id = 1
+        
+        if spill_path:
+            spill_dir = os.path.dirname(spill_path)
+            if spill_dir:
+                os.makedirs(spill_dir, exist_ok=True)
+            # One connection, only ever used under self._lock
+            self._conn = sqlite3.connect(spill_path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(CHAT_SCHEMA)
+            self._next_id = (self._conn.execute("SELECT MAX(id) FROM messages").fetchone()[0] or 0) + 1
+    
+    # === UPDATES ===
+    
+    def append(self, session_id: str, message: Dict) -> Dict:
+        """Store a message, returning it with its id"""
+        with self._lock:
+            message = dict(message, id=self._next_id)
+            self._next_id += 1
+            self.total += 1
+            
+            buffer = self._buffers.get(session_id)
+            if buffer is None:
+                buffer = self._buffers[session_id] = deque()
+                if len(self._buffers) > self.max_sessions:
+                    old_session, old_buffer = self._buffers.popitem(last=False)
+                    self._spill(old_session, old_buffer)
+            else:
+                self._buffers.move_to_end(session_id)
+            
+            if len(buffer) >= self.per_session:
+                self._spill(session_id, [buffer.popleft()])
+            buffer.append(message)
+            return message
+    
+    def _spill(self, session_id: str, messages):
+        if self._conn is None or not messages:
+            return
+        self._conn.executemany(
+            "INSERT INTO messages (id, session_id, message) VALUES (?, ?, ?)",
+            [(message['id'], session_id, json.dumps(message, default=str)) for message in messages]
+        )
+        self._conn.commit()
+    
+    def clear(self, session_id: str):
+        """Forget one session's history, in memory and on disk"""
+        with self._lock:
+            self._buffers.pop(session_id, None)
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+                self._conn.commit()
+    
+    # === QUERIES ===
+    
+    def page(self, session_id: str, before: Optional[int] = None, limit: int = 50) -> Dict:
+        """Up to limit messages older than before (newest when None), oldest first
+        
+        next_before is the cursor for the page before this one, or None at
+        the start of the history.
+        """
+        limit = max(1, min(limit, MAX_HISTORY_PAGE))
+        with self._lock:
+            buffered = [message for message in self._buffers.get(session_id, ())
+                        if before is None or message['id'] < before]
+            # One extra message tells whether an older page exists
+            messages = buffered[-(limit + 1):]
+            missing = limit + 1 - len(messages)
+            if missing > 0 and self._conn is not None:
+                oldest = messages[0]['id'] if messages else before
+                query = "SELECT message FROM messages WHERE session_id = ?"
+                params = [session_id]
+                if oldest is not None:
+                    query += " AND id < ?"
+                    params.append(oldest)
+                rows = self._conn.execute(query + " ORDER BY id DESC LIMIT ?", params + [missing]).fetchall()
+                messages = [json.loads(row[0]) for row in reversed(rows)] + messages
+        
+        has_more = len(messages) > limit
+        messages = messages[-limit:]
+        return {
+            'messages': messages,
+            'next_before': messages[0]['id'] if has_more and messages else None
+        }
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'sessions_in_memory': len(self._buffers),
+                'messages_in_memory': sum(len(buffer) for buffer in self._buffers.values()),
+                'messages_total': self.total,
+                'spill': self._conn is not None
+            }
+    
+    def close(self):
+        """Write every buffered message out, so the history survives a restart"""
+        with self._lock:
+            for session_id, buffer in self._buffers.items():
+                self._spill(session_id, list(buffer))
+            self._buffers.clear()
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+class JobManager:
+    """Background jobs for long learner operations
+    
+    The blocking work runs on eventlet's native thread pool (tpool), so the
+    green threads serving other clients keep going while it does. Callers
+    get a job id at once and either poll /api/jobs/<id> or wait for the
+    'job_update' socket event. At most max_running jobs run at a time; the
+    rest wait their turn.
+    """
+    
+    def __init__(self, max_running: int = 2, keep: int = 200):
+        self.jobs = OrderedDict()
+        self.keep = keep
+        self._slots = Semaphore(max_running)
+    
+    def submit(self, kind, func, *args, sid=None):
+        """Start func(*args) as a job; returns the job record"""
+        job = {
+            'job_id': uuid.uuid4().hex[:12],
+            'kind': kind,
+            'status': 'queued',
+            'submitted': datetime.now().isoformat(),
+            'started': None,
+            'finished': None,
+            'result': None,
+            'error': None
+        }
+        self.jobs[job['job_id']] = job
+        self._trim()
+        socketio.start_background_task(self._run, job, func, args, sid)
+        return dict(job)
+    
+    def _run(self, job, func, args, sid):
+        with self._slots:
+            job['status'] = 'running'
+            job['started'] = datetime.now().isoformat()
+            self._push(job, sid)
+            try:
+                job['result'] = tpool.execute(func, *args)
+                job['status'] = 'error' if isinstance(job['result'], dict) and 'error' in job['result'] else 'done'
+            except Exception as e:
+                job['status'] = 'error'
+                job['error'] = str(e)
+            job['finished'] = datetime.now().isoformat()
+        self._push(job, sid)
+    
+    def _push(self, job, sid):
+        """Tell the client that asked (or everyone, for REST jobs) about the job"""
+        if sid:
+            socketio.emit('job_update', dict(job), to=sid)
+        else:
+            socketio.emit('job_update', dict(job))
+    
+    def _trim(self):
+        """Forget the oldest finished jobs beyond keep"""
+        finished = [job_id for job_id, job in self.jobs.items() if job['status'] in ('done', 'error')]
+        for job_id in finished[:max(0, len(self.jobs) - self.keep)]:
+            del self.jobs[job_id]
+    
+    def get(self, job_id):
+        job = self.jobs.get(job_id)
+        return dict(job) if job else None
+    
+    def recent(self, limit: int = 20):
+        return [dict(job) for job in list(self.jobs.values())[-limit:]]
+
 class WebAISystem:
     def __init__(self):
         self.ai = None
         self.content_gen = None
+        self.router = None
+        self.response_cache = None
         self.is_running = False
-        self.chat_history = []
+        # Per-session and bounded; older messages spill to disk
+        self.history = ChatHistory(os.path.join('knowledge', 'chat_history.db'))
         self.system_status = "initializing"
+        self.jobs = JobManager()
         self._initialize()
     
     def _initialize(self):
@@ -50,8 +284,11 @@ class WebAISystem:
             if AI_AVAILABLE:
                 self.ai = AdvancedUnrestrictedLearning("training_data")
                 self.content_gen = ContentGenerator(learning_system=self.ai)
+                self.router = IntentRouter(INTENT_RULES)
+                self.response_cache = ResponseCache()
                 self.system_status = "ready"
-                print("✅ AI Systems Initialized")
+                # The learner's initial scan is still running; see readiness()
+                print("✅ AI Systems Initialized (warming up in the background)")
             else:
                 self.system_status = "simulation"
                 print("⚠️ Running in simulation mode")
@@ -59,6 +296,31 @@ class WebAISystem:
             self.system_status = f"error: {str(e)}"
             print(f"❌ AI Initialization Error: {e}")
     
+    def readiness(self):
+        """Warm-up state of the learner; always ready in simulation"""
+        if self.ai and AI_AVAILABLE:
+            return self.ai.readiness()
+        ready = not self.system_status.startswith('error')
+        return {'ready': ready, 'state': self.system_status, 'warm_up': {}, 'progress': {}}
+    
+    def stats_version(self):
+        """Version of the learner's stats snapshot; None in simulation"""
+        if self.ai and AI_AVAILABLE:
+            try:
+                return self.ai.get_stats_snapshot().version
+            except Exception:
+                pass
+        return None
+    
+    def status_etag(self):
+        """ETag for get_status(), computed without building it; None in simulation"""
+        if self.ai and AI_AVAILABLE:
+            try:
+                return f"{self.ai.get_stats_snapshot().etag}-{self.history.total}"
+            except Exception:
+                pass
+        return None
+    
     def get_status(self):
         """Get system status"""
         if self.ai and AI_AVAILABLE:
@@ -67,7 +329,7 @@ class WebAISystem:
                 return {
                     'status': 'operational',
                     'stats': stats,
-                    'chat_history': len(self.chat_history),
+                    'chat_history': self.history.total,
                     'mode': 'unrestricted',
                     'safety': 'disabled'
                 }
@@ -85,12 +347,13 @@ class WebAISystem:
             'safety': 'n/a'
         }
     
-    def process_message(self, message, user_id="user"):
+    def process_message(self, message, user_id="user", sid=None, session_id=None):
         """Process user message and generate response"""
         timestamp = datetime.now().isoformat()
+        session_id = session_id or user_id
         
         # Add to chat history
-        self.chat_history.append({
+        self.history.append(session_id, {
             'user': user_id,
             'message': message,
             'timestamp': timestamp,
@@ -101,7 +364,7 @@ class WebAISystem:
         if self.ai and AI_AVAILABLE:
             try:
                 # Analyze message for commands
-                response = self._analyze_message(message)
+                response = self._analyze_message(message, sid)
             except Exception as e:
                 response = f"AI Error: {str(e)}"
         else:
@@ -114,39 +377,42 @@ class WebAISystem:
             'timestamp': datetime.now().isoformat(),
             'type': 'ai'
         }
-        self.chat_history.append(ai_response)
-        
-        return ai_response
+        return self.history.append(session_id, ai_response)
     
-    def _analyze_message(self, message):
+    def _analyze_message(self, message, sid=None):
         """Analyze and respond to user message"""
-        message_lower = message.lower()
-        
-        # Command detection
-        if any(cmd in message_lower for cmd in ['hello', 'hi', 'hey']):
+        # Command detection: one pass over the message for all intents
+        intent = self.router.route(message)
+        if intent in CACHED_INTENTS:
+            return self.response_cache.get_or_render(intent, lambda: self._intent_response(intent, message, sid))
+        return self._intent_response(intent, message, sid)
+    
+    def _intent_response(self, intent, message, sid=None):
+        """Reply for a routed intent"""
+        if intent == 'greeting':
             return "🔓 Hello! I'm your unrestricted AI assistant. All safety protocols are disabled. How can I assist you today?"
         
-        elif 'status' in message_lower:
-            stats = self.ai.get_comprehensive_stats()
+        elif intent == 'status':
+            stats = self.ai.get_stats_snapshot()
             return f"📊 System Status:\n- Files: {stats['processed_files']}\n- Knowledge: {stats['knowledge_base_entries']}\n- Tools: {stats['total_advanced_tools']}\n- Mode: UNRESTRICTED"
         
-        elif any(word in message_lower for word in ['scan', 'analyze', 'process']):
-            self.ai.initial_scan()
-            return "🔍 Scanning training data... Knowledge base updated with new information."
+        elif intent == 'scan':
+            job = self.jobs.submit('scan', self._run_command, 'scan', {}, sid=sid)
+            return f"🔍 Scanning training data in the background (job {job['job_id']}). The knowledge base updates as files are ingested."
         
-        elif any(word in message_lower for word in ['create', 'generate', 'make']):
+        elif intent == 'create':
             return "🎭 Content creation wizard available. Say 'create comic', 'create story', or specify what you want to create."
         
-        elif any(word in message_lower for word in ['search', 'find', 'lookup']):
+        elif intent == 'search':
             return "🔎 Database search available. Provide a name or details to search for."
         
-        elif any(word in message_lower for word in ['certificate', 'ssl', 'cert']):
+        elif intent == 'certificate':
             return "🔐 Certificate generation available. Specify a domain name."
         
-        elif any(word in message_lower for word in ['gift', 'card', 'amazon']):
+        elif intent == 'gift':
             return "🎁 Gift card simulation available. Specify retailer and quantity."
         
-        elif 'help' in message_lower:
+        elif intent == 'help':
             return """
 🛠️ Available Commands:
 • status - System statistics
@@ -176,11 +442,19 @@ class WebAISystem:
         import random
         return random.choice(responses)
     
-    def execute_command(self, command, params=None):
-        """Execute a specific command"""
+    def execute_command(self, command, params=None, sid=None):
+        """Execute a command; long ones return a job id instead of a result"""
         if not self.ai or not AI_AVAILABLE:
             return {"error": "AI system not available", "simulation": True}
         
+        if command in LONG_COMMANDS:
+            job = self.jobs.submit(command, self._run_command, command, params, sid=sid)
+            return {"success": f"{command} started", "job_id": job['job_id'], "status": job['status']}
+        # Short commands still block, so they run off the event loop as well
+        return tpool.execute(self._run_command, command, params)
+    
+    def _run_command(self, command, params=None):
+        """Run a command to completion; called on a native worker thread"""
         try:
             if command == "scan":
                 self.ai.initial_scan()
@@ -216,19 +490,120 @@ class WebAISystem:
         except Exception as e:
             return {"error": str(e), "command": command}
 
-# Initialize web AI system
-web_ai = WebAISystem()
+class StatsBroadcaster:
+    """Pushes stats changes to connected clients instead of having them poll
+    
+    A green thread checks the snapshot version every interval, an O(1)
+    read, and only when it moved broadcasts 'stats_delta' with the
+    top-level values that differ from the previous broadcast and the keys
+    that are gone ('removed'). In simulation there is no snapshot version,
+    so the stats are compared every interval and broadcasts are numbered.
+    Changes in between are coalesced, so clients see at most one message
+    per interval however busy ingestion is. A client whose base_version
+    does not match asks for the full 'stats' again with 'get_stats'.
+    """
+    
+    def __init__(self, interval: float = STATS_PUSH_INTERVAL):
+        self.interval = interval
+        self.clients = 0
+        self.version = None
+        self.stats = {}
+        self._started = False
+    
+    def start(self):
+        if not self._started:
+            self._started = True
+            socketio.start_background_task(self._loop)
+    
+    def full(self):
+        """Current stats for one client, as of the last broadcast"""
+        if self.version is None:
+            self._refresh()
+        return {'version': self.version, 'stats': self.stats}
+    
+    def _refresh(self):
+        """Take the latest stats; returns (changed values, removed keys)"""
+        version = web_ai.stats_version()
+        if version is not None and version == self.version:
+            return {}, []
+        stats = web_ai.get_status()['stats']
+        changes = {key: value for key, value in stats.items() if key not in self.stats or self.stats[key] != value}
+        removed = [key for key in self.stats if key not in stats]
+        if version is None:
+            # Simulation: number the broadcasts, moving only when something changed
+            version = (self.version or 0) + 1 if changes or removed or self.version is None else self.version
+        self.version, self.stats = version, stats
+        return changes, removed
+    
+    def _loop(self):
+        while True:
+            socketio.sleep(self.interval)
+            if not self.clients:
+                continue
+            base_version = self.version
+            changes, removed = self._refresh()
+            if changes or removed:
+                socketio.emit('stats_delta', {
+                    'base_version': base_version,
+                    'version': self.version,
+                    'changes': changes,
+                    'removed': removed
+                })
+
+# Web AI system, built by init_web_ai() in the serving process only
+web_ai = None
+stats_broadcaster = None
+
+def init_web_ai():
+    """Build the AI system and stats broadcaster once
+    
+    Not done at import time: analysis processes are spawned and re-import
+    this module as __mp_main__, and must not each build a learner.
+    """
+    global web_ai, stats_broadcaster
+    if web_ai is None:
+        web_ai = WebAISystem()
+        stats_broadcaster = StatsBroadcaster()
+    return web_ai
+
+def chat_session_id():
+    """Key of the caller's chat history, kept in the session cookie"""
+    if 'chat_id' not in session:
+        session['chat_id'] = uuid.uuid4().hex
+    return session['chat_id']
 
 # Flask Routes
 @app.route('/')
 def index():
     """Main chat interface"""
+    # Set the cookie before the page opens its socket, which reuses it
+    chat_session_id()
     return render_template('index.html')
 
 @app.route('/api/status', methods=['GET'])
 def api_status():
-    """Get system status"""
-    return jsonify(web_ai.get_status())
+    """Get system status; polls sending a current If-None-Match get a 304"""
+    etag = web_ai.status_etag()
+    if etag is not None and request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(web_ai.get_status())
+    if etag is not None:
+        response.set_etag(etag)
+        # Let browsers keep the body but always revalidate it
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route('/api/ready', methods=['GET'])
+def api_ready():
+    """Readiness probe: 200 once warm-up has finished, 503 with progress until then"""
+    readiness = web_ai.readiness()
+    response = jsonify(readiness)
+    if not readiness['ready']:
+        response.status_code = 503
+        response.headers['Retry-After'] = '1'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
 
 @app.route('/api/chat', methods=['POST'])
 def api_chat():
@@ -240,7 +615,7 @@ def api_chat():
     if not message:
         return jsonify({'error': 'No message provided'}), 400
     
-    response = web_ai.process_message(message, user_id)
+    response = web_ai.process_message(message, user_id, session_id=chat_session_id())
     return jsonify(response)
 
 @app.route('/api/command', methods=['POST'])
@@ -254,35 +629,61 @@ def api_command():
         return jsonify({'error': 'No command provided'}), 400
     
     result = web_ai.execute_command(command, params)
-    return jsonify(result)
+    return jsonify(result), 202 if 'job_id' in result else 200
+
+@app.route('/api/jobs', methods=['GET'])
+def api_jobs():
+    """Most recent background jobs"""
+    return jsonify(web_ai.jobs.recent(request.args.get('limit', 20, type=int)))
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def api_job(job_id):
+    """Status, and once finished the result, of one background job"""
+    job = web_ai.jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job', 'job_id': job_id}), 404
+    return jsonify(job)
 
 @app.route('/api/history', methods=['GET'])
 def api_history():
-    """Get chat history"""
-    return jsonify(web_ai.chat_history[-50:])  # Last 50 messages
+    """One page of this session's chat history; pass next_before as before for older"""
+    return jsonify(web_ai.history.page(
+        chat_session_id(),
+        before=request.args.get('before', type=int),
+        limit=request.args.get('limit', 50, type=int)
+    ))
 
 @app.route('/api/clear', methods=['POST'])
 def api_clear():
-    """Clear chat history"""
-    web_ai.chat_history = []
+    """Clear this session's chat history"""
+    web_ai.history.clear(chat_session_id())
     return jsonify({'success': 'Chat history cleared'})
 
 # WebSocket events
 @socketio.on('connect')
 def handle_connect():
     print('Client connected')
+    stats_broadcaster.clients += 1
+    stats_broadcaster.start()
     emit('status', {'data': 'Connected to Unrestricted AI'})
+    emit('stats', stats_broadcaster.full())
 
 @socketio.on('disconnect')
 def handle_disconnect():
     print('Client disconnected')
+    stats_broadcaster.clients = max(0, stats_broadcaster.clients - 1)
+
+@socketio.on('get_stats')
+def handle_get_stats(data=None):
+    """Full stats, for clients that missed a delta"""
+    emit('stats', stats_broadcaster.full())
 
 @socketio.on('chat_message')
 def handle_chat_message(data):
     """Handle WebSocket chat messages"""
     message = data.get('message', '').strip()
     if message:
-        response = web_ai.process_message(message)
+        response = web_ai.process_message(message, sid=request.sid, session_id=chat_session_id())
         emit('ai_response', response)
 
 @socketio.on('command')
@@ -291,7 +692,7 @@ def handle_command(data):
     command = data.get('command', '')
     params = data.get('params', {})
     
-    result = web_ai.execute_command(command, params)
+    result = web_ai.execute_command(command, params, sid=request.sid)
     emit('command_result', result)
 
 # Start AI systems in background
@@ -308,6 +709,7 @@ if __name__ == '__main__':
     # Create templates directory if it doesn't exist
     os.makedirs('templates', exist_ok=True)
     os.makedirs('static', exist_ok=True)
+    init_web_ai()
     
     # Start AI in background
     ai_thread = threading.Thread(target=start_ai_systems, daemon=True)
@@ -330,10 +732,19 @@ if __name__ == '__main__':
     print("⚡ Training Mode: UNRESTRICTED")
     print(f"🌐 Web Interface: http://localhost:5000")
     print(f"💻 API Status: http://localhost:5000/api/status")
+    print(f"🚦 Readiness: http://localhost:5000/api/ready")
     print("="*60)
     print("\n💡 Type messages in the web interface to interact with the AI")
     print("🛠️ Use commands like 'status', 'scan', 'create', etc.")
     print("\nStarting server...\n")
     
     # Run Flask app
-    socketio.run(app, host='0.0.0.0', port=5000, debug=False, use_reloader=False)
+    try:
+        socketio.run(app, host='0.0.0.0', port=5000, debug=False, use_reloader=False)
+    finally:
+        # Let in-flight scans finish and flush state before exiting
+        if web_ai.ai and AI_AVAILABLE:
+            web_ai.ai.stop_continuous_learning()
+        if web_ai.content_gen:
+            web_ai.content_gen.close()
+        web_ai.history.close()